@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# Benchmarks for the monitor hot paths with JSON baselines and regression thresholds
+#
+# Usage:
+#   python benchmarks/bench_hot_paths.py                     # realistic sizes, compare to baseline
+#   python benchmarks/bench_hot_paths.py --stress            # add 100k and 1M message runs
+#   python benchmarks/bench_hot_paths.py --save-baseline     # store results as the new baseline
+#   python benchmarks/bench_hot_paths.py --only find_invite_codes --sizes 1000,50000
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import channel_state  # noqa: E402
+import dedup  # noqa: E402
+import discord_api_client as client  # noqa: E402
+import entry_tracking  # noqa: E402
+import submission_sinks  # noqa: E402
+import mock_discord  # noqa: E402
+import mock_redeem  # noqa: E402
+import page_fingerprint  # noqa: E402
+import synthetic_messages  # noqa: E402
+
+# Configuration
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+THRESHOLDS_FILE = os.path.join(BENCH_DIR, "thresholds.json")
+REALISTIC_SIZES = [1000, 10000]
+STRESS_SIZES = [100000, 1000000]
+PAGE_SIZE = 50  # Messages per page, same as get_channel_messages()
+MONITOR_MAX_MESSAGES = 50000  # The HTTP loop is slow; cap it so stress runs finish
+BAN_LIST_SIZE = 25  # Typical number of banned users
+HTTP_SUBMIT_MAX = 2000  # Submissions per http_sink_submit run (one request each)
+SPAM_TEXTS = 20  # Distinct texts in the extract_codes_spam run...
+SPAM_SHARE = 0.9  # ...and the share of messages that repeat one of them
+
+# name -> setup function(messages) returning (run function, items processed)
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark setup function"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def stub_entry(code, message=None, received_at=None, record=True):
+    """Stand-in for input_code_to_app that returns immediately"""
+    attempt = entry_tracking.new_attempt(code, message, received_at)
+    return entry_tracking.finish_attempt(attempt, "stub", entry_tracking.RESULT_SUBMITTED)
+
+
+def stub_batch_entry(codes, message=None, received_at=None, record=True):
+    """Stand-in for input_codes_to_app that returns immediately"""
+    return [stub_entry(code, message, received_at, record) for code in codes]
+
+
+def reset_client_state():
+    """Give every run the same fresh monitor state"""
+    client.STATE = channel_state.ChannelState(client.TARGET_CHANNEL_ID, client.STATE_CONSUMER, client.EXTRACTOR)
+    client.STATE.warmed_up = True  # Synthetic timestamps are far in the past; don't treat them as backlog
+    client.PAGE_FINGERPRINT.reset()
+    client.RECHECK_FINGERPRINT.reset()
+    client.REPUTATION.clear()
+    client.CLAIM_WATCH.clear()
+    client.DROP_SCHEDULE.clear()
+    client.METHOD_RANKING.clear()
+    client.EXTRACTOR.cache.clear()
+    client.CURRENT_USER_ID = ""
+    client.WHITELIST = []
+    client.BAN_LIST = [author["id"] for author in synthetic_messages.AUTHORS[:BAN_LIST_SIZE]]
+
+
+@benchmark("find_invite_codes")
+def setup_find_invite_codes(messages):
+    contents = [msg["content"] for msg in messages]
+
+    def run():
+        client.EXTRACTOR.cache.clear()  # Distinct messages: measure the cache misses, not a warm cache
+        for content in contents:
+            client.find_invite_codes(content)
+    return run, len(contents)
+
+
+@benchmark("content_regex")
+def setup_content_regex(messages):
+    # The original content-only scan, kept as the reference for extract_codes
+    contents = [msg["content"] for msg in messages]
+    pattern = re.compile(client.INVITE_PATTERN)
+
+    def run():
+        for content in contents:
+            pattern.findall(content)
+    return run, len(contents)
+
+
+@benchmark("extract_codes")
+def setup_extract_codes(messages):
+    def run():
+        client.EXTRACTOR.cache.clear()
+        for msg in messages:
+            client.EXTRACTOR.extract(msg)
+    return run, len(messages)
+
+
+@benchmark("extract_codes_spam")
+def setup_extract_codes_spam(messages):
+    # Raid-style spam: most messages repeat one of a few texts
+    rng = random.Random(len(messages))
+    spam = [msg["content"] for msg in messages[:SPAM_TEXTS]]
+    spammed = [dict(msg, content=rng.choice(spam)) if rng.random() < SPAM_SHARE else msg for msg in messages]
+
+    def run():
+        client.EXTRACTOR.cache.clear()
+        for msg in spammed:
+            client.EXTRACTOR.extract(msg)
+    return run, len(spammed)
+
+
+@benchmark("process_messages")
+def setup_process_messages(messages):
+    pages = [synthetic_messages.make_page(messages[i:i + PAGE_SIZE]) for i in range(0, len(messages), PAGE_SIZE)]
+
+    def run():
+        reset_client_state()
+        for page in pages:
+            client.process_messages(page)
+    return run, len(messages)
+
+
+@benchmark("filter_checks")
+def setup_filter_checks(messages):
+    user_ids = [msg["author"]["id"] for msg in messages]
+
+    def run():
+        reset_client_state()
+        for user_id in user_ids:
+            client.check_user_filters(user_id)
+    return run, len(user_ids)
+
+
+@benchmark("dedup_set")
+def setup_dedup_set(messages):
+    # Half the lookups hit (message seen on a previous poll), half miss
+    msg_ids = [msg["id"] for msg in messages]
+
+    def run():
+        seen = set()
+        for msg_id in msg_ids:
+            if msg_id not in seen:
+                seen.add(msg_id)
+            if msg_id in seen:
+                pass
+    return run, len(msg_ids)
+
+
+@benchmark("dedup_bounded_set")
+def setup_dedup_bounded_set(messages):
+    # Same access pattern as dedup_set, with the monitor's bounded set
+    msg_ids = [msg["id"] for msg in messages]
+
+    def run():
+        seen = dedup.BoundedSet(dedup.MAX_PROCESSED_MESSAGES)
+        for msg_id in msg_ids:
+            if msg_id not in seen:
+                seen.add(msg_id)
+            if msg_id in seen:
+                pass
+    return run, len(msg_ids)
+
+
+@benchmark("json_page_decode")
+def setup_json_page_decode(messages):
+    bodies = [
+        json.dumps(synthetic_messages.make_page(messages[i:i + PAGE_SIZE])).encode("utf-8")
+        for i in range(0, len(messages), PAGE_SIZE)
+    ]
+
+    def run():
+        for body in bodies:
+            json.loads(body)
+    return run, len(messages)
+
+
+@benchmark("unchanged_page_check")
+def setup_unchanged_page_check(messages):
+    # Fingerprinting a repeated page, the alternative to json_page_decode on a quiet channel
+    bodies = [
+        json.dumps(synthetic_messages.make_page(messages[i:i + PAGE_SIZE])).encode("utf-8")
+        for i in range(0, len(messages), PAGE_SIZE)
+    ]
+    fingerprint = page_fingerprint.PageFingerprint(recheck_every=0)
+
+    def run():
+        for body in bodies:
+            fingerprint.last = None
+            fingerprint.unchanged(body)
+            fingerprint.unchanged(body)
+    return run, len(messages) * 2
+
+
+@benchmark("monitor_channel_loop")
+def setup_monitor_channel_loop(messages):
+    count = min(len(messages), MONITOR_MAX_MESSAGES)
+    polls = max(1, count // PAGE_SIZE)
+    runs = [0]
+
+    def run():
+        reset_client_state()
+        runs[0] += 1
+        client.STATE_CONSUMER = f"bench-{runs[0]}"  # Fresh cursor for every run
+        server = mock_discord.MockDiscordServer(page_size=PAGE_SIZE).start()
+        try:
+            client.DISCORD_API_BASE = server.base_url
+            client.monitor_channel(poll_interval=0, max_polls=polls)
+        finally:
+            server.shutdown()
+            server.server_close()
+    return run, polls * PAGE_SIZE
+
+
+@benchmark("http_sink_submit")
+def setup_http_sink_submit(messages):
+    # Half the codes are new, half are repeats the endpoint rejects
+    count = min(len(messages), HTTP_SUBMIT_MAX)
+    codes = [f"{i // 2:06X}" for i in range(count)]
+
+    def run():
+        server = mock_redeem.MockRedeemServer().start()
+        sink = submission_sinks.HttpSubmissionSink(server.url)
+        try:
+            for code in codes:
+                sink.submit(code)
+        finally:
+            sink.close()
+            server.shutdown()
+            server.server_close()
+    return run, count
+
+
+def time_run(run, repeat):
+    """Return the best wall time of `repeat` runs"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_benchmarks(names, sizes, repeat):
+    """Run the selected benchmarks and return {"name[size]": result}"""
+    results = {}
+    message_cache = {}
+    with open(os.devnull, "w") as devnull:
+        for size in sizes:
+            if size not in message_cache:
+                message_cache.clear()
+                print(f"Generating {size} synthetic messages...")
+                message_cache[size] = synthetic_messages.make_messages(size)
+            messages = message_cache[size]
+            for name in names:
+                with contextlib.redirect_stdout(devnull):
+                    run, items = BENCHMARKS[name](messages)
+                    seconds = time_run(run, repeat)
+                key = f"{name}[{size}]"
+                results[key] = {
+                    "seconds": seconds,
+                    "items": items,
+                    "per_item_us": seconds / items * 1e6,
+                }
+                print(f"{key:<36} {seconds:10.4f}s {results[key]['per_item_us']:10.3f} us/item")
+    return results
+
+
+def load_json(path, default):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return default
+
+
+def compare_to_baseline(results, baseline, thresholds, default_threshold):
+    """Return the regressions beyond the configured thresholds and the results without a baseline entry"""
+    regressions, missing = [], []
+    base_results = baseline.get("results", {})
+    print("\nComparison with baseline:")
+    for key, result in results.items():
+        base = base_results.get(key)
+        if not base:
+            print(f"  {key:<36} no baseline")
+            missing.append(key)
+            continue
+        name = key.split("[", 1)[0]
+        threshold = thresholds.get(name, default_threshold)
+        change = result["per_item_us"] / base["per_item_us"] - 1
+        status = "REGRESSION" if change > threshold else "ok"
+        print(f"  {key:<36} {change:+8.1%} (limit +{threshold:.0%}) {status}")
+        if change > threshold:
+            regressions.append((key, change, threshold))
+    return regressions, missing
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the monitor hot paths')
+    parser.add_argument('--sizes', type=str, help='Comma-separated message counts (default: 1000,10000)')
+    parser.add_argument('--stress', action='store_true', help='Also run 100k and 1M message sizes')
+    parser.add_argument('--only', type=str, help='Comma-separated benchmark names to run')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, best time is kept (default: 3)')
+    parser.add_argument('--baseline', type=str, default=BASELINE_FILE, help='Baseline JSON file')
+    parser.add_argument('--thresholds', type=str, default=THRESHOLDS_FILE, help='Per-benchmark regression thresholds JSON file')
+    parser.add_argument('--threshold', type=float, help='Override the default allowed slowdown (0.25 = 25%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--output', type=str, help='Also write the results to this JSON file')
+    parser.add_argument('--list', action='store_true', help='List available benchmarks and exit')
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point"""
+    args = parse_args()
+    if args.list:
+        for name in BENCHMARKS:
+            print(name)
+        return 0
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}")
+        return 2
+    sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else list(REALISTIC_SIZES)
+    if args.stress:
+        sizes += [size for size in STRESS_SIZES if size not in sizes]
+
+    # Run inside a scratch directory so the state store and token file stay out of the repo
+    workdir = tempfile.mkdtemp(prefix="fellou-bench-")
+    baseline_path = os.path.abspath(args.baseline)
+    thresholds_path = os.path.abspath(args.thresholds)
+    output_path = os.path.abspath(args.output) if args.output else None
+    os.chdir(workdir)
+    with open(client.TOKEN_FILE, "w") as f:
+        f.write("bench-token")
+    client.input_code_to_app = stub_entry
+    client.input_codes_to_app = stub_batch_entry
+
+    results = run_benchmarks(names, sizes, args.repeat)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = load_json(baseline_path, {"results": {}})
+        baseline.update({k: v for k, v in report.items() if k != "results"})
+        baseline["results"].update(results)
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nSaved baseline to {baseline_path}")
+        return 0
+
+    baseline = load_json(baseline_path, None)
+    if baseline is None:
+        # Baselines are per machine and not committed; without one no threshold is checked
+        print(f"\nNo baseline at {baseline_path}, nothing was checked; run with --save-baseline first")
+        return 2
+    thresholds = load_json(thresholds_path, {})
+    default_threshold = args.threshold if args.threshold is not None else thresholds.get("default", 0.25)
+    regressions, missing = compare_to_baseline(results, baseline, thresholds, default_threshold)
+    if missing:
+        print(f"\nWarning: {len(missing)} of {len(results)} result(s) have no baseline entry and were not checked "
+              f"(add them with --save-baseline)")
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed beyond their threshold")
+        return 1
+    if len(missing) == len(results):
+        return 2
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
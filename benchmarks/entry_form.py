@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Stand-in for the target app's code form, used by the entry latency rig
+#
+# A small tkinter window titled like the target app, with the tab order the
+# GUI automation expects: a widget that has focus before entry starts, the
+# code field, a help button and the submit button (Tab, type, Tab, Tab,
+# Space). Every submission is printed to stdout as
+# "SUBMITTED <code> <unix time>" and the form resets itself, so entries can be
+# timed from another process. Lines on stdin control it: "reset" and "quit".
+
+import queue
+import sys
+import threading
+import time
+import tkinter as tk
+
+FORM_TITLE = "Fellou"  # Same as TARGET_APP_NAME, so window activation finds it
+
+
+class EntryForm:
+    """Code form that reports every submission on stdout"""
+
+    def __init__(self, title=FORM_TITLE):
+        self.root = tk.Tk()
+        self.root.title(title)
+        self.root.geometry("360x160+0+0")
+        self.commands = queue.Queue()
+        self.menu = tk.Button(self.root, text="Menu")  # Focused before entry starts
+        self.field = tk.Entry(self.root, width=20)
+        self.help = tk.Button(self.root, text="Help")
+        self.submit_button = tk.Button(self.root, text="Redeem", command=self.submit)
+        for widget in (self.menu, self.field, self.help, self.submit_button):
+            widget.pack(pady=2)
+        self.field.bind("<Return>", lambda event: self.submit())
+
+    def submit(self):
+        print(f"SUBMITTED {self.field.get()} {time.time():.6f}", flush=True)
+        self.reset()
+
+    def reset(self):
+        self.field.delete(0, tk.END)
+        self.root.focus_force()
+        self.menu.focus_set()
+
+    def poll_commands(self):
+        while not self.commands.empty():
+            command = self.commands.get()
+            if command == "reset":
+                self.reset()
+                print("RESET", flush=True)
+            elif command == "quit":
+                self.root.destroy()
+                return
+        self.root.after(20, self.poll_commands)
+
+    def read_stdin(self):
+        for line in sys.stdin:
+            self.commands.put(line.strip())
+        self.commands.put("quit")
+
+    def run(self):
+        threading.Thread(target=self.read_stdin, daemon=True).start()
+        self.root.update()
+        self.reset()
+        self.root.after(20, self.poll_commands)
+        print("READY", flush=True)
+        self.root.mainloop()
+
+
+if __name__ == "__main__":
+    EntryForm(sys.argv[1] if len(sys.argv) > 1 else FORM_TITLE).run()
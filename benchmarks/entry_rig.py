@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# Code-entry latency rig on a virtual X display
+#
+# Starts Xvfb, opens the stand-in code form (entry_form.py) on it and drives
+# each entry backend against the form under each delay profile. A sample is
+# the time from the entry call (including the wait after activating the app)
+# to the form reporting the submitted code; wrong codes and entries that never
+# arrive are counted separately. Nothing touches the real screen or keyboard.
+#
+# Backends:
+#   pyautogui  - the client's own form sequence (type_code_windows) in this process
+#   paste      - the client's paste mode (type_code_windows(paste=True)): the code goes in with one
+#                Ctrl+V and the previous clipboard is put back; entries that lose the clipboard are counted
+#   helper     - the form sequence run by a long-lived helper process, one stdin line per code
+#   xdotool    - one xdotool process per code, like one osascript run per code on macOS
+#
+# Needs Xvfb, tkinter and pyautogui; paste needs xclip or xsel, xdotool needs xdotool.
+#
+# Usage:
+#   python benchmarks/entry_rig.py                          # all backends, all profiles
+#   python benchmarks/entry_rig.py --backend pyautogui --profile current --profile fast --repeat 50
+#   python benchmarks/entry_rig.py --output entry_rig.json
+
+import argparse
+import json
+import os
+import queue
+import random
+import shutil
+import string
+import subprocess
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import poll_scheduler  # noqa: E402
+
+# Configuration
+XVFB_SCREEN = "1280x800x24"
+XVFB_DISPLAYS = range(90, 110)  # Display numbers tried for Xvfb
+DEFAULT_REPEAT = 20
+SUBMIT_TIMEOUT = 10.0  # Seconds to wait for the form to report a submission
+SETTLE = 0.2  # Seconds between entries
+FORM_SCRIPT = os.path.join(BENCH_DIR, "entry_form.py")
+
+# Delay profiles: wait after activating the app, and pause between the form keys (seconds)
+DELAY_PROFILES = {
+    "current": {"activation": 1.5, "key_delay": 0.5},  # What the client uses today
+    "short": {"activation": 0.5, "key_delay": 0.2},
+    "fast": {"activation": 0.2, "key_delay": 0.05},
+    "none": {"activation": 0.0, "key_delay": 0.0},
+}
+
+
+class VirtualDisplay:
+    """Xvfb server on a free display number"""
+
+    def __init__(self, screen=XVFB_SCREEN):
+        self.screen = screen
+        self.process = None
+        self.display = None
+
+    def start(self):
+        if not shutil.which("Xvfb"):
+            raise RuntimeError("Xvfb not found (install xvfb, or use --use-current-display)")
+        for number in XVFB_DISPLAYS:
+            if os.path.exists(f"/tmp/.X{number}-lock"):
+                continue
+            self.process = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", self.screen, "-nolisten", "tcp"],
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            deadline = time.monotonic() + 5.0
+            while time.monotonic() < deadline and self.process.poll() is None:
+                if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                    self.display = f":{number}"
+                    return self
+                time.sleep(0.05)
+            self.stop()
+        raise RuntimeError("could not start Xvfb on any display")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        self.process = None
+
+
+class LineProcess:
+    """Child process that talks in lines over stdin/stdout"""
+
+    def __init__(self, args):
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+        self.lines = queue.Queue()
+        threading.Thread(target=self.read_lines, daemon=True).start()
+
+    def read_lines(self):
+        for line in self.process.stdout:
+            self.lines.put(line.strip())
+        self.lines.put(None)
+
+    def send(self, line):
+        self.process.stdin.write(line + "\n")
+        self.process.stdin.flush()
+
+    def expect(self, prefix, timeout):
+        """Return the next line starting with prefix, or None on timeout or exit"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self.lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return None
+            if line is None or line.startswith(prefix):
+                return line
+
+    def close(self):
+        try:
+            self.send("quit")
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+
+class FormProcess(LineProcess):
+    """The stand-in form, running in its own process like the real app"""
+
+    def __init__(self):
+        super().__init__([sys.executable, FORM_SCRIPT])
+        if not self.expect("READY", 10.0):
+            raise RuntimeError("the stand-in form did not start (is tkinter installed?)")
+
+    def reset(self):
+        self.send("reset")
+        return self.expect("RESET", 5.0) is not None
+
+    def wait_submission(self, timeout=SUBMIT_TIMEOUT):
+        """(code, unix time) of the next submission, or None"""
+        line = self.expect("SUBMITTED", timeout)
+        if not line:
+            return None
+        parts = line.split(" ")
+        if len(parts) == 2:
+            return "", float(parts[1])  # Empty field
+        return parts[1], float(parts[2])
+
+
+class Backend:
+    """One way of getting a code into the form"""
+
+    name = "backend"
+
+    def unavailable(self):
+        """Why this backend cannot run here, or None"""
+        return None
+
+    def start(self, client):
+        self.client = client
+
+    def enter(self, code, key_delay):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def notes(self):
+        """Backend-specific counters for the results"""
+        return {}
+
+
+class PyautoguiBackend(Backend):
+    name = "pyautogui"
+
+    def enter(self, code, key_delay):
+        self.client.ENTRY_KEY_DELAY = key_delay
+        self.client.type_code_windows(code)
+
+
+class PasteBackend(Backend):
+    name = "paste"
+
+    def unavailable(self):
+        if not (shutil.which("xclip") or shutil.which("xsel")):
+            return "needs xclip or xsel for the clipboard"
+        return None
+
+    def start(self, client):
+        super().start(client)
+        self.clipboard_lost = 0
+
+    def enter(self, code, key_delay):
+        import pyperclip
+        sentinel = f"rig-clipboard-{code}"
+        pyperclip.copy(sentinel)
+        self.client.ENTRY_KEY_DELAY = key_delay
+        self.client.type_code_windows(code, paste=True)
+        if pyperclip.paste() != sentinel:
+            self.clipboard_lost += 1
+
+    def notes(self):
+        return {"clipboard_lost": self.clipboard_lost}
+
+
+class HelperBackend(Backend):
+    name = "helper"
+
+    def start(self, client):
+        super().start(client)
+        self.helper = LineProcess([sys.executable, os.path.abspath(__file__), "--helper"])
+        if not self.helper.expect("READY", 30.0):
+            raise RuntimeError("entry helper did not start")
+
+    def enter(self, code, key_delay):
+        self.helper.send(f"{code} {key_delay}")
+        self.helper.expect("DONE", SUBMIT_TIMEOUT)
+
+    def close(self):
+        self.helper.close()
+
+
+class XdotoolBackend(Backend):
+    name = "xdotool"
+
+    def unavailable(self):
+        return None if shutil.which("xdotool") else "xdotool not found"
+
+    def enter(self, code, key_delay):
+        delay = str(key_delay)
+        subprocess.run(["xdotool", "key", "Tab", "sleep", delay, "type", code, "sleep", delay,
+                        "key", "Tab", "sleep", delay, "key", "Tab", "sleep", delay, "key", "space"], check=False)
+
+
+BACKENDS = {backend.name: backend for backend in (PyautoguiBackend, PasteBackend, HelperBackend, XdotoolBackend)}
+
+
+def run_helper():
+    """--helper: keep the automation loaded and enter one code per stdin line"""
+    import discord_api_client as client
+    print("READY", flush=True)
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts or parts[0] == "quit":
+            break
+        client.ENTRY_KEY_DELAY = float(parts[1])
+        client.type_code_windows(parts[0])
+        print("DONE", flush=True)
+
+
+def random_code(rng):
+    return "".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+
+
+def measure(form, backend, profile, repeat, rng):
+    """Enter `repeat` codes and return the result for one backend and profile"""
+    latencies = []
+    calls = []
+    wrong = missing = 0
+    for _ in range(repeat):
+        form.reset()
+        time.sleep(SETTLE)
+        code = random_code(rng)
+        started = time.time()
+        time.sleep(profile["activation"])  # The fixed wait after bringing the app forward
+        backend.enter(code, profile["key_delay"])
+        calls.append(time.time() - started)
+        submission = form.wait_submission()
+        if submission is None:
+            missing += 1
+        elif submission[0] != code:
+            wrong += 1
+        else:
+            latencies.append(submission[1] - started)
+    latencies.sort()
+    return {
+        "backend": backend.name,
+        "profile": profile,
+        "entries": repeat,
+        "ok": len(latencies),
+        "wrong_code": wrong,
+        "missing": missing,
+        "p50": poll_scheduler.percentile(latencies, 0.50),
+        "p95": poll_scheduler.percentile(latencies, 0.95),
+        "max": latencies[-1] if latencies else 0.0,
+        "call_p50": poll_scheduler.percentile(sorted(calls), 0.50),
+    }
+
+
+def print_results(results):
+    print(f"\n{'backend':<10} {'profile':<8} {'ok':>7} {'wrong':>5} {'lost':>5} {'p50':>8} {'p95':>8} {'max':>8} {'call p50':>9}")
+    for r in results:
+        print(f"{r['backend']:<10} {r['profile_name']:<8} {r['ok']:>3}/{r['entries']:<3} {r['wrong_code']:>5} {r['missing']:>5} "
+              f"{r['p50']:>7.3f}s {r['p95']:>7.3f}s {r['max']:>7.3f}s {r['call_p50']:>8.3f}s")
+    for r in results:
+        if r.get("clipboard_lost"):
+            print(f"{r['backend']} ({r['profile_name']}): clipboard not restored after {r['clipboard_lost']} entries")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure code entry latency per backend and delay profile on a virtual display')
+    parser.add_argument('--backend', action='append', choices=list(BACKENDS), help='Backend to measure (repeatable, default: all)')
+    parser.add_argument('--profile', action='append', choices=list(DELAY_PROFILES), help='Delay profile (repeatable, default: all)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f'Codes entered per backend and profile (default: {DEFAULT_REPEAT})')
+    parser.add_argument('--seed', type=int, default=1234, help='Seed for the generated codes')
+    parser.add_argument('--use-current-display', action='store_true',
+                        help='Run on $DISPLAY instead of a private Xvfb (takes over your keyboard while it runs)')
+    parser.add_argument('--output', type=str, help='Also write the results to this JSON file')
+    parser.add_argument('--helper', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point"""
+    args = parse_args()
+    if args.helper:
+        run_helper()
+        return 0
+
+    display = None
+    if not args.use_current_display:
+        try:
+            display = VirtualDisplay().start()
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            return 2
+        os.environ["DISPLAY"] = display.display
+        print(f"Started Xvfb on {display.display}")
+    elif not os.environ.get("DISPLAY"):
+        print("Error: --use-current-display needs $DISPLAY")
+        return 2
+
+    results = []
+    form = None
+    try:
+        # pyautogui connects to the display on import, so load the client only now
+        import discord_api_client as client
+        form = FormProcess()
+        rng = random.Random(args.seed)
+        for name in args.backend or list(BACKENDS):
+            backend = BACKENDS[name]()
+            reason = backend.unavailable()
+            if reason:
+                print(f"Skipping {name}: {reason}")
+                continue
+            backend.start(client)
+            try:
+                for profile_name in args.profile or list(DELAY_PROFILES):
+                    print(f"Measuring {name} with the {profile_name} profile...")
+                    result = measure(form, backend, DELAY_PROFILES[profile_name], args.repeat, rng)
+                    result["profile_name"] = profile_name
+                    result.update(backend.notes())
+                    results.append(result)
+            finally:
+                backend.close()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 2
+    finally:
+        if form:
+            form.close()
+        if display:
+            display.stop()
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Local stand-in for the Discord API used by the benchmarks
+#
+# Every GET of the channel messages endpoint returns the next page of a
+# synthetic stream, so each poll of the monitor sees `page_size` new messages.
+
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import synthetic_messages
+
+
+class MockDiscordHandler(BaseHTTPRequestHandler):
+    """Serves /users/@me and /channels/<id>/messages"""
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def send_json(self, body, status=200):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        if self.path.startswith("/users/@me"):
+            self.send_json({"id": "399999999999999999", "username": "bench-user"})
+        elif "/messages" in self.path:
+            self.send_json(server.next_page())
+        else:
+            self.send_json({"message": "Not Found"}, status=404)
+
+
+class MockDiscordServer(ThreadingHTTPServer):
+    """HTTP server producing a deterministic synthetic message stream"""
+
+    daemon_threads = True
+
+    def __init__(self, page_size=50, seed=1234, code_rate=0.05, spacing=0.01):
+        super().__init__(("127.0.0.1", 0), MockDiscordHandler)
+        self.page_size = page_size
+        self.code_rate = code_rate
+        self.spacing = spacing  # Seconds between message timestamps
+        self.rng = random.Random(seed)
+        self.next_index = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def next_page(self):
+        """Return the encoded next page of new messages (newest first)"""
+        with self.lock:
+            start = self.next_index
+            self.next_index += self.page_size
+            self.requests += 1
+            messages = [
+                synthetic_messages.make_message(i, self.rng, code_rate=self.code_rate, spacing=self.spacing)
+                for i in range(start, start + self.page_size)
+            ]
+        return json.dumps(synthetic_messages.make_page(messages)).encode("utf-8")
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
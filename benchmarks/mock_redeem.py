@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Local stand-in for a code redemption endpoint
+#
+# POST / with {"code": "..."} answers {"success": true} the first time a valid
+# code is redeemed and 409 {"success": false} for repeats or unknown codes, so
+# the HTTP submission sink can be exercised without touching a real service.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockRedeemHandler(BaseHTTPRequestHandler):
+    """Redeems codes posted as JSON"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like a real endpoint
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def send_json(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            code = json.loads(self.rfile.read(length) or b"{}").get("code")
+        except ValueError:
+            code = None
+        if not code:
+            self.send_json({"success": False, "message": "missing code"}, status=400)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.redeem(code):
+            self.send_json({"success": True, "code": code})
+        else:
+            self.send_json({"success": False, "message": "invalid or already redeemed"}, status=409)
+
+
+class MockRedeemServer(ThreadingHTTPServer):
+    """Redemption endpoint that accepts each valid code once"""
+
+    daemon_threads = True
+
+    def __init__(self, valid_codes=None, latency=0.0):
+        super().__init__(("127.0.0.1", 0), MockRedeemHandler)
+        self.valid_codes = set(valid_codes) if valid_codes is not None else None  # None = every code is valid
+        self.latency = latency
+        self.redeemed = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}/"
+
+    def redeem(self, code):
+        with self.lock:
+            self.requests += 1
+            if code in self.redeemed or (self.valid_codes is not None and code not in self.valid_codes):
+                return False
+            self.redeemed.add(code)
+            return True
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# Virtual-time simulator for polling and entry policies
+#
+# Runs the real monitor_channel loop (scheduler, adaptive policy, retry policy
+# and circuit breaker, dedup, filters, code extraction, entry queue order) on a
+# virtual clock. Fetches are served from a synthetic or recorded message stream
+# through a fake HTTP session: the rate limit is enforced the way Discord does
+# it and the API fails with 503s during simulated outages. Code entry advances
+# the clock by the configured entry time instead of typing. Each code is taken
+# by someone else after a random lifetime, so slow detection or entry shows up
+# as missed codes, and some authors only post codes that do not work.
+#
+# Usage:
+#   python benchmarks/policy_simulator.py                        # built-in policies, 6 simulated hours
+#   python benchmarks/policy_simulator.py --hours 24 --lifetime 20
+#   python benchmarks/policy_simulator.py --policy "fast:interval=1" --policy "huge-page:interval=5,page=100"
+#   python benchmarks/policy_simulator.py --stream recorded.json  # JSON list of API message objects
+#   python benchmarks/policy_simulator.py --policy "predictive:interval=30,burst=1,hot_window=daily 12:00-14:00"
+#   python benchmarks/policy_simulator.py --policy "patient:breaker_open_max=120" --policy "page-order:reputation=false,verdicts=true"
+
+import argparse
+import bisect
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import adaptive_polling  # noqa: E402
+import author_reputation  # noqa: E402
+import bench_hot_paths  # noqa: E402
+import discord_api_client as client  # noqa: E402
+import drop_schedule  # noqa: E402
+import entry_tracking  # noqa: E402
+import poll_scheduler  # noqa: E402
+import retry_policy  # noqa: E402
+import synthetic_messages  # noqa: E402
+
+fetch_messages = client.get_channel_messages  # The real fetch, wrapped per run to mark claim rechecks
+
+# Configuration
+DEFAULT_HOURS = 6
+DEFAULT_LIFETIME = 30.0  # Average seconds before someone else redeems a code
+REQUEST_LATENCY = 0.15  # Seconds one channel fetch takes
+TAIL = 120.0  # Seconds simulated after the last message
+OUTAGE_EVERY = 3 * 3600.0  # Average seconds between API outages (0 = none)
+OUTAGE_LENGTH = 180.0  # Seconds an outage lasts
+FAKE_AUTHORS = 0.05  # Share of code posters whose codes never work (lookalikes, used or made-up codes)
+
+# Built-in policies. Keys:
+#   polling: interval, adaptive, burst, page, order (page order the channel returns: newest_first/oldest_first),
+#     hot_window (predictive polling at burst in these windows, ";"-separated, e.g. "Fri 18:00-20:00;daily 12:00-13:00")
+#   backoff: retry_backoff (seconds before the first in-poll retry), breaker_failures (failed polls before the
+#     circuit breaker opens), breaker_open_max (longest gap between probes during an outage)
+#   entry queue: reputation (enter codes from proven authors first, false-positive sources last; false = page order)
+#   entry: activation (seconds to bring up the app per entry call), per_code (seconds per code entered) and
+#     verdicts (entry reports accepted/rejected like the HTTP sink; GUI entry only reports submitted)
+GUI_ENTRY = {"activation": 1.5, "per_code": 2.5, "verdicts": False}
+HTTP_ENTRY = {"activation": 0.0, "per_code": 0.05, "verdicts": True}
+DEFAULT_POLICIES = [
+    ("poll-10s", dict(GUI_ENTRY, interval=10)),
+    ("poll-5s", dict(GUI_ENTRY, interval=5)),
+    ("poll-2s", dict(GUI_ENTRY, interval=2)),
+    ("poll-1s", dict(GUI_ENTRY, interval=1)),
+    ("poll-0.5s", dict(GUI_ENTRY, interval=0.5)),
+    ("adaptive", dict(GUI_ENTRY, interval=10, adaptive=True, burst=1)),
+    ("adaptive-oldest", dict(GUI_ENTRY, interval=10, adaptive=True, burst=1, order="oldest_first")),
+    ("adaptive-patient", dict(GUI_ENTRY, interval=10, adaptive=True, burst=1, breaker_open_max=120)),
+    ("adaptive-http", dict(HTTP_ENTRY, interval=10, adaptive=True, burst=1)),
+    ("adaptive-http-fifo", dict(HTTP_ENTRY, interval=10, adaptive=True, burst=1, reputation=False)),
+]
+POLICY_DEFAULTS = dict(GUI_ENTRY, interval=5, adaptive=False, burst=adaptive_polling.DEFAULT_BURST_INTERVAL,
+                       page=50, order="newest_first", hot_window="", reputation=True,
+                       retry_backoff=retry_policy.RETRY_BACKOFF, breaker_failures=retry_policy.BREAKER_FAILURES,
+                       breaker_open_max=retry_policy.BREAKER_OPEN_MAX)
+# Retry policy constants set from the backoff settings while a policy runs
+BACKOFF_SETTINGS = {"retry_backoff": "RETRY_BACKOFF", "breaker_failures": "BREAKER_FAILURES",
+                    "breaker_open_max": "BREAKER_OPEN_MAX"}
+
+
+class StopSimulation(Exception):
+    """Raised by the simulated fetch when the stream has been played back"""
+
+
+class VirtualClock:
+    """Clock that only moves when the simulation sleeps or does work"""
+
+    def __init__(self, start):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+
+class SimulatedResponse:
+    """The parts of a requests.Response the retry policy and get_channel_messages use"""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.content = body
+        self.text = body.decode("utf-8")
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class SimulatedChannel:
+    """HTTP session serving pages of the stream as of the virtual time; enforces the rate limit and has outages"""
+
+    def __init__(self, messages, clock, end, order, outages=()):
+        self.messages = messages  # Oldest first
+        self.posted = [entry_tracking.message_time(msg) for msg in messages]
+        self.clock = clock
+        self.end = end
+        self.order = order
+        self.outages = outages  # (start, end) virtual times during which the API answers 503
+        self.budget = adaptive_polling.RequestBudget(clock=clock.time)
+        self.requests = 0
+        self.rechecks = 0  # Claim rechecks between entries, included in requests
+        self.recheck = False  # The request in flight is a claim recheck
+        self.violations = 0
+        self.errors = 0
+        self.seen_at = {}  # message ID -> virtual time first returned
+        self.bodies = {}  # limit -> (messages available, encoded page), the last page served per page size
+
+    def in_outage(self):
+        return any(start <= self.clock.now < end for start, end in self.outages)
+
+    def request(self, method, url, timeout=None, params=None, **kwargs):
+        if self.clock.now >= self.end:
+            raise StopSimulation()
+        self.requests += 1
+        self.rechecks += self.recheck
+        if self.in_outage():
+            self.errors += 1
+            self.clock.sleep(REQUEST_LATENCY)
+            return SimulatedResponse(503, b'{"message": "Service Unavailable"}')
+        if self.budget.earliest_next() > self.clock.now:
+            # Over the rate limit: Discord answers 429 with the time until the window frees up
+            self.violations += 1
+            retry_after = self.budget.earliest_next() - self.clock.now
+            self.clock.sleep(REQUEST_LATENCY)
+            return SimulatedResponse(429, json.dumps({"retry_after": retry_after}).encode())
+        self.budget.record()
+        self.clock.sleep(REQUEST_LATENCY)
+        limit = int((params or {}).get("limit", 50))
+        available = bisect.bisect_right(self.posted, self.clock.now)
+        page = self.messages[max(0, available - limit):available]
+        if not self.recheck:  # Rechecks are only scanned for claim replies: their codes are detected by the next poll
+            for msg in page:
+                self.seen_at.setdefault(msg["id"], self.clock.now)
+        cached = self.bodies.get(limit)
+        if cached is None or cached[0] != available:
+            cached = self.bodies[limit] = (available, json.dumps(
+                page if self.order == "oldest_first" else synthetic_messages.make_page(page)).encode())
+        return SimulatedResponse(200, cached[1])
+
+
+class PageOrderQueue(author_reputation.ReputationIndex):
+    """Reputation index that leaves the entry queue in page order (reputation=false)"""
+
+    def order(self, entries):
+        return list(entries)
+
+
+def parse_policy(spec):
+    """Parse "name:key=value,key=value" into (name, settings)"""
+    name, _, settings = spec.partition(":")
+    policy = {}
+    for item in filter(None, settings.split(",")):
+        key, _, value = item.partition("=")
+        if key not in POLICY_DEFAULTS:
+            raise ValueError(f"unknown policy setting {key!r} (known: {', '.join(POLICY_DEFAULTS)})")
+        default = POLICY_DEFAULTS[key]
+        if isinstance(default, bool):
+            policy[key] = value.lower() in ("1", "true", "yes", "")
+        elif isinstance(default, str):
+            policy[key] = value
+            if key == "hot_window":
+                for window in value.split(";"):
+                    drop_schedule.parse_window(window)  # Raises ValueError for a bad window
+        else:
+            policy[key] = type(default)(float(value)) if isinstance(default, int) else float(value)
+    return name, policy
+
+
+def code_lifetimes(codes, lifetime, seed):
+    """Time each code stays redeemable, the same for every policy"""
+    return {code: random.Random(f"{seed}-{code}").expovariate(1 / lifetime) for code in codes}
+
+
+def outage_windows(start, end, every, length, seed):
+    """API outages over the stream, the same for every policy"""
+    if every <= 0 or length <= 0:
+        return []
+    rng = random.Random(f"{seed}-outages")
+    windows = []
+    at = start + rng.expovariate(1 / every)
+    while at < end:
+        windows.append((at, at + length))
+        at += length + rng.expovariate(1 / every)
+    return windows
+
+
+def fake_code_authors(messages, share, seed):
+    """Authors whose codes never work, the same for every policy"""
+    authors = sorted({msg["author"]["id"] for msg in messages})
+    return set(random.Random(f"{seed}-fakes").sample(authors, int(round(len(authors) * share))))
+
+
+def scored_codes(messages, posted_times, fakes):
+    """code -> (posted, message ID, fake) for every code from an author the monitor is allowed to act on"""
+    codes = {}
+    for msg, posted in zip(messages, posted_times):
+        if client.check_user_filters(msg["author"]["id"]):
+            continue
+        for hit in client.EXTRACTOR.extract(msg, author_filter=client.check_user_filters):
+            codes.setdefault(hit.code, (posted, msg["id"], msg["author"]["id"] in fakes))
+    return codes
+
+
+def simulate(name, policy, messages, lifetime, seed, outages=(), fakes=frozenset()):
+    """Run one policy over the stream and return its metrics"""
+    settings = dict(POLICY_DEFAULTS, **policy)
+    posted_times = [entry_tracking.message_time(msg) for msg in messages]
+    clock = VirtualClock(posted_times[0] - 1.0)
+    channel = SimulatedChannel(messages, clock, posted_times[-1] + TAIL, settings["order"], outages)
+    entered_at = {}
+
+    bench_hot_paths.reset_client_state()
+    codes = scored_codes(messages, posted_times, fakes)
+    lifetimes = code_lifetimes(codes, lifetime, seed)
+
+    def verdict(code):
+        """What the entry reports: accepted while the code is still redeemable, rejected otherwise"""
+        if not settings["verdicts"]:
+            return entry_tracking.RESULT_SUBMITTED
+        posted, _, fake = codes.get(code, (None, None, True))
+        if fake or clock.now - posted > lifetimes[code]:
+            return entry_tracking.RESULT_FAILURE
+        return entry_tracking.RESULT_SUCCESS
+
+    def enter_codes(codes, message=None, received_at=None, record=True):
+        clock.sleep(settings["activation"])
+        attempts = []
+        for code in codes:
+            started = clock.now
+            clock.sleep(settings["per_code"])
+            entered_at.setdefault(code, clock.now)
+            attempt = entry_tracking.new_attempt(code, message, received_at)
+            entry_tracking.finish_attempt(attempt, "simulated", verdict(code))
+            attempt["started_at"], attempt["duration"] = started, settings["per_code"]
+            attempts.append(attempt)
+        return attempts
+
+    def get_channel_messages(token, limit=50, before=None, fingerprint=None):
+        channel.recheck = fingerprint is client.RECHECK_FINGERPRINT
+        try:
+            return fetch_messages(token, limit=limit, before=before, fingerprint=fingerprint)
+        finally:
+            channel.recheck = False
+
+    client.STATE.consumer = f"sim-{name}"
+    client.HTTP_POLICY = retry_policy.RetryPolicy(session=channel, clock=clock.time, sleep=clock.sleep)
+    client.REPUTATION = author_reputation.ReputationIndex() if settings["reputation"] else PageOrderQueue()
+    client.get_channel_messages = get_channel_messages
+    client.input_codes_to_app = enter_codes
+    client.input_code_to_app = lambda code, **kwargs: enter_codes([code], **kwargs)[0]
+    random.seed(f"{seed}-{name}")  # Retry jitter
+
+    schedule = None
+    if settings["hot_window"]:
+        schedule = drop_schedule.DropSchedule(clock=clock.time)
+        schedule.use_learned = False
+        for spec in settings["hot_window"].split(";"):
+            schedule.add_window(spec)
+
+    saved = {constant: getattr(retry_policy, constant) for constant in BACKOFF_SETTINGS.values()}
+    for key, constant in BACKOFF_SETTINGS.items():
+        setattr(retry_policy, constant, type(saved[constant])(settings[key]))
+    started = time.perf_counter()
+    try:
+        client.monitor_channel(poll_interval=settings["interval"], adaptive=settings["adaptive"],
+                               burst_interval=settings["burst"], page_size=int(settings["page"]),
+                               clock=clock.time, sleep=clock.sleep, schedule=schedule)
+    except StopSimulation:
+        pass
+    finally:
+        for constant, value in saved.items():
+            setattr(retry_policy, constant, value)
+    wall = time.perf_counter() - started
+
+    # Score every working code; codes of fake-code authors only cost entry time
+    detection, entry = [], []
+    undetected = late = won = fakes_entered = 0
+    for code, (posted, msg_id, fake) in codes.items():
+        if fake:
+            fakes_entered += code in entered_at
+            continue
+        if msg_id not in channel.seen_at:
+            undetected += 1
+            continue
+        detection.append(channel.seen_at[msg_id] - posted)
+        if code not in entered_at:
+            late += 1
+            continue
+        entry.append(entered_at[code] - posted)
+        if entered_at[code] - posted <= lifetimes[code]:
+            won += 1
+        else:
+            late += 1
+    detection.sort()
+    entry.sort()
+    return {
+        "policy": name,
+        "settings": settings,
+        "requests": channel.requests,
+        "claim_rechecks": channel.rechecks,
+        "rate_limit_violations": channel.violations,
+        "api_errors": channel.errors,
+        "codes": len(codes) - sum(fake for _, _, fake in codes.values()),
+        "won": won,
+        "missed": undetected + late,
+        "undetected": undetected,
+        "late": late,
+        "fakes_entered": fakes_entered,
+        "detection_p50": poll_scheduler.percentile(detection, 0.50),
+        "detection_p95": poll_scheduler.percentile(detection, 0.95),
+        "detection_max": detection[-1] if detection else 0.0,
+        "entry_p50": poll_scheduler.percentile(entry, 0.50),
+        "entry_p95": poll_scheduler.percentile(entry, 0.95),
+        "wall_seconds": wall,
+    }
+
+
+def load_stream(args):
+    """Return the messages to play back, oldest first"""
+    if args.stream:
+        with open(args.stream, "r") as f:
+            messages = json.load(f)
+        messages = [msg for msg in messages if entry_tracking.message_time(msg) is not None]
+        messages.sort(key=entry_tracking.message_time)
+        print(f"Loaded {len(messages)} recorded messages from {args.stream}")
+        return messages
+    messages = synthetic_messages.make_stream(args.hours * 3600, seed=args.seed)
+    print(f"Generated {len(messages)} synthetic messages over {args.hours:g} hours")
+    return messages
+
+
+def print_results(results):
+    print(f"\n{'policy':<18} {'requests':>8} {'rechecks':>8} {'429s':>5} {'5xx':>5} {'codes':>6} {'won':>5} {'missed':>6} "
+          f"{'fakes':>5} {'detect p50':>10} {'p95':>7} {'max':>7} {'entry p50':>10} {'p95':>7}")
+    for r in results:
+        print(f"{r['policy']:<18} {r['requests']:>8} {r['claim_rechecks']:>8} {r['rate_limit_violations']:>5} "
+              f"{r['api_errors']:>5} {r['codes']:>6} {r['won']:>5} {r['missed']:>6} {r['fakes_entered']:>5} "
+              f"{r['detection_p50']:>9.1f}s {r['detection_p95']:>6.1f}s {r['detection_max']:>6.1f}s "
+              f"{r['entry_p50']:>9.1f}s {r['entry_p95']:>6.1f}s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare polling and entry policies in virtual time')
+    parser.add_argument('--hours', type=float, default=DEFAULT_HOURS, help=f'Simulated hours of synthetic traffic (default: {DEFAULT_HOURS})')
+    parser.add_argument('--stream', type=str, help='Play back a recorded JSON list of API message objects instead')
+    parser.add_argument('--lifetime', type=float, default=DEFAULT_LIFETIME,
+                        help=f'Average seconds until someone else redeems a code (default: {DEFAULT_LIFETIME})')
+    parser.add_argument('--policy', action='append', default=[],
+                        help='Policy to simulate as "name:key=value,..." (keys: ' + ', '.join(POLICY_DEFAULTS) + '); repeatable')
+    parser.add_argument('--outage-every', type=float, default=OUTAGE_EVERY,
+                        help=f'Average seconds between API outages, 0 for none (default: {OUTAGE_EVERY:.0f})')
+    parser.add_argument('--outage-length', type=float, default=OUTAGE_LENGTH,
+                        help=f'Seconds an API outage lasts (default: {OUTAGE_LENGTH:.0f})')
+    parser.add_argument('--fake-authors', type=float, default=FAKE_AUTHORS,
+                        help=f'Share of code posters whose codes never work (default: {FAKE_AUTHORS})')
+    parser.add_argument('--seed', type=int, default=1234, help='Seed for the synthetic stream, outages, fake authors and code lifetimes')
+    parser.add_argument('--output', type=str, help='Also write the results to this JSON file')
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point"""
+    args = parse_args()
+    try:
+        policies = [parse_policy(spec) for spec in args.policy] or DEFAULT_POLICIES
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    messages = load_stream(args)
+    if not messages:
+        print("No messages to simulate")
+        return 2
+    output_path = os.path.abspath(args.output) if args.output else None
+    posted_times = [entry_tracking.message_time(msg) for msg in messages]
+    outages = outage_windows(posted_times[0], posted_times[-1] + TAIL, args.outage_every, args.outage_length, args.seed)
+    fakes = fake_code_authors(messages, args.fake_authors, args.seed)
+
+    # Run inside a scratch directory so the state store stays out of the repo
+    os.chdir(tempfile.mkdtemp(prefix="fellou-sim-"))
+    client.get_user_token = lambda: "sim-token"
+    client.get_current_user_info = lambda token: (None, None)  # No auto-whitelisting of our own account
+    client.restore_state = lambda: None  # Every policy starts cold
+
+    results = []
+    with open(os.devnull, "w") as devnull:
+        for name, policy in policies:
+            with contextlib.redirect_stdout(devnull):
+                result = simulate(name, policy, messages, args.lifetime, args.seed, outages, fakes)
+            results.append(result)
+            print(f"Simulated {name} in {result['wall_seconds']:.1f} s")
+    print(f"{len(outages)} API outage(s) of {args.outage_length:.0f} s, {len(fakes)} author(s) posting codes that never work")
+    print_results(results)
+
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# Soak test: days of synthetic channel traffic through the full monitor loop
+#
+# Runs monitor_channel against the local mock Discord server with no delay
+# between polls, so each poll plays back a page of a message stream spread
+# over the simulated days. Samples RSS, traced Python memory, GC pauses, the
+# size of the dedup state and the latency of every poll, then fails if memory
+# keeps growing after warm-up or the poll latency percentiles drift.
+#
+# Usage:
+#   python benchmarks/soak.py                       # 3 simulated days at 20k messages/day
+#   python benchmarks/soak.py --days 14 --output soak.json
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import bench_hot_paths  # noqa: E402
+import channel_state  # noqa: E402
+import claim_signals  # noqa: E402
+import dedup  # noqa: E402
+import discord_api_client as client  # noqa: E402
+import mock_discord  # noqa: E402
+import poll_scheduler  # noqa: E402
+import state_store  # noqa: E402
+import synthetic_messages  # noqa: E402
+
+# Configuration
+DEFAULT_DAYS = 3
+DEFAULT_MESSAGES_PER_DAY = 20000
+PAGE_SIZE = 50
+SAMPLES = 50  # Memory samples over the run
+WARMUP_FRACTION = 0.2  # Memory is compared from the first sample after this share of the run where all bounded state is full...
+MIN_MEASURED_FRACTION = 0.2  # ...and at least this share of the run must be left after that point
+MEMORY_GROWTH_LIMIT = 0.10  # Allowed growth of traced memory after warm-up...
+MEMORY_GROWTH_SLACK = 1024 * 1024  # ...plus this many bytes
+RSS_GROWTH_LIMIT = 0.25  # RSS is noisier (allocator arenas), so allow more
+RSS_GROWTH_SLACK = 8 * 1024 * 1024
+LATENCY_DRIFT_LIMIT = 0.5  # Allowed increase of p50/p95 poll latency from early to late run...
+LATENCY_DRIFT_SLACK = 0.002  # ...plus this many seconds
+LATENCY_WINDOW_FRACTION = 0.2  # Share of polls compared at the start and end of the run
+GC_PAUSE_LIMIT = 0.1  # Seconds; longest acceptable single collection
+SOAK_MAX_CODES = 1000  # Code dedup capacity during the soak, small enough to fill up during warm-up
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def current_rss():
+    """Resident set size in bytes"""
+    if psutil:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best we can do here (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class GcPauseRecorder:
+    """Times every garbage collection through gc.callbacks"""
+
+    def __init__(self):
+        self.started = None
+        self.pauses = []  # (generation, seconds)
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.started = time.perf_counter()
+        elif self.started is not None:
+            self.pauses.append((info["generation"], time.perf_counter() - self.started))
+            self.started = None
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+    def stats(self):
+        pauses = sorted(seconds for _, seconds in self.pauses)
+        return {
+            "collections": len(pauses),
+            "by_generation": {gen: sum(1 for g, _ in self.pauses if g == gen) for gen in range(3)},
+            "total": sum(pauses),
+            "p99": poll_scheduler.percentile(pauses, 0.99),
+            "max": pauses[-1] if pauses else 0.0,
+        }
+
+
+class PollProbe:
+    """Wraps the monitor's fetch and process steps to time polls and sample memory"""
+
+    def __init__(self, total_polls, sample_every):
+        self.total_polls = total_polls
+        self.sample_every = sample_every
+        self.poll_started = None
+        self.latencies = []
+        self.samples = []
+        self.fetch = client.get_channel_messages
+        self.process = client.process_messages
+
+    def get_channel_messages(self, *args, **kwargs):
+        self.poll_started = time.perf_counter()
+        return self.fetch(*args, **kwargs)
+
+    def process_messages(self, messages, **kwargs):
+        self.process(messages, **kwargs)
+        self.latencies.append(time.perf_counter() - self.poll_started)
+        polls = len(self.latencies)
+        if polls % self.sample_every == 0 or polls == self.total_polls:
+            self.sample(polls)
+
+    def sample(self, polls):
+        traced, _ = tracemalloc.get_traced_memory()
+        self.samples.append({
+            "poll": polls,
+            "rss": current_rss(),
+            "traced": traced,
+            "processed_msg_ids": len(client.STATE.processed_msg_ids),
+            "processed_codes": len(client.STATE.processed_codes),
+            "message_versions": len(client.STATE.message_versions),
+            "extraction_cache": len(client.EXTRACTOR.cache.entries),
+            "claim_watch": len(client.CLAIM_WATCH.posted),
+        })
+
+    def install(self):
+        client.get_channel_messages = self.get_channel_messages
+        client.process_messages = self.process_messages
+
+
+def window_percentiles(values):
+    ordered = sorted(values)
+    return {"p50": poll_scheduler.percentile(ordered, 0.50), "p95": poll_scheduler.percentile(ordered, 0.95)}
+
+
+def check_growth(name, start, end, limit, slack, failures):
+    allowed = start * (1 + limit) + slack
+    status = "ok" if end <= allowed else "FAIL"
+    print(f"  {name:<28} {start / 1e6:9.2f} MB -> {end / 1e6:9.2f} MB (limit {allowed / 1e6:.2f} MB) {status}")
+    if end > allowed:
+        failures.append(f"{name} grew from {start} to {end} bytes")
+
+
+def state_capacities(max_codes):
+    """Sample key -> capacity of every bounded structure that fills up with traffic"""
+    return {
+        "processed_msg_ids": client.STATE.processed_msg_ids.maxlen,
+        "processed_codes": max_codes,
+        "message_versions": channel_state.MAX_TRACKED_EDITS,
+        "extraction_cache": client.EXTRACTOR.cache.maxsize,
+        "claim_watch": claim_signals.MAX_TRACKED_CODES,
+    }
+
+
+def warm_sample(samples, total_polls, capacities):
+    """First sample after the warm-up share of the run where every bounded structure is full, or None"""
+    for sample in samples:
+        if sample["poll"] >= total_polls * WARMUP_FRACTION and all(
+                sample[key] >= capacity for key, capacity in capacities.items()):
+            return sample
+    return None
+
+
+def run_soak(days, messages_per_day, page_size, code_rate, max_codes=SOAK_MAX_CODES):
+    """Drive the monitor over the simulated days and return (report, failures)"""
+    total_messages = int(days * messages_per_day)
+    total_polls = max(1, total_messages // page_size)
+    probe = PollProbe(total_polls, max(1, total_polls // SAMPLES))
+    probe.install()
+    server = mock_discord.MockDiscordServer(page_size=page_size, code_rate=code_rate,
+                                            spacing=86400.0 / messages_per_day).start()
+    client.DISCORD_API_BASE = server.base_url
+    bench_hot_paths.reset_client_state()
+    # The monitor auto-whitelists the current user, which would filter out every synthetic
+    # author; whitelist the unbanned ones so codes go through the whole pipeline
+    client.WHITELIST = [author["id"] for author in synthetic_messages.AUTHORS[bench_hot_paths.BAN_LIST_SIZE:]]
+    # At full capacity the code set takes weeks of traffic to fill; with a smaller bound any
+    # growth after warm-up is a leak rather than the set still filling up
+    client.STATE.processed_codes = dedup.BoundedSet(max_codes)
+
+    print(f"Soaking {days:g} simulated days: {total_messages} messages in {total_polls} polls...")
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with GcPauseRecorder() as gc_pauses, open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                probe.sample(0)
+                client.monitor_channel(poll_interval=0, max_polls=total_polls)
+                state_store.flush()
+            snapshot_end = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+        server.shutdown()
+        server.server_close()
+    elapsed = time.perf_counter() - started
+
+    # Compare the end of the run with the point where the bounded state stopped growing;
+    # before that, normal filling of the caps would look like a leak
+    failures = []
+    capacities = state_capacities(max_codes)
+    warm = warm_sample(probe.samples, total_polls, capacities)
+    end = probe.samples[-1]
+    print(f"\nFinished in {elapsed:.1f} s ({total_polls / elapsed:.0f} polls/s)")
+    if warm is None:
+        filling = ", ".join(f"{key} {end[key]}/{capacity}" for key, capacity in capacities.items() if end[key] < capacity)
+        print(f"\nRun too short to check memory, still filling at the end: {filling}; "
+              f"use more --days or a smaller --max-codes")
+        failures.append("run too short for the bounded state to fill up")
+    elif end["poll"] - warm["poll"] < total_polls * MIN_MEASURED_FRACTION:
+        print(f"\nRun too short to check memory: the bounded state filled at poll {warm['poll']} of {total_polls}, "
+              f"less than {MIN_MEASURED_FRACTION:.0%} of the run is left to compare; use more --days")
+        failures.append("run too short after the bounded state filled up")
+    else:
+        print("\nMemory after warm-up (poll {}) vs end (poll {}):".format(warm["poll"], end["poll"]))
+        check_growth("traced Python memory", warm["traced"], end["traced"], MEMORY_GROWTH_LIMIT, MEMORY_GROWTH_SLACK, failures)
+        check_growth("RSS", warm["rss"], end["rss"], RSS_GROWTH_LIMIT, RSS_GROWTH_SLACK, failures)
+    print(f"  dedup state at end: {end['processed_msg_ids']} message IDs, {end['processed_codes']} codes, "
+          f"{end['message_versions']} message versions")
+
+    window = max(1, int(len(probe.latencies) * LATENCY_WINDOW_FRACTION))
+    early = window_percentiles(probe.latencies[int(len(probe.latencies) * WARMUP_FRACTION):][:window])
+    late = window_percentiles(probe.latencies[-window:])
+    print("\nPoll latency early vs late:")
+    for key in ("p50", "p95"):
+        allowed = early[key] * (1 + LATENCY_DRIFT_LIMIT) + LATENCY_DRIFT_SLACK
+        status = "ok" if late[key] <= allowed else "FAIL"
+        print(f"  {key}: {early[key] * 1000:7.2f} ms -> {late[key] * 1000:7.2f} ms (limit {allowed * 1000:.2f} ms) {status}")
+        if late[key] > allowed:
+            failures.append(f"poll latency {key} drifted from {early[key]:.4f} s to {late[key]:.4f} s")
+
+    gc_stats = gc_pauses.stats()
+    status = "ok" if gc_stats["max"] <= GC_PAUSE_LIMIT else "FAIL"
+    print(f"\nGC: {gc_stats['collections']} collections {gc_stats['by_generation']}, "
+          f"total {gc_stats['total'] * 1000:.1f} ms, p99 {gc_stats['p99'] * 1000:.2f} ms, "
+          f"max {gc_stats['max'] * 1000:.2f} ms (limit {GC_PAUSE_LIMIT * 1000:.0f} ms) {status}")
+    if gc_stats["max"] > GC_PAUSE_LIMIT:
+        failures.append(f"GC pause of {gc_stats['max']:.3f} s")
+
+    if failures:
+        print("\nLargest allocations still alive at the end:")
+        for stat in snapshot_end.statistics("lineno")[:10]:
+            print(f"  {stat}")
+
+    report = {
+        "days": days,
+        "messages": total_messages,
+        "polls": total_polls,
+        "seconds": elapsed,
+        "samples": probe.samples,
+        "latency": {"early": early, "late": late},
+        "gc": gc_stats,
+        "failures": failures,
+    }
+    return report, failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Soak-test the monitor loop with days of synthetic traffic')
+    parser.add_argument('--days', type=float, default=DEFAULT_DAYS, help=f'Simulated days of traffic (default: {DEFAULT_DAYS})')
+    parser.add_argument('--messages-per-day', type=int, default=DEFAULT_MESSAGES_PER_DAY,
+                        help=f'Channel messages per simulated day (default: {DEFAULT_MESSAGES_PER_DAY})')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help=f'Messages per poll (default: {PAGE_SIZE})')
+    parser.add_argument('--code-rate', type=float, default=0.05, help='Share of messages carrying a code (default: 0.05)')
+    parser.add_argument('--max-codes', type=int, default=SOAK_MAX_CODES,
+                        help=f'Capacity of the code dedup set during the soak (default: {SOAK_MAX_CODES})')
+    parser.add_argument('--output', type=str, help='Also write the samples and results to this JSON file')
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point"""
+    args = parse_args()
+    output_path = os.path.abspath(args.output) if args.output else None
+
+    # Run inside a scratch directory so the state store and token file stay out of the repo
+    os.chdir(tempfile.mkdtemp(prefix="fellou-soak-"))
+    with open(client.TOKEN_FILE, "w") as f:
+        f.write("soak-token")
+    client.input_code_to_app = bench_hot_paths.stub_entry
+    client.input_codes_to_app = bench_hot_paths.stub_batch_entry
+
+    report, failures = run_soak(args.days, args.messages_per_day, args.page_size, args.code_rate, args.max_codes)
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if failures:
+        print(f"\nSoak test FAILED: {'; '.join(failures)}")
+        return 1
+    print("\nSoak test passed: memory bounded, latency stable")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
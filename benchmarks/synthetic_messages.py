@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Synthetic Discord messages shaped like the real channel API responses
+
+import random
+from datetime import datetime, timedelta, timezone
+
+DISCORD_EPOCH_MS = 1420070400000
+CHANNEL_ID = "1321156950486028378"
+CODE_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+WORDS = [
+    "anyone", "got", "a", "code", "thanks", "please", "new", "drop", "soon", "invite",
+    "used", "taken", "gone", "works", "here", "is", "another", "one", "lol", "gm",
+    "waiting", "for", "the", "next", "batch", "Fellou", "beta", "access", "appreciate", "it",
+]
+# Channel activity for make_stream
+QUIET_RATE = 1 / 30.0  # Messages per second between drops
+DROP_RATE = 2.0  # Messages per second during a drop
+DROP_EVERY = 900.0  # Average seconds between the starts of drops
+DROP_LENGTH = 60.0  # Seconds a drop lasts
+DROP_CODE_RATE = 0.3  # Share of messages carrying a code during a drop
+AUTHORS = [{"id": str(400000000000000000 + i), "username": f"user{i}"} for i in range(500)]
+
+
+def snowflake(ts):
+    """Build a Discord snowflake ID for a datetime"""
+    return str((int(ts.timestamp() * 1000) - DISCORD_EPOCH_MS) << 22)
+
+
+def random_code(rng):
+    return "".join(rng.choice(CODE_CHARS) for _ in range(6))
+
+
+def make_embed(rng, code_rate):
+    """Bot-style embed, sometimes carrying a code in a field"""
+    value = " ".join(rng.choice(WORDS) for _ in range(8))
+    if rng.random() < code_rate * 4:
+        value += f" `{random_code(rng)}`"
+    return {
+        "type": "rich",
+        "title": "New invite codes",
+        "description": " ".join(rng.choice(WORDS) for _ in range(15)),
+        "fields": [{"name": "Code", "value": value, "inline": False}],
+        "footer": {"text": "Fellou bot"},
+    }
+
+
+def make_message(index, rng, start=None, code_rate=0.05, spacing=2.0, embed_rate=0.02, at=None):
+    """Build one message; about `code_rate` of messages contain a code (`at` overrides the spacing)"""
+    start = start or datetime(2025, 3, 1, tzinfo=timezone.utc)
+    ts = start + timedelta(seconds=index * spacing if at is None else at)
+    words = [rng.choice(WORDS) for _ in range(rng.randint(3, 25))]
+    if rng.random() < code_rate:
+        words.insert(rng.randrange(len(words) + 1), random_code(rng))
+    author = AUTHORS[rng.randrange(len(AUTHORS))]
+    embeds = [make_embed(rng, code_rate)] if rng.random() < embed_rate else []
+    msg_id = snowflake(ts)
+    if at is not None:
+        msg_id = str(int(msg_id) | (index & 0xFFF))  # Increment bits keep IDs unique within a millisecond
+    return {
+        "id": msg_id,
+        "type": 0,
+        "content": " ".join(words),
+        "channel_id": CHANNEL_ID,
+        "author": {
+            "id": author["id"],
+            "username": author["username"],
+            "global_name": author["username"].title(),
+            "avatar": None,
+            "discriminator": "0",
+            "public_flags": 0,
+        },
+        "attachments": [],
+        "embeds": embeds,
+        "mentions": [],
+        "mention_roles": [],
+        "pinned": False,
+        "mention_everyone": False,
+        "tts": False,
+        "timestamp": ts.isoformat(),
+        "edited_timestamp": None,
+        "flags": 0,
+        "components": [],
+    }
+
+
+def make_messages(count, seed=1234, code_rate=0.05):
+    """Build `count` messages in posting order (oldest first)"""
+    rng = random.Random(seed)
+    # Space messages out so snowflake IDs stay unique
+    return [make_message(i, rng, code_rate=code_rate, spacing=0.01) for i in range(count)]
+
+
+def make_stream(duration, seed=1234, code_rate=0.01, start=None):
+    """Build a bursty stream over `duration` seconds: quiet chatter with occasional code drops"""
+    rng = random.Random(seed)
+    start = start or datetime(2025, 3, 1, tzinfo=timezone.utc)
+    messages = []
+    t = 0.0
+    drop_ends = 0.0
+    next_drop = rng.expovariate(1 / DROP_EVERY)
+    while True:
+        if t >= next_drop:
+            drop_ends = next_drop + DROP_LENGTH
+            next_drop = drop_ends + rng.expovariate(1 / DROP_EVERY)
+        in_drop = t < drop_ends
+        t += rng.expovariate(DROP_RATE if in_drop else QUIET_RATE)
+        if t >= duration:
+            return messages
+        messages.append(make_message(len(messages), rng, start=start, at=t,
+                                     code_rate=DROP_CODE_RATE if in_drop else code_rate))
+
+
+def make_page(messages):
+    """Order messages like the API does (newest first)"""
+    return list(reversed(messages))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# Activity-adaptive burst polling
+#
+# Code drops come in bursts. The policy keeps a decaying "heat" score fed by
+# new messages and detected codes: while the channel is hot it polls fast with
+# a large page, and as activity dies down it decays back to a slow idle
+# cadence. A sliding-window request budget keeps us under the rate limit no
+# matter how hot the channel gets.
+
+import math
+import time
+from collections import deque
+
+# Configuration
+DEFAULT_IDLE_INTERVAL = 10.0  # Seconds between polls when the channel is quiet
+DEFAULT_BURST_INTERVAL = 1.0  # Seconds between polls during a drop
+IDLE_PAGE_SIZE = 20  # Messages per poll when quiet
+BURST_PAGE_SIZE = 100  # Messages per poll during a drop (API maximum)
+HEAT_HALF_LIFE = 90.0  # Seconds for the heat score to halve without new activity
+MESSAGE_HEAT = 1.0  # Heat added per new message
+CODE_HEAT = 10.0  # Heat added per detected code
+HOT_HEAT = 15.0  # Heat at which we poll at the full burst rate
+RATE_LIMIT_REQUESTS = 5  # Requests allowed...
+RATE_LIMIT_WINDOW = 5.0  # ...per this many seconds
+
+
+class RequestBudget:
+    """Sliding-window request counter for the channel messages route"""
+
+    def __init__(self, max_requests=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW, clock=time.monotonic):
+        self.max_requests = max_requests
+        self.window = window
+        self.clock = clock
+        self.sent = deque()
+
+    def _expire(self, now):
+        while self.sent and self.sent[0] <= now - self.window:
+            self.sent.popleft()
+
+    def record(self):
+        now = self.clock()
+        self._expire(now)
+        self.sent.append(now)
+
+    def earliest_next(self):
+        """Earliest time the next request fits in the budget"""
+        now = self.clock()
+        self._expire(now)
+        if len(self.sent) < self.max_requests:
+            return now
+        return self.sent[0] + self.window
+
+    @property
+    def min_interval(self):
+        """Steady-state poll interval that never exceeds the budget"""
+        return self.window / self.max_requests
+
+
+class AdaptivePollPolicy:
+    """Chooses the poll interval and page size from recent channel activity"""
+
+    def __init__(self, idle_interval=DEFAULT_IDLE_INTERVAL, burst_interval=DEFAULT_BURST_INTERVAL,
+                 idle_page_size=IDLE_PAGE_SIZE, burst_page_size=BURST_PAGE_SIZE,
+                 budget=None, clock=time.monotonic):
+        self.clock = clock
+        self.budget = budget or RequestBudget(clock=clock)
+        self.idle_interval = max(idle_interval, self.budget.min_interval)
+        self.burst_interval = max(burst_interval, self.budget.min_interval)
+        self.idle_page_size = idle_page_size
+        self.burst_page_size = burst_page_size
+        self.heat = 0.0
+        self.heat_updated = clock()
+        self.page_overflow = False
+        self.bursting = False
+        self.observations = 0
+
+    def _decay(self, now):
+        elapsed = now - self.heat_updated
+        if elapsed > 0:
+            self.heat *= math.pow(0.5, elapsed / HEAT_HALF_LIFE)
+            self.heat_updated = now
+
+    def level(self):
+        """Activity level from 0 (idle) to 1 (full burst)"""
+        self._decay(self.clock())
+        return min(1.0, self.heat / HOT_HEAT)
+
+    def observe(self, new_messages, new_codes, page_size_used=None):
+        """Feed the result of one poll into the heat score"""
+        self._decay(self.clock())
+        self.heat += new_messages * MESSAGE_HEAT + new_codes * CODE_HEAT
+        self.observations += 1
+        # A page full of new messages means we may have missed some: go big immediately
+        # (except on the first poll, where every message is new)
+        self.page_overflow = self.observations > 1 and bool(page_size_used) and new_messages >= page_size_used
+        if self.page_overflow:
+            self.heat = max(self.heat, HOT_HEAT)
+
+        bursting = self.level() >= 0.5
+        if bursting != self.bursting:
+            self.bursting = bursting
+            if bursting:
+                print(f"Activity spike: polling every {self.interval():.1f} s with page size {self.page_size()}")
+            else:
+                print(f"Activity decayed: back to polling every {self.interval():.1f} s")
+
+    def interval(self):
+        """Poll interval for the current activity level (geometric between idle and burst)"""
+        level = self.level()
+        return self.idle_interval * math.pow(self.burst_interval / self.idle_interval, level)
+
+    def page_size(self):
+        """Messages to request on the next poll"""
+        if self.page_overflow:
+            return self.burst_page_size
+        level = self.level()
+        return int(round(self.idle_page_size + level * (self.burst_page_size - self.idle_page_size)))
+
+    def record_request(self):
+        self.budget.record()
+
+    def earliest_next_poll(self):
+        return self.budget.earliest_next()
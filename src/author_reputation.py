@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Per-author reputation index for ordering code entry
+#
+# For every author we count the new codes they posted, how many of those were
+# accepted and how many were rejected (false positives: lookalike strings,
+# fake or already used codes). The counts live in memory for the entry queue
+# and every change is written to the state store as an increment, so the
+# index survives restarts and stays correct with several monitors writing.
+# Codes whose outcome is unknown (GUI entry, "submitted") count as posted only.
+
+try:
+    from . import entry_tracking
+    from . import state_store
+except ImportError:
+    import entry_tracking
+    import state_store
+
+# Scoring: smoothed share of judged codes that were accepted, 0.5 for unknown authors
+PRIOR_SUCCESSES = 1
+PRIOR_JUDGED = 2
+FALSE_POSITIVE_LIMIT = 3  # Rejected codes before a mostly-rejected author goes to the back of the queue
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS author_reputation (
+    author_id TEXT PRIMARY KEY,
+    username TEXT,
+    codes_posted INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    false_positives INTEGER NOT NULL DEFAULT 0,
+    last_code_at REAL
+) WITHOUT ROWID;
+"""
+
+
+schema_db = None  # Store the table was last created in
+
+
+def ensure_schema():
+    """Create the author_reputation table if needed"""
+    global schema_db
+    state_store.open_store()
+    if schema_db == state_store.db_path:
+        return
+    with state_store.read_lock, state_store.read_conn:
+        state_store.read_conn.executescript(SCHEMA)
+    schema_db = state_store.db_path
+
+
+def new_author(username=None):
+    return {"username": username, "codes_posted": 0, "successes": 0, "false_positives": 0, "last_code_at": None}
+
+
+class ReputationIndex:
+    """In-memory author counts, persisted incrementally to the state store"""
+
+    def __init__(self):
+        self.authors = {}  # author ID -> counts
+
+    def load(self):
+        """Replace the in-memory index with the stored one; returns the number of authors"""
+        ensure_schema()
+        self.authors = {
+            author_id: {"username": username, "codes_posted": posted, "successes": successes,
+                        "false_positives": false_positives, "last_code_at": last_code_at}
+            for author_id, username, posted, successes, false_positives, last_code_at in state_store.query(
+                "SELECT author_id, username, codes_posted, successes, false_positives, last_code_at FROM author_reputation")
+        }
+        return len(self.authors)
+
+    def clear(self):
+        self.authors.clear()
+
+    def record_codes(self, author_id, username, count, at):
+        """Count new codes posted by an author"""
+        if not author_id or count <= 0:
+            return
+        author = self.authors.setdefault(author_id, new_author(username))
+        author["username"] = username or author["username"]
+        author["codes_posted"] += count
+        author["last_code_at"] = at
+        self._save(author_id, author["username"], at, posted=count)
+
+    def record_result(self, author_id, result):
+        """Count the outcome of entering one of the author's codes"""
+        if not author_id:
+            return
+        if result == entry_tracking.RESULT_SUCCESS:
+            self.authors.setdefault(author_id, new_author())["successes"] += 1
+            self._save(author_id, None, None, successes=1)
+        elif result == entry_tracking.RESULT_FAILURE:
+            self.authors.setdefault(author_id, new_author())["false_positives"] += 1
+            self._save(author_id, None, None, false_positives=1)
+
+    def _save(self, author_id, username, at, posted=0, successes=0, false_positives=0):
+        ensure_schema()
+        state_store.enqueue(
+            "INSERT INTO author_reputation (author_id, username, codes_posted, successes, false_positives, last_code_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (author_id) DO UPDATE SET "
+            "username = COALESCE(excluded.username, username), "
+            "codes_posted = codes_posted + excluded.codes_posted, "
+            "successes = successes + excluded.successes, "
+            "false_positives = false_positives + excluded.false_positives, "
+            "last_code_at = COALESCE(excluded.last_code_at, last_code_at)",
+            (author_id, username, posted, successes, false_positives, at),
+        )
+
+    def score(self, author_id):
+        author = self.authors.get(author_id)
+        if not author:
+            return PRIOR_SUCCESSES / PRIOR_JUDGED
+        judged = author["successes"] + author["false_positives"]
+        return (author["successes"] + PRIOR_SUCCESSES) / (judged + PRIOR_JUDGED)
+
+    def is_false_positive_source(self, author_id):
+        author = self.authors.get(author_id)
+        return bool(author) and author["false_positives"] >= FALSE_POSITIVE_LIMIT and author["false_positives"] > author["successes"]
+
+    def rank(self, author_id):
+        """Sort key: proven posters first, repeated false-positive sources last"""
+        return (self.is_false_positive_source(author_id), -self.score(author_id))
+
+    def order(self, entries):
+        """Sort (message, codes) pairs by their author's rank; ties keep their page order"""
+        return sorted(entries, key=lambda entry: self.rank(entry[0].get("author", {}).get("id", "")))
+
+    def ranked(self):
+        """(author ID, counts) pairs in queue order"""
+        return sorted(self.authors.items(), key=lambda item: (self.rank(item[0]), -item[1]["codes_posted"]))
+
+
+def print_authors(index, limit=None):
+    """Print the reputation index in entry-queue order"""
+    ranked = index.ranked()
+    print(f"\nAuthor Reputation ({len(ranked)} authors, best first):")
+    if not ranked:
+        print("  No codes seen yet")
+    for author_id, author in ranked[:limit]:
+        tag = "  false-positive source" if index.is_false_positive_source(author_id) else ""
+        print(f"  {author['username'] or 'Unknown':<20} {author_id:<20} posted {author['codes_posted']:>4}  "
+              f"success {author['successes']:>3}  false positive {author['false_positives']:>3}  "
+              f"score {index.score(author_id):.2f}{tag}")
+    print("")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# Channel reading state shared by the automatic and the manual client
+#
+# Both clients read the same channel and decide the same way what is new:
+# bounded sets of the message IDs and codes already handled, the edit markers
+# of recent messages, and a cursor persisted per consumer so a restart resumes
+# after the last handled message. On a cold start the backlog on the first
+# page is remembered without acting on it. What a client does with a new code (type it
+# or show it) stays in the client.
+
+import os
+import time
+from collections import OrderedDict
+
+try:
+    from . import dedup
+    from . import entry_tracking
+    from . import retry_policy
+    from . import state_store
+except ImportError:
+    import dedup
+    import entry_tracking
+    import retry_policy
+    import state_store
+
+# Configuration
+MAX_TRACKED_EDITS = 1000  # Edit markers kept, to rescan messages edited after they were seen
+KNOWN_CODE_RETENTION = 30 * 24 * 3600  # Restore handled codes from the last 30 days
+
+
+def user_filter_reason(user_id, ban_list, whitelist):
+    """Return why a user's messages are ignored ("banned" / "not_whitelisted"), or None"""
+    # 1. If whitelist exists (not empty), only process messages from whitelisted users
+    # 2. If whitelist is empty, process messages from all users except those in the ban list
+    if user_id in ban_list:
+        return "banned"
+    if whitelist and user_id not in whitelist:
+        return "not_whitelisted"
+    return None
+
+
+def read_page(result, fingerprint=None, key=None, token_file=None):
+    """Messages from a channel fetch: [] if `fingerprint` has seen the same body, None on errors (reported)"""
+    if result.ok:
+        body = result.response.content
+        # The same bytes as last time cannot hold anything new; skip decoding and processing
+        if fingerprint and fingerprint.unchanged(body, key=key):
+            return []
+        decode_started = time.process_time()
+        try:
+            messages = result.response.json()
+        except ValueError as e:
+            print(f"Unexpected response when fetching messages: {e}")
+            if fingerprint:
+                fingerprint.reset()
+            return None
+        if fingerprint:
+            fingerprint.observe_decode(len(body), time.process_time() - decode_started)
+        return messages
+    if result.error == retry_policy.ERROR_AUTH:
+        print("Token expired or invalid. Please log in again.")
+        # Delete the token file so we can get a new one
+        if token_file and os.path.exists(token_file):
+            os.remove(token_file)
+    elif result.error == retry_policy.ERROR_FORBIDDEN:
+        # Missing channel access or a Cloudflare block: a new login would not help, so keep the token
+        print(f"Access denied by Discord (403), check that this account can read the channel: {result.detail}")
+    elif result.error == retry_policy.ERROR_RATE_LIMITED:
+        print(f"Rate limited by Discord, retry after {result.retry_after:.1f} s")
+    elif result.detail == "circuit breaker open":
+        print(f"Discord API unreachable, next probe in {result.retry_after:.1f} s")
+    else:
+        print(f"Error fetching messages ({result.error}, {result.attempts} attempt(s)): {result.detail}")
+    return None
+
+
+class ChannelState:
+    """Messages and codes one consumer has handled in one channel, persisted to the state store"""
+
+    def __init__(self, channel_id, consumer, extractor):
+        self.channel_id = channel_id
+        self.consumer = consumer  # Cursor owner name, so each client keeps its own position
+        self.extractor = extractor
+        self.processed_msg_ids = dedup.BoundedSet(dedup.MAX_PROCESSED_MESSAGES)
+        self.processed_codes = dedup.BoundedSet(dedup.MAX_PROCESSED_CODES)
+        self.message_versions = OrderedDict()  # message ID -> edited_timestamp when last scanned
+        self.last_cursor_id = 0  # Newest message ID handled by this or a previous run
+        self.warmed_up = False
+
+    def restore(self):
+        """Restore the message cursor and handled codes persisted by earlier runs"""
+        state_store.open_store()
+        cursor = state_store.load_cursor(self.channel_id, self.consumer)
+        if cursor:
+            self.last_cursor_id = int(cursor)
+            print(f"Resuming after message {cursor}")
+        known_codes = state_store.load_known_codes(since=time.time() - KNOWN_CODE_RETENTION)
+        self.processed_codes.update(known_codes)
+        if known_codes:
+            print(f"Restored {len(known_codes)} previously handled codes")
+
+    def is_before_cursor(self, msg_id):
+        """Check if a message was already handled by a previous run"""
+        return bool(self.last_cursor_id) and str(msg_id).isdigit() and int(msg_id) <= self.last_cursor_id
+
+    def advance_cursor(self, messages):
+        """Persist the newest message ID of a processed page"""
+        newest = max((int(m["id"]) for m in messages if str(m.get("id", "")).isdigit()), default=0)
+        if newest > self.last_cursor_id:
+            self.last_cursor_id = newest
+            state_store.record_cursor(self.channel_id, self.consumer, newest)
+
+    def warm_up(self, messages, received_at, act_on_age, author_filter):
+        """Seed the dedup state from the first page after startup; returns (messages recent enough to act on, codes skipped)"""
+        self.warmed_up = True
+        if act_on_age < 0:
+            return messages, 0
+        recent = []
+        skipped_messages = skipped_codes = 0
+        for msg in messages:
+            msg_id = msg.get("id")
+            posted_at = entry_tracking.message_time(msg)
+            if (msg_id in self.processed_msg_ids or self.is_before_cursor(msg_id) or posted_at is None
+                    or received_at - posted_at <= act_on_age):
+                recent.append(msg)
+                continue
+            # Backlog: remember the message and its codes without acting on them
+            skipped_messages += 1
+            self.processed_msg_ids.add(msg_id)
+            self.remember_version(msg)
+            if not author_filter(msg.get("author", {}).get("id", "")):
+                for hit in self.extractor.extract(msg, author_filter=author_filter):
+                    if hit.code not in self.processed_codes:
+                        self.processed_codes.add(hit.code)
+                        skipped_codes += 1
+        if skipped_messages:
+            print(f"Cold start: skipped {skipped_messages} backlog messages older than {act_on_age:g} s "
+                  f"({skipped_codes} codes ignored)")
+        return recent, skipped_codes
+
+    def remember_version(self, msg):
+        """Track the edit marker of a recent message (bounded to the newest MAX_TRACKED_EDITS)"""
+        self.message_versions[msg.get("id")] = msg.get("edited_timestamp")
+        self.message_versions.move_to_end(msg.get("id"))
+        while len(self.message_versions) > MAX_TRACKED_EDITS:
+            self.message_versions.popitem(last=False)
+
+    def was_edited(self, msg):
+        """Check if a tracked message was edited since it was last scanned"""
+        msg_id = msg.get("id")
+        return msg_id in self.message_versions and self.message_versions[msg_id] != msg.get("edited_timestamp")
+
+    def edited_code_hits(self, msg, author_filter):
+        """Remember the new version of an edited message and return the code hits the edit added"""
+        self.remember_version(msg)
+        if author_filter(msg.get("author", {}).get("id", "")):
+            return []
+        code_hits = [hit for hit in self.extractor.extract(msg, author_filter=author_filter)
+                     if hit.code not in self.processed_codes]
+        if code_hits:
+            print(f"\nMessage {msg.get('id')} from {msg.get('author', {}).get('username', 'Unknown')} was edited at {msg.get('edited_timestamp')}:")
+            print(f"Content: {msg.get('content', '')}")
+            print(f"Found invite code(s) added by the edit: {', '.join(f'{hit.code} ({hit.field}, {hit.pattern})' for hit in code_hits)}")
+        return code_hits
+
+    def record_code(self, code, outcome, msg, detected_at=None, entered_at=None, duration=None):
+        """Mark a code from a message handled and persist its outcome"""
+        self.processed_codes.add(code)
+        state_store.record_code(code, outcome, self.channel_id, msg.get("id"), msg.get("author", {}).get("id", ""),
+                                detected_at, entered_at, duration)
+
+    def claim(self, code, hub_client, msg, detected_at):
+        """Claim a new code at the fetcher hub, if one is used; False if another local consumer is entering it"""
+        if hub_client and not hub_client.claim(code):
+            self.record_code(code, "claimed_elsewhere", msg, detected_at)
+            return False
+        return True
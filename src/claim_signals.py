@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Claimed-code signals from the channel
+#
+# Shortly after a code is posted, other users reply "taken", "used" or "gone",
+# usually as a Discord reply to the code message or quoting the code. Entering
+# such a code only costs seconds of typing, so the monitor checks the queued
+# codes against these signals right before entry starts and drops the ones
+# reported as claimed.
+
+import re
+from collections import OrderedDict
+
+try:
+    from . import dedup
+except ImportError:
+    import dedup
+
+# Configuration
+CLAIM_PATTERN = r'\b(?:taken|used|gone|claimed|redeemed|expired|dead)\b'  # Words that report a code as claimed
+MAX_TRACKED_CODES = 2000  # Recently posted codes a claim can refer to
+MAX_CLAIMED_CODES = 5000
+
+
+def snowflake(msg_id):
+    return int(msg_id) if str(msg_id).isdigit() else 0
+
+
+class ClaimWatch:
+    """Remembers which message posted which code and collects codes reported as claimed"""
+
+    def __init__(self, extractor, pattern=CLAIM_PATTERN):
+        self.extractor = extractor
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.posted = OrderedDict()  # code -> ID of the message that posted it
+        self.message_codes = OrderedDict()  # message ID -> codes it posted
+        self.claimed = dedup.BoundedSet(MAX_CLAIMED_CODES)
+
+    def remember(self, msg, codes):
+        """Record the codes a message posted, so later replies can refer to them"""
+        msg_id = msg.get("id")
+        self.message_codes[msg_id] = list(codes)
+        self.message_codes.move_to_end(msg_id)
+        for code in codes:
+            # Pages come newest first; the oldest message with the code is the one that posted it
+            if code not in self.posted or snowflake(msg_id) < snowflake(self.posted[code]):
+                self.posted[code] = msg_id
+        while len(self.message_codes) > MAX_TRACKED_CODES:
+            self.message_codes.popitem(last=False)
+        while len(self.posted) > MAX_TRACKED_CODES:
+            self.posted.popitem(last=False)
+
+    def is_claim(self, msg):
+        return bool(self.regex.search(msg.get("content") or ""))
+
+    def referenced_codes(self, msg, author_filter=None):
+        """Codes a claim message refers to: the codes of the message it replies to, or codes it quotes"""
+        msg_id = msg.get("id")
+        codes = []
+        reference = (msg.get("message_reference") or {}).get("message_id")
+        if reference in self.message_codes:
+            codes.extend(self.message_codes[reference])
+        for hit in self.extractor.extract(msg, author_filter=author_filter):
+            # A quoted code must have been posted by another message; "code XYZ, will be gone fast" is not a claim
+            if hit.field.startswith("reply.") or self.posted.get(hit.code, msg_id) != msg_id:
+                codes.append(hit.code)
+        return codes
+
+    def scan(self, messages, author_filter=None):
+        """Collect claimed codes from a page; returns the codes newly reported as claimed
+
+        author_filter(user_id) returns why a user is ignored (like check_user_filters) or None;
+        claims by ignored users are not counted.
+        """
+        found = []
+        for msg in messages or ():
+            if not self.is_claim(msg):
+                continue
+            if author_filter and author_filter((msg.get("author") or {}).get("id", "")):
+                continue
+            for code in self.referenced_codes(msg, author_filter):
+                if code not in self.claimed:
+                    self.claimed.add(code)
+                    found.append(code)
+        return found
+
+    def is_claimed(self, code):
+        return code in self.claimed
+
+    def clear(self):
+        self.posted.clear()
+        self.message_codes.clear()
+        self.claimed.clear()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# Multi-source invite code extraction
+#
+# Scans every text-bearing field of a message (content, code blocks, embed
+# titles/descriptions/fields/footers, replied-to and forwarded messages) with
+# a set of named patterns compiled into one combined regex. Each hit records
+# which field and which pattern produced it.
+
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+# Extra code formats on top of the client's INVITE_PATTERN.
+# (name, regex, normalize) - a regex may mark the code part with (?P<code>...);
+# normalize turns the matched text into the canonical code.
+EXTRA_PATTERNS = [
+    # Codes split for readability, e.g. "CDN-Q4Q"
+    ("dashed", r'(?<![A-Z0-9-])(?P<code>[A-Z0-9]{3}-[A-Z0-9]{3})(?![A-Z0-9-])', lambda text: text.replace("-", "")),
+]
+
+# Every pattern's match starts with one of these characters. Putting this
+# lookahead in front of the combined regex lets the regex engine skip ahead to
+# candidate positions instead of trying each alternative at every character.
+CODE_FIRST_CHARS = r'[A-Z0-9]'
+
+CodeHit = namedtuple("CodeHit", ["code", "field", "pattern"])
+
+# Distinct texts whose matches are remembered. Reposts, copy-paste spam and
+# duplicate announcements repeat the same text, which then costs one lookup.
+CACHE_SIZE = 4096
+
+CODE_SPAN_RE = re.compile(r'```.*?```|`[^`\n]+`', re.DOTALL)
+
+
+def author_id(msg):
+    return (msg.get("author") or {}).get("id", "")
+
+
+def text_fields(msg, prefix="", author_filter=None):
+    """Yield (field name, text) for every text-bearing part of a message
+
+    author_filter(user_id) returns why a user is ignored (like check_user_filters) or None;
+    replied-to and forwarded messages of ignored users are left out.
+    """
+    content = msg.get("content")
+    if content:
+        yield prefix + "content", content
+    for i, embed in enumerate(msg.get("embeds") or ()):
+        name = f"{prefix}embeds[{i}]"
+        for key in ("title", "description"):
+            if embed.get(key):
+                yield f"{name}.{key}", embed[key]
+        for j, field in enumerate(embed.get("fields") or ()):
+            if field.get("name"):
+                yield f"{name}.fields[{j}].name", field["name"]
+            if field.get("value"):
+                yield f"{name}.fields[{j}].value", field["value"]
+        if (embed.get("footer") or {}).get("text"):
+            yield f"{name}.footer", embed["footer"]["text"]
+        if (embed.get("author") or {}).get("name"):
+            yield f"{name}.author", embed["author"]["name"]
+    if not prefix:
+        # Replies carry the message they answer; forwards carry snapshots
+        referenced = msg.get("referenced_message")
+        if referenced and not (author_filter and author_filter(author_id(referenced))):
+            yield from text_fields(referenced, "reply.")
+        for i, snapshot in enumerate(msg.get("message_snapshots") or ()):
+            forwarded = snapshot.get("message") or {}
+            # Snapshots usually carry no author; then the forwarder, who passed the filter, vouches for them
+            if forwarded.get("author") and author_filter and author_filter(author_id(forwarded)):
+                continue
+            yield from text_fields(forwarded, f"forward[{i}].")
+
+
+class ScanCache:
+    """Thread-safe LRU cache from a text to its matches, shared by every channel using the extractor"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # text -> (field scanned as, hits)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text):
+        with self.lock:
+            entry = self.entries.get(text)
+            if entry is not None:
+                self.entries.move_to_end(text)
+                self.hits += 1
+            return entry
+
+    def put(self, text, field, hits):
+        with self.lock:
+            self.misses += 1
+            self.entries[text] = (field, tuple(hits))
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"Extraction cache: {stats['hit_rate']:.0%} hit rate ({stats['hits']} hits, {stats['misses']} misses), "
+                f"{stats['size']}/{self.maxsize} texts, {stats['evictions']} evicted")
+
+
+class CodeExtractor:
+    """Named code patterns compiled into one combined matcher"""
+
+    def __init__(self, patterns, first_chars=CODE_FIRST_CHARS, cache_size=CACHE_SIZE):
+        self.normalizers = {}
+        self.code_groups = {}
+        parts = []
+        for name, regex, *rest in patterns:
+            self.normalizers[name] = rest[0] if rest else None
+            # Give each pattern's inner code group a unique name
+            if "(?P<code>" in regex:
+                regex = regex.replace("(?P<code>", f"(?P<{name}__code>")
+                self.code_groups[name] = f"{name}__code"
+            parts.append(f"(?P<{name}>{regex})")
+        self.pattern_names = list(self.normalizers)
+        combined = "|".join(parts)
+        if first_chars:
+            combined = f"(?={first_chars})(?:{combined})"
+        self.regex = re.compile(combined)
+        self.cache = ScanCache(cache_size) if cache_size else None
+
+    def scan_text(self, text, field="content"):
+        """Return the hits in one piece of text"""
+        cache = self.cache
+        if cache is None:
+            return self.match_text(text, field)
+        entry = cache.get(text)
+        if entry is None:
+            hits = self.match_text(text, field)
+            cache.put(text, field, hits)
+            return hits
+        cached_field, hits = entry
+        if cached_field == field or not hits:
+            return list(hits)
+        # Same text seen in another field (e.g. quoted in a reply): keep the ".code_block" suffixes
+        return [hit._replace(field=field + hit.field[len(cached_field):]) for hit in hits]
+
+    def match_text(self, text, field="content"):
+        """Run the patterns over one piece of text (uncached)"""
+        hits = []
+        spans = None
+        for match in self.regex.finditer(text):
+            name = match.lastgroup
+            code = match.group(self.code_groups.get(name, name))
+            normalize = self.normalizers.get(name)
+            if normalize:
+                code = normalize(code)
+            hit_field = field
+            if "`" in text:
+                if spans is None:
+                    spans = [m.span() for m in CODE_SPAN_RE.finditer(text)]
+                if any(start <= match.start() < end for start, end in spans):
+                    hit_field = f"{field}.code_block"
+            hits.append(CodeHit(code, hit_field, name))
+        return hits
+
+    def find_codes(self, text):
+        """Codes in a piece of text, in order of appearance (no field info)"""
+        if not text:
+            return []
+        return [hit.code for hit in self.scan_text(text)]
+
+    def extract(self, msg, author_filter=None):
+        """Return the hits across all fields of a message, one per distinct code (see text_fields for author_filter)"""
+        hits = []
+        seen = set()
+        for field, text in text_fields(msg, author_filter=author_filter):
+            for hit in self.scan_text(text, field):
+                if hit.code not in seen:
+                    seen.add(hit.code)
+                    hits.append(hit)
+        return hits
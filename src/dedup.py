@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# Bounded dedup sets for long-running monitors
+#
+# The monitor remembers message IDs and codes it has handled so it never
+# processes them twice. A plain set grows for as long as the process runs;
+# BoundedSet keeps only the most recently added items. Message IDs older than
+# a few pages are already excluded by the saved cursor, and codes older than
+# the known-code retention are not expected to come back, so forgetting the
+# oldest entries is safe.
+
+from collections import OrderedDict
+
+# Default capacities
+MAX_PROCESSED_MESSAGES = 5000  # Far more than the 100 messages one poll can return
+MAX_PROCESSED_CODES = 50000  # Several weeks of codes at busy-channel rates
+
+
+class BoundedSet:
+    """Set that forgets its oldest items beyond `maxlen` (insertion order, re-adding refreshes)"""
+
+    def __init__(self, maxlen, items=()):
+        self.maxlen = maxlen
+        self.items = OrderedDict()
+        self.evicted = 0
+        self.update(items)
+
+    def add(self, item):
+        items = self.items
+        if item in items:
+            items.move_to_end(item)
+            return
+        items[item] = None
+        if len(items) > self.maxlen:
+            items.popitem(last=False)
+            self.evicted += 1
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def discard(self, item):
+        self.items.pop(item, None)
+
+    def clear(self):
+        self.items.clear()
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __repr__(self):
+        return f"BoundedSet({len(self.items)}/{self.maxlen})"
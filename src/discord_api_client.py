@@ -1,18 +1,54 @@
 #!/usr/bin/env python3
 # Discord API Client for fetching messages from a specific channel
 
-import requests
 import json
 import os
 import time
-import re
 import pyautogui
 import subprocess
 import sys
 import argparse
+import contextlib
 import platform
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+try:
+    from . import adaptive_polling
+    from . import author_reputation
+    from . import channel_state
+    from . import claim_signals
+    from . import code_extraction
+    from . import drop_schedule
+    from . import entry_watchdog
+    from . import entry_tracking
+    from . import fetcher_hub
+    from . import local_ipc
+    from . import method_ranking
+    from . import monitor_control
+    from . import page_fingerprint
+    from . import poll_scheduler
+    from . import profiling
+    from . import retry_policy
+    from . import state_store
+    from . import submission_sinks
+except ImportError:
+    import adaptive_polling
+    import author_reputation
+    import channel_state
+    import claim_signals
+    import code_extraction
+    import drop_schedule
+    import entry_watchdog
+    import entry_tracking
+    import fetcher_hub
+    import local_ipc
+    import method_ranking
+    import monitor_control
+    import page_fingerprint
+    import poll_scheduler
+    import profiling
+    import retry_policy
+    import state_store
+    import submission_sinks
 
 # Get the operating system
 OPERATING_SYSTEM = platform.system()  # 'Windows', 'Darwin' (macOS), or 'Linux'
@@ -21,9 +57,12 @@ OPERATING_SYSTEM = platform.system()  # 'Windows', 'Darwin' (macOS), or 'Linux'
 TARGET_GUILD_ID = "1320757665118556160"
 TARGET_CHANNEL_ID = "1321156950486028378"
 CHANNEL_URL = f"https://discord.com/channels/{TARGET_GUILD_ID}/{TARGET_CHANNEL_ID}"
+DISCORD_API_BASE = "https://discord.com/api/v9"  # Overridden by the benchmarks to point at a mock server
 TARGET_APP_NAME = "Fellou"  # App where invite codes will be entered
 # Updated regex pattern to match only 6-character uppercase alphanumeric codes that appear as separate words
 INVITE_PATTERN = r'\b[A-Z0-9]{6}\b'  # Pattern to match codes like "CDNQ4Q", "6QYAUV", etc.
+# More code formats can be added to EXTRA_PATTERNS in code_extraction.py
+EXTRACTOR = code_extraction.CodeExtractor([("plain", INVITE_PATTERN)] + code_extraction.EXTRA_PATTERNS)
 
 # User filter lists
 # Ban list: Messages from these user IDs will be ignored (add user IDs as strings)
@@ -45,34 +84,110 @@ CURRENT_USER_ID = ""  # Fill this with your user ID if you want to auto-whitelis
 # If you have a token, you can set it here. Otherwise, it will prompt for login
 TOKEN_FILE = "discord_token.txt"
 
-# Keep track of processed messages/codes
-processed_msg_ids = set()
-processed_codes = set()
-
-# Create a session with retry logic
-def create_session_with_retries(retries=5, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)):
-    """Create a requests session with retry logic"""
-    session = requests.Session()
-    retry = Retry(
-        total=retries,
-        read=retries,
-        connect=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=status_forcelist,
-        allowed_methods=frozenset(['GET', 'POST']),
-        raise_on_status=False
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    return session
+# Pause between the keys that fill in the code form (seconds); benchmarks/entry_rig.py times other values
+ENTRY_KEY_DELAY = 0.5
+PASTE_SETTLE = 0.1  # Least wait after a paste before the clipboard is restored
+
+# Entry mode: "auto" follows the learned method order, "type" and "paste" put those methods first
+ENTRY_MODE_AUTO = "auto"
+ENTRY_MODE_TYPE = "type"
+ENTRY_MODE_PASTE = "paste"
+ENTRY_MODES = [ENTRY_MODE_AUTO, ENTRY_MODE_TYPE, ENTRY_MODE_PASTE]
+ENTRY_MODE = ENTRY_MODE_AUTO
+
+# Limits for external entry commands (osascript, PowerShell), so a stuck dialog cannot freeze the monitor
+ACTIVATE_TIMEOUT = 5.0  # Bringing the app forward or checking that it runs
+FORM_SCRIPT_TIMEOUT = 15.0  # One code typed by AppleScript (about 4 s of delays); batches get this per code
+ENTRY_ABANDONED = "abandoned"  # Entry method recorded for entries cut off by a timeout or the watchdog
+
+# Functions that get wall-time counters in --profile mode
+PROFILED_FUNCTIONS = ["get_channel_messages", "process_messages", "input_code_to_app", "input_code_gui", "input_code_macos", "input_code_windows"]
+
+# Print schedule jitter every this many polls
+JITTER_REPORT_EVERY = 60
+
+# Cold start: on the first page after startup only messages younger than this are acted on
+ACT_ON_AGE = 60.0  # Seconds; negative = act on the whole first page
+
+# "Taken"/"used" replies cancel queued entries of the codes they refer to (see claim_signals.py)
+CLAIM_WATCH = claim_signals.ClaimWatch(EXTRACTOR)
+CLAIM_RECHECK_AFTER = 3.0  # Seconds of entry after which the newest messages are fetched again before the next entry
+CLAIM_RECHECK_PAGE = 10  # Messages fetched for that check
+DEFAULT_ENTRY_TIME = 2.5  # Seconds per code assumed before any entry has been timed
+claim_recheck = None  # Set by monitor_channel: fetches the newest messages between entries
+
+# Counters for the running monitor
+monitor_stats = {
+    "polls": 0,
+    "new_messages": 0,
+    "codes_found": 0,
+    "edits_rescanned": 0,
+    "codes_from_edits": 0,
+    "entry_batches": 0,
+    "backlog_codes_skipped": 0,
+    "entries_cancelled": 0,
+    "entry_time_reclaimed": 0.0,
+    "claim_rechecks": 0,
+}
+
+# Shared retry policy (one keep-alive session, circuit breaker, adaptive timeouts)
+HTTP_POLICY = retry_policy.RetryPolicy()
+last_fetch_result = None  # Outcome of the latest get_channel_messages() call
+PAGE_FINGERPRINT = page_fingerprint.PageFingerprint()  # Skips pages identical to the previous one
+RECHECK_FINGERPRINT = page_fingerprint.PageFingerprint()  # Same for claim rechecks, so they do not replace the poll's page
+
+# Runs the entry commands with timeouts and notices polls that hang (see entry_watchdog.py)
+WATCHDOG = entry_watchdog.EntryWatchdog()
+
+# Which GUI entry method works on this machine, learned across runs (see method_ranking.py)
+METHOD_RANKING = method_ranking.MethodRanking(OPERATING_SYSTEM)
+
+# Connection to a local fetcher hub (set when running with --hub)
+HUB_CLIENT = None
+
+# Handled messages and codes and the saved cursor of this client (see channel_state.py and state_store.py)
+STATE_CONSUMER = "auto-entry"  # Cursor owner name, so each client keeps its own position
+STATE = channel_state.ChannelState(TARGET_CHANNEL_ID, STATE_CONSUMER, EXTRACTOR)
+
+# Per-author yield, used to order the entry queue (see author_reputation.py)
+REPUTATION = author_reputation.ReputationIndex()
+
+# Time-of-week drop history for --predictive polling (see drop_schedule.py)
+DROP_SCHEDULE = drop_schedule.DropSchedule()
+BACKFILL_PAGE_SIZE = 100  # Messages per request when backfilling the drop history
+
+# Where codes get entered (see submission_sinks.py); GUI automation unless --sink says otherwise
+SUBMISSION_SINK = None
+
+# Control of a running monitor (set with --daemon, see monitor_control.py)
+MONITOR_CONTROL = None
+latency_histograms = {
+    "fetch": monitor_control.LatencyHistogram(),  # get_channel_messages
+    "process": monitor_control.LatencyHistogram(),  # process_messages, including code entry
+    "entry": monitor_control.LatencyHistogram(),  # Entry time per code
+}
 
 # Parse command line arguments
 def parse_args():
     parser = argparse.ArgumentParser(description='Discord API Client')
     parser.add_argument('--test', action='store_true', help='Test code input functionality')
     parser.add_argument('--code', type=str, help='Specific code to test with --test mode')
-    parser.add_argument('--interval', type=int, default=5, help='Polling interval in seconds (default: 5)')
+    parser.add_argument('--interval', type=float, default=5, help='Polling interval in seconds, fractions allowed (default: 5)')
+    parser.add_argument('--adaptive', action='store_true', help='Poll faster with bigger pages during code drops, use --interval as the idle cadence')
+    parser.add_argument('--act-on-age', type=float, default=ACT_ON_AGE,
+                        help=f'On startup, only enter codes from messages younger than this many seconds (default: {ACT_ON_AGE:g}, negative = all)')
+    parser.add_argument('--burst-interval', type=float, default=adaptive_polling.DEFAULT_BURST_INTERVAL,
+                        help=f'Fastest polling interval in --adaptive mode (default: {adaptive_polling.DEFAULT_BURST_INTERVAL})')
+    
+    # Predictive polling from past drop times
+    parser.add_argument('--predictive', action='store_true',
+                        help='Poll at --burst-interval in hot windows learned from past drops (and --hot-window), at --interval otherwise')
+    parser.add_argument('--hot-window', type=str, action='append', default=[],
+                        help='Add a hot window, e.g. "Fri 18:00-20:00", "Mon-Fri 12:00-13:00" or "daily 20:00-21:00" (UTC, repeatable)')
+    parser.add_argument('--no-learned-schedule', action='store_true', help='Use only the --hot-window windows, not the learned ones')
+    parser.add_argument('--show-schedule', action='store_true', help='Show the weekly drop histogram and hot windows and exit')
+    parser.add_argument('--backfill', type=int, metavar='PAGES',
+                        help=f'Learn drop times from this many pages ({BACKFILL_PAGE_SIZE} messages each) of channel history and exit')
     
     # User filtering options
     parser.add_argument('--ban', type=str, help='Add a user ID to the ban list')
@@ -80,6 +195,45 @@ def parse_args():
     parser.add_argument('--whitelist', type=str, help='Add a user ID to the whitelist')
     parser.add_argument('--unwhitelist', type=str, help='Remove a user ID from the whitelist')
     parser.add_argument('--list-filters', action='store_true', help='List current ban list and whitelist')
+    parser.add_argument('--list-authors', action='store_true', help='List code posters by reputation (codes posted, successes, false positives)')
+    
+    # Entry outcome reporting
+    parser.add_argument('--report', action='store_true', help='Show code entry success rate by code age and exit')
+    parser.add_argument('--report-plot', type=str, help='Also save the success-rate chart to this image file (needs matplotlib)')
+    parser.add_argument('--entry-mode', choices=ENTRY_MODES, default=ENTRY_MODE_AUTO,
+                        help='GUI entry: learned method order (auto), typing first (type) or pasting from the clipboard first (paste)')
+    parser.add_argument('--entry-methods', action='store_true', help='Show the GUI entry methods in their learned order and exit')
+    parser.add_argument('--reset-entry-methods', action='store_true',
+                        help='Forget the learned entry method order (e.g. after granting accessibility permissions) and exit')
+    
+    # Profiling
+    parser.add_argument('--profile', action='store_true', help='Profile the monitor run and print a summary on exit')
+    parser.add_argument('--profile-window', type=float, default=profiling.DEFAULT_WINDOW,
+                        help=f'Seconds of deterministic profiling before switching to sampling (default: {profiling.DEFAULT_WINDOW}, 0 = sampling only)')
+    parser.add_argument('--profile-interval', type=float, default=profiling.DEFAULT_SAMPLE_INTERVAL,
+                        help=f'Seconds between stack samples (default: {profiling.DEFAULT_SAMPLE_INTERVAL})')
+    parser.add_argument('--profile-output', type=str, default=profiling.DEFAULT_OUTPUT,
+                        help=f'Prefix of the profile stats files (default: {profiling.DEFAULT_OUTPUT})')
+    parser.add_argument('--profile-top', type=int, default=profiling.DEFAULT_TOP, help='Lines in the profile summary')
+    
+    # Shared fetcher hub
+    parser.add_argument('--hub', action='store_true', help='Receive messages from a running fetcher hub instead of polling Discord')
+    
+    # Daemon mode and control of a running daemon
+    parser.add_argument('--daemon', action='store_true', help='Listen on a control socket so the running monitor can be changed without a restart')
+    parser.add_argument('--control-socket', type=str, default=monitor_control.CONTROL_SOCKET_PATH,
+                        help=f'Control socket path (default: {monitor_control.CONTROL_SOCKET_PATH})')
+    parser.add_argument('--pause', action='store_true', help='Pause polling in the running daemon')
+    parser.add_argument('--resume', action='store_true', help='Resume polling in the running daemon')
+    parser.add_argument('--set-interval', type=float, help='Change the polling interval of the running daemon')
+    parser.add_argument('--stats', action='store_true', help='Print the counters of the running daemon')
+    parser.add_argument('--histograms', action='store_true', help='Print the latency histograms of the running daemon')
+    parser.add_argument('--flush', action='store_true', help='Make the running daemon write its state to disk now')
+    
+    # Submission sink
+    parser.add_argument('--sink', choices=submission_sinks.SINK_NAMES, default=submission_sinks.SINK_GUI,
+                        help='Where to enter codes: gui automation or an http redemption endpoint (default: gui)')
+    parser.add_argument('--redeem-url', type=str, help='Redemption endpoint for --sink http (receives POST {"code": ...})')
     
     return parser.parse_args()
 
@@ -101,7 +255,7 @@ def login_to_discord(email, password):
     print("Attempting to login to Discord via API...")
     
     # Discord login API endpoint
-    url = "https://discord.com/api/v9/auth/login"
+    url = f"{DISCORD_API_BASE}/auth/login"
     
     # Prepare login data
     data = {
@@ -119,13 +273,15 @@ def login_to_discord(email, password):
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
     }
     
-    # Create a session with retry logic
-    session = create_session_with_retries()
+    # Send login request under the shared retry policy (5xx answers are retried, others returned as they are)
+    result = HTTP_POLICY.request("POST", url, deadline=retry_policy.LOGIN_DEADLINE, json=data, headers=headers)
+    if result.response is None:
+        print(f"Connection error during login: {result.detail}")
+        print("This might be a temporary issue. Please try again in a few minutes.")
+        return None
+    response = result.response
     
     try:
-        # Send login request
-        response = session.post(url, json=data, headers=headers, timeout=15)
-        
         # Check if login was successful
         if response.status_code == 200:
             token = response.json().get("token")
@@ -141,7 +297,7 @@ def login_to_discord(email, password):
             code = input("Enter your 2FA code: ")
             
             # Submit 2FA code
-            mfa_url = "https://discord.com/api/v9/auth/mfa/totp"
+            mfa_url = f"{DISCORD_API_BASE}/auth/mfa/totp"
             mfa_data = {
                 "code": code,
                 "ticket": ticket,
@@ -149,9 +305,10 @@ def login_to_discord(email, password):
                 "gift_code_sku_id": None
             }
             
-            mfa_response = session.post(mfa_url, json=mfa_data, headers=headers, timeout=15)
+            mfa_response = HTTP_POLICY.request("POST", mfa_url, deadline=retry_policy.LOGIN_DEADLINE,
+                                               json=mfa_data, headers=headers).response
             
-            if mfa_response.status_code == 200:
+            if mfa_response is not None and mfa_response.status_code == 200:
                 token = mfa_response.json().get("token")
                 if token:
                     print("2FA login successful!")
@@ -160,10 +317,6 @@ def login_to_discord(email, password):
         
         print(f"Login failed: {response.status_code} - {response.text}")
         return None
-    except requests.exceptions.ConnectionError as e:
-        print(f"Connection error during login: {e}")
-        print("This might be a temporary issue. Please try again in a few minutes.")
-        return None
     except Exception as e:
         print(f"Error during login: {e}")
         return None
@@ -177,6 +330,10 @@ def get_user_token():
             user_id, _ = get_current_user_info(token)
             if user_id:
                 return token
+            # Only a rejected token needs a new login, not a network problem
+            if last_fetch_result is not None and last_fetch_result.error != retry_policy.ERROR_AUTH:
+                print("Could not validate the saved token right now, using it anyway")
+                return token
     
     # If no token file or token is invalid, prompt for login
     print("Discord token not found or invalid. Please log in:")
@@ -185,9 +342,9 @@ def get_user_token():
     
     return login_to_discord(email, password)
 
-def get_channel_messages(token, limit=50, before=None):
-    """Fetch messages from the target Discord channel"""
-    url = f"https://discord.com/api/v9/channels/{TARGET_CHANNEL_ID}/messages"
+def get_channel_messages(token, limit=50, before=None, fingerprint=None):
+    """Fetch messages from the target Discord channel (fingerprint: PageFingerprint to use, PAGE_FINGERPRINT by default)"""
+    url = f"{DISCORD_API_BASE}/channels/{TARGET_CHANNEL_ID}/messages"
     
     # Set query parameters
     params = {"limit": limit}
@@ -201,87 +358,75 @@ def get_channel_messages(token, limit=50, before=None):
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
     }
     
-    # Create a session with retry logic
-    session = create_session_with_retries()
+    # Make request to Discord API under the shared retry policy (never sleeps past the poll deadline)
+    global last_fetch_result
+    result = HTTP_POLICY.request("GET", url, params=params, headers=headers)
+    last_fetch_result = result
     
-    # Make request to Discord API with error handling
-    try:
-        response = session.get(url, params=params, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 401:
-            print("Token expired or invalid. Please log in again.")
-            # Delete the token file so we can get a new one
-            if os.path.exists(TOKEN_FILE):
-                os.remove(TOKEN_FILE)
-            return None
-        else:
-            print(f"Error fetching messages: {response.status_code} - {response.text}")
-            return None
-            
-    except requests.exceptions.ConnectionError as e:
-        print(f"Connection error occurred: {e}")
-        print("This might be a temporary network issue or Discord API rate limiting")
-        print("Waiting 10 seconds before retrying...")
-        time.sleep(10)
-        return None
-    except requests.exceptions.Timeout:
-        print("Request timed out. Discord API might be slow or unavailable.")
-        print("Waiting 10 seconds before retrying...")
-        time.sleep(10)
-        return None
-    except Exception as e:
-        print(f"Unexpected error when fetching messages: {e}")
-        print("Waiting 5 seconds before retrying...")
-        time.sleep(5)
-        return None
+    return channel_state.read_page(result, fingerprint or PAGE_FINGERPRINT, key=(limit, before), token_file=TOKEN_FILE)
 
 def find_invite_codes(content):
     """Find potential invite codes in message content"""
     if not content:
         return []
     
-    return re.findall(INVITE_PATTERN, content)
+    return EXTRACTOR.find_codes(content)
+
+def check_user_filters(user_id):
+    """Return why a user's messages are ignored ("banned" / "not_whitelisted"), or None"""
+    return channel_state.user_filter_reason(user_id, BAN_LIST, WHITELIST)
 
-def process_messages(messages):
-    """Process messages to find and use invite codes"""
+def process_messages(messages, clock=time.monotonic):
+    """Process messages to find and use invite codes (clock times the claim rechecks, injectable for simulations)"""
     if not messages:
         return
     
+    # Time the page arrived, used to measure how long codes wait before entry
+    received_at = time.time()
+    
     # Add current user to whitelist if specified and not already there
     if CURRENT_USER_ID and CURRENT_USER_ID not in WHITELIST:
         WHITELIST.append(CURRENT_USER_ID)
         print(f"Auto-whitelisted current user ID: {CURRENT_USER_ID}")
     
+    # Don't replay the backlog on the first page after startup
+    if not STATE.warmed_up:
+        messages, skipped_codes = STATE.warm_up(messages, received_at, ACT_ON_AGE, author_filter=check_user_filters)
+        monitor_stats["backlog_codes_skipped"] += skipped_codes
+    
+    entry_queue = []  # (message, codes) in page order
     for msg in messages:
-        # Skip if we've already processed this message
+        # Skip if we've already processed this message, unless it was edited since
         msg_id = msg.get("id")
-        if msg_id in processed_msg_ids:
+        if msg_id in STATE.processed_msg_ids:
+            if STATE.was_edited(msg):
+                rescan_edited_message(msg, received_at)
+            continue
+        
+        # Skip messages already handled before a restart
+        if STATE.is_before_cursor(msg_id):
+            STATE.processed_msg_ids.add(msg_id)
             continue
+        monitor_stats["new_messages"] += 1
         
         # Get user ID for filtering
         user_id = msg.get("author", {}).get("id", "")
         username = msg.get("author", {}).get("username", "Unknown")
         
-        # Apply filtering rules:
-        # 1. If whitelist exists (not empty), only process messages from whitelisted users
-        # 2. If whitelist is empty, process messages from all users except those in the ban list
-        
-        # Check if user is banned
-        if user_id in BAN_LIST:
+        # Apply filtering rules
+        filter_result = check_user_filters(user_id)
+        if filter_result == "banned":
             print(f"Skipping message from banned user: {username} ({user_id})")
-            processed_msg_ids.add(msg_id)  # Mark as processed
+            STATE.processed_msg_ids.add(msg_id)  # Mark as processed
             continue
-            
-        # Check whitelist (if it exists)
-        if WHITELIST and user_id not in WHITELIST:
+        if filter_result == "not_whitelisted":
             # Skip silently - message is not from a whitelisted user
-            processed_msg_ids.add(msg_id)  # Mark as processed anyway
+            STATE.processed_msg_ids.add(msg_id)  # Mark as processed anyway
             continue
         
-        # Mark as processed
-        processed_msg_ids.add(msg_id)
+        # Mark as processed and remember its version to notice later edits
+        STATE.processed_msg_ids.add(msg_id)
+        STATE.remember_version(msg)
         
         # Get message info
         content = msg.get("content", "")
@@ -292,121 +437,361 @@ def process_messages(messages):
         print(f"\nNew message from {author} (ID: {user_id}) at {timestamp}:")
         print(f"Content: {content}")
         
-        # Check for invite codes
-        invite_codes = find_invite_codes(content)
-        if invite_codes:
-            print(f"Found potential invite code(s): {', '.join(invite_codes)}")
-            
-            # Process each code
-            for code in invite_codes:
-                if code not in processed_codes:
-                    print(f"Using new invite code: {code}")
-                    input_code_to_app(code)
-                    processed_codes.add(code)
-
-def input_code_to_app(code):
-    """Input the code to the target application with input field focus"""
+        # Check every text field of the message for invite codes
+        code_hits = EXTRACTOR.extract(msg, author_filter=check_user_filters)
+        if code_hits:
+            print(f"Found potential invite code(s): {', '.join(f'{hit.code} ({hit.field}, {hit.pattern})' for hit in code_hits)}")
+            monitor_stats["codes_found"] += len(code_hits)
+            DROP_SCHEDULE.record(msg, len(code_hits))
+            entry_queue.append((msg, [hit.code for hit in code_hits]))
+            CLAIM_WATCH.remember(msg, entry_queue[-1][1])
+    
+    # Replies in this page may already report queued codes as taken (banned users cannot cancel entries)
+    CLAIM_WATCH.scan(messages, author_filter=check_user_filters)
+    
+    # Enter codes from proven posters first and from repeated false-positive sources last
+    last_check = clock()
+    for position, (msg, codes) in enumerate(REPUTATION.order(entry_queue)):
+        # Entry takes seconds per code: look for fresh claims before starting on the next message
+        if position and claim_recheck and clock() - last_check >= CLAIM_RECHECK_AFTER:
+            CLAIM_WATCH.scan(claim_recheck(), author_filter=check_user_filters)
+            last_check = clock()
+        use_invite_codes(msg, codes, received_at)
+    
+    STATE.advance_cursor(messages)
+
+def use_invite_codes(msg, codes, received_at):
+    """Enter the codes from a message that were not handled before; returns how many were new"""
+    user_id = msg.get("author", {}).get("id", "")
+    new_codes = 0
+    queued = []
+    for code in codes:
+        if code in STATE.processed_codes:
+            continue
+        new_codes += 1
+        # Someone in the channel already reported it as taken
+        if CLAIM_WATCH.is_claimed(code):
+            cancel_claimed_entry(code, msg, received_at)
+            continue
+        # Make sure no other local consumer is already entering this code
+        if not STATE.claim(code, HUB_CLIENT, msg, received_at):
+            continue
+        queued.append(code)
+    REPUTATION.record_codes(user_id, msg.get("author", {}).get("username"), new_codes, received_at)
+    if not queued:
+        return new_codes
+    
+    print(f"Using new invite code(s): {', '.join(queued)}")
+    attempts = input_codes_to_app(queued, message=msg, received_at=received_at)
+    for attempt in attempts:
+        latency_histograms["entry"].observe(attempt["duration"] or 0.0)
+        STATE.record_code(attempt["code"], attempt["result"], msg, received_at, attempt["started_at"], attempt["duration"])
+        REPUTATION.record_result(user_id, attempt["result"])
+        if HUB_CLIENT and attempt["result"] == entry_tracking.RESULT_ERROR:
+            HUB_CLIENT.release(attempt["code"])  # Not entered (failed or abandoned): let another consumer try it
+    # A code was accepted: the rest of the batch is not needed
+    for code in queued[len(attempts):]:
+        STATE.record_code(code, "dropped", msg, received_at)
+        if HUB_CLIENT:
+            HUB_CLIENT.release(code)  # Let another consumer have it
+    return new_codes
+
+def estimated_entry_time():
+    """Average seconds one code entry takes so far"""
+    entries = latency_histograms["entry"]
+    return entries.total / entries.count / 1000 if entries.count else DEFAULT_ENTRY_TIME
+
+def cancel_claimed_entry(code, msg, received_at):
+    """Drop a queued code the channel reported as claimed"""
+    monitor_stats["entries_cancelled"] += 1
+    monitor_stats["entry_time_reclaimed"] += estimated_entry_time()
+    STATE.record_code(code, "claimed_in_channel", msg, received_at)
+    print(f"Skipping code {code}: reported as claimed in the channel "
+          f"({monitor_stats['entry_time_reclaimed']:.1f} s of entry time reclaimed so far)")
+
+def rescan_edited_message(msg, received_at):
+    """Look for codes that were edited into an already processed message"""
+    monitor_stats["edits_rescanned"] += 1
+    code_hits = STATE.edited_code_hits(msg, author_filter=check_user_filters)
+    if not code_hits:
+        return
+    monitor_stats["codes_found"] += len(code_hits)
+    monitor_stats["codes_from_edits"] += use_invite_codes(msg, [hit.code for hit in code_hits], received_at)
+
+def input_code_to_app(code, message=None, received_at=None, record=True):
+    """Input the code to the target application and return the timed entry attempt"""
+    attempt = entry_tracking.new_attempt(code, message, received_at)
+    method, result = None, entry_tracking.RESULT_ERROR
     try:
-        print(f"Attempting to input code '{code}' to {TARGET_APP_NAME}...")
-        
-        # Platform-specific implementation
-        if OPERATING_SYSTEM == "Darwin":  # macOS
-            input_code_macos(code)
-        elif OPERATING_SYSTEM == "Windows":  # Windows
-            input_code_windows(code)
-        else:
-            print(f"Unsupported operating system: {OPERATING_SYSTEM}")
-            print(f"\nPlease manually enter this code: {code}")
-        
-        print("\nAttempted to enter code: " + code)
+        sink = get_submission_sink()
+        print(f"Attempting to input code '{code}' via the {sink.name} sink...")
+        with WATCHDOG.entry(code):
+            method, result = sink.submit(code)
+        print(f"\nEntry of code {code} finished: {result} (method: {method})")
         
+    except entry_watchdog.EntryHung as e:
+        print(f"Entry of code {code} abandoned: {e}")
+        method = ENTRY_ABANDONED
     except Exception as e:
         print(f"Error inputting code: {e}")
         print("Detailed error information:")
         import traceback
         traceback.print_exc()
+    
+    entry_tracking.finish_attempt(attempt, method, result)
+    if record:
+        entry_tracking.record_attempt(attempt)
+    return attempt
 
-def input_code_macos(code):
-    """Input code on macOS systems"""
-    # First activate the target application
-    print("Activating target application on macOS...")
-    subprocess.run(['osascript', '-e', f'tell application "{TARGET_APP_NAME}" to activate'])
+def input_codes_to_app(codes, message=None, received_at=None, record=True):
+    """Enter several codes with one activation, stopping at the first success; returns the attempts made"""
+    if len(codes) == 1:
+        return [input_code_to_app(codes[0], message=message, received_at=received_at, record=record)]
     
-    # Wait for app to come to foreground
-    time.sleep(1.0)  # Increased wait time
+    attempts = [entry_tracking.new_attempt(code, message, received_at) for code in codes]
+    try:
+        sink = get_submission_sink()
+        print(f"Attempting to input {len(codes)} codes in one batch via the {sink.name} sink...")
+        with WATCHDOG.entry(", ".join(codes), codes=len(codes)):
+            outcomes = sink.submit_batch(codes)
+    except entry_watchdog.EntryHung as e:
+        print(f"Entry of codes {', '.join(codes)} abandoned: {e}")
+        outcomes = [(ENTRY_ABANDONED, entry_tracking.RESULT_ERROR, None)] * len(codes)
+    except Exception as e:
+        print(f"Error inputting codes: {e}")
+        import traceback
+        traceback.print_exc()
+        outcomes = [(None, entry_tracking.RESULT_ERROR, None)] * len(codes)
     
-    print("IMPORTANT: If you see permission errors like 'Sending keystrokes is not permitted/allowed (1002)':")
-    print("1. Go to System Preferences/Settings > Security & Privacy/Privacy > Accessibility")
-    print("2. Add your terminal app (Terminal or iTerm) to the list of allowed apps")
-    print("3. Also add Python or your code editor if you're running from there")
-    print("4. You might need to restart your terminal or editor after making these changes")
+    attempts = attempts[:len(outcomes)]
+    batch_duration = time.time() - attempts[0]["started_at"]
+    for attempt, (method, result, seconds) in zip(attempts, outcomes):
+        entry_tracking.finish_attempt(attempt, method, result)
+        attempt["duration"] = seconds  # None for codes typed by one script: only the batch total is known
+        if record:
+            entry_tracking.record_attempt(attempt)
     
-    # Method 3: Using key codes in AppleScript (may bypass some permission issues)
-    print("\nMethod 3: Using AppleScript with key codes...")
-    try:
-        # Using key codes instead of keystroke command
-        keycode_script = f'''
-        tell application "{TARGET_APP_NAME}" to activate
-        delay 1
+    dropped = len(codes) - len(attempts)
+    results = ", ".join(f"{attempt['code']} {attempt['result']}"
+                        + (f" in {attempt['duration']:.2f} s" if attempt["duration"] is not None else "")
+                        for attempt in attempts)
+    print(f"\nBatch of {len(codes)} codes finished in {batch_duration:.2f} s: {results}"
+          + (f"; dropped {dropped} after a success" if dropped else ""))
+    monitor_stats["entry_batches"] += 1
+    return attempts
 
-        tell application "System Events"
+def input_code_gui(code):
+    """Enter a code in the target app with the platform's GUI automation"""
+    print(f"Entering code in {TARGET_APP_NAME}...")
+    if OPERATING_SYSTEM == "Darwin":  # macOS
+        return input_code_macos(code)
+    if OPERATING_SYSTEM == "Windows":  # Windows
+        return input_code_windows(code)
+    print(f"Unsupported operating system: {OPERATING_SYSTEM}")
+    print(f"\nPlease manually enter this code: {code}")
+    return None, entry_tracking.RESULT_ERROR
+
+def get_submission_sink():
+    """Return the configured submission sink (GUI automation by default)"""
+    global SUBMISSION_SINK
+    if SUBMISSION_SINK is None:
+        SUBMISSION_SINK = submission_sinks.GuiSubmissionSink(input_code_gui, input_codes_gui_batch)
+    return SUBMISSION_SINK
+
+def macos_form_keys(code, paste=False):
+    """System Events key codes that fill in and submit the code form"""
+    enter_code = 'keystroke "v" using command down -- Paste' if paste else f'keystroke "{code}"'
+    return f'''
             key code 48 -- Tab
-            delay 0.5
-            keystroke "{code}"
-            delay 0.5
+            delay {ENTRY_KEY_DELAY}
+            {enter_code}
+            delay {ENTRY_KEY_DELAY}
             key code 48 -- Tab again
-            delay 0.5
+            delay {ENTRY_KEY_DELAY}
             key code 48 -- Tab again
-            delay 0.5
+            delay {ENTRY_KEY_DELAY}
             key code 49 -- Space to "press" button
-            delay 0.5
-            key code 48 -- Tab again
-        end tell
-        '''
-        
-        result = subprocess.run(['osascript', '-e', keycode_script], capture_output=True, text=True)
-        
-        if result.stdout:
-            print(f"Key code AppleScript result: {result.stdout.strip()}")
-        
-        if result.stderr:
-            print(f"Key code AppleScript error: {result.stderr.strip()}")
-            
-            # Check for permission error
-            if "not permitted" in result.stderr or "not allowed" in result.stderr or "1002" in result.stderr:
-                print("\n⚠️ PERMISSION ERROR DETECTED ⚠️")
-                print("You need to allow your terminal app to control your computer.")
-                print("Please follow these steps:")
-                print("1. Open System Preferences/Settings")
-                print("2. Go to Security & Privacy/Privacy > Accessibility")
-                print("3. Click the lock icon to make changes")
-                print("4. Add your terminal app (Terminal/iTerm) to the list")
-                print("5. Restart your terminal and try again")
-        else:
-            print("Key code method executed without errors!")
-            return  # Success! Skip other methods
-    except Exception as e:
-        print(f"Key code method failed: {e}")
-    
-    # Try different methods for inputting the code, starting with direct pyautogui
-    print("\nMethod 1: Using PyAutoGUI directly...")
+            delay {ENTRY_KEY_DELAY}
+            key code 48 -- Tab again'''
+
+def is_permission_error(stderr):
+    return "not permitted" in stderr or "not allowed" in stderr or "1002" in stderr
+
+# Pause between codes when several are typed in one AppleScript run
+FORM_KEYS_SEPARATOR = """
+            delay 0.5"""
+
+def macos_entry_script(codes, paste=False):
+    """AppleScript that activates the app once and fills in the code form for each code"""
+    if not paste:
+        return f'''
+    tell application "{TARGET_APP_NAME}" to activate
+    delay 1
+
+    tell application "System Events"
+{FORM_KEYS_SEPARATOR.join(macos_form_keys(code) for code in codes)}
+    end tell
+    '''
+    # Each code is checked on the clipboard before the paste; the previous clipboard comes back even on errors
+    forms = FORM_KEYS_SEPARATOR.join(f'''
+        set the clipboard to "{code}"
+        if (the clipboard as text) is not "{code}" then error "the clipboard did not take the code {code}"
+        tell application "System Events"
+{macos_form_keys(code, paste=True)}
+        end tell''' for code in codes)
+    return f'''
+    set previousClipboard to missing value
+    try
+        set previousClipboard to the clipboard
+    end try
+    try
+        tell application "{TARGET_APP_NAME}" to activate
+        delay 1
+{forms}
+        delay {PASTE_SETTLE}
+    on error errorMessage number errorNumber
+        if previousClipboard is not missing value then set the clipboard to previousClipboard
+        error errorMessage number errorNumber
+    end try
+    if previousClipboard is not missing value then set the clipboard to previousClipboard
+    '''
+
+def input_codes_macos_batch(codes):
+    """Activate the app once and submit every code with one AppleScript run"""
+    method = preferred_entry_method()
+    if method not in ("applescript_keycode", "applescript_paste"):
+        # The batch script types with key codes or pastes; use the method that works here instead
+        return input_codes_one_by_one(codes, input_code_macos)
+    print(f"Entering {len(codes)} codes on macOS with a single activation...")
+    batch_script = macos_entry_script(codes, paste=method == "applescript_paste")
+    started = time.perf_counter()
     try:
-        # Type the code
-        pyautogui.typewrite(code)
-        time.sleep(0.5)
-        
-        # Press Enter to submit
-        pyautogui.press('return')
-        
-        print("PyAutoGUI method completed")
+        result = WATCHDOG.run(['osascript', '-e', batch_script], timeout=FORM_SCRIPT_TIMEOUT * len(codes))
+    except entry_watchdog.EntryHung:
+        raise  # The app is stuck: abandon the batch instead of typing the codes one by one
     except Exception as e:
-        print(f"PyAutoGUI method failed: {e}")
+        print(f"Batch AppleScript failed: {e}")
+        METHOD_RANKING.record(method, False, (time.perf_counter() - started) / len(codes), time.time())
+    else:
+        METHOD_RANKING.record(method, not result.stderr, (time.perf_counter() - started) / len(codes), time.time())
+        if not result.stderr:
+            # The script ran without errors: that is all we know, for all codes together and not per code
+            return [(f"{method}_batch", entry_tracking.RESULT_SUBMITTED, None)] * len(codes)
+        print(f"Batch AppleScript error: {result.stderr.strip()}")
+        if is_permission_error(result.stderr):
+            print("Permission error: see 'Troubleshooting Permission Errors' in the README")
+    # Fall back to the one-by-one methods
+    return input_codes_one_by_one(codes, input_code_macos)
+
+def input_codes_windows_batch(codes):
+    """Activate the app window once and submit the codes back-to-back"""
+    method = preferred_entry_method()
+    if method not in ("pyautogui", "pyautogui_paste"):
+        return input_codes_one_by_one(codes, input_code_windows)
+    print(f"Entering {len(codes)} codes on Windows with a single activation...")
+    activate_app_windows()
+    time.sleep(1.5)
+    outcomes = []
+    for code in codes:
+        started = time.perf_counter()
+        try:
+            WATCHDOG.ensure_not_abandoned()
+            type_code_windows(code, paste=method == "pyautogui_paste")
+            WATCHDOG.ensure_not_abandoned()  # A run the watchdog gave up on says nothing about the method
+        except entry_watchdog.EntryHung as e:
+            print(f"Entry of code {code} abandoned: {e}")
+            return abandon_rest(codes, outcomes)
+        except Exception as e:
+            if WATCHDOG.abandoning:
+                return abandon_rest(codes, outcomes)
+            print(f"PyAutoGUI batch entry failed at {code}: {e}")
+            METHOD_RANKING.record(method, False, time.perf_counter() - started, time.time())
+            return outcomes + input_codes_one_by_one(codes[len(outcomes):], input_code_windows)
+        seconds = time.perf_counter() - started
+        METHOD_RANKING.record(method, True, seconds, time.time())
+        outcomes.append((f"{method}_batch", entry_tracking.RESULT_SUBMITTED, seconds))
+    return outcomes
+
+def input_codes_one_by_one(codes, enter):
+    """Enter codes separately, stopping at the first confirmed success"""
+    outcomes = []
+    for code in codes:
+        started = time.perf_counter()
+        try:
+            WATCHDOG.ensure_not_abandoned()
+            outcomes.append((*enter(code), time.perf_counter() - started))
+        except entry_watchdog.EntryHung as e:
+            print(f"Entry of code {code} abandoned: {e}")
+            return abandon_rest(codes, outcomes)
+        if outcomes[-1][1] == entry_tracking.RESULT_SUCCESS:
+            break
+    return outcomes
+
+def abandon_rest(codes, outcomes):
+    """Outcomes of a batch cut off by a timeout or the watchdog: the codes not entered count as abandoned"""
+    return outcomes + [(ENTRY_ABANDONED, entry_tracking.RESULT_ERROR, None)] * (len(codes) - len(outcomes))
+
+def input_codes_gui_batch(codes):
+    """Enter several codes with one activation of the target app"""
+    if OPERATING_SYSTEM == "Darwin":  # macOS
+        return input_codes_macos_batch(codes)
+    if OPERATING_SYSTEM == "Windows":  # Windows
+        return input_codes_windows_batch(codes)
+    return input_codes_one_by_one(codes, input_code_gui)
+
+def print_permission_help(manual_hint=False):
+    """Explain how to grant the accessibility permission macOS asks for"""
+    print("\n⚠️ PERMISSION ERROR DETECTED ⚠️")
+    print("You need to allow your terminal app to control your computer.")
+    print("Please follow these steps:")
+    print("1. Open System Preferences/Settings")
+    print("2. Go to Security & Privacy/Privacy > Accessibility")
+    print("3. Click the lock icon to make changes")
+    print("4. Add your terminal app (Terminal/iTerm) to the list")
+    print("5. Restart your terminal and try again")
+    if manual_hint:
+        print("\nAlternative: Use the manual input method below")
+
+def run_form_script(code, paste=False):
+    """Fill in the code form with one AppleScript run; True if it ran without errors"""
+    label = "Paste" if paste else "Key code"
+    result = WATCHDOG.run(['osascript', '-e', macos_entry_script([code], paste=paste)], timeout=FORM_SCRIPT_TIMEOUT)
     
-    # Try AppleScript method
-    print("\nMethod 2: Using AppleScript with keystroke...")
-    try:
-        # Use a simpler AppleScript approach that's less likely to trigger permission issues
-        simple_script = f'''
+    if result.stdout:
+        print(f"{label} AppleScript result: {result.stdout.strip()}")
+    
+    if result.stderr:
+        print(f"{label} AppleScript error: {result.stderr.strip()}")
+        if is_permission_error(result.stderr):
+            print_permission_help()
+        return False
+    print(f"{label} method executed without errors!")
+    return True
+
+def macos_keycode_entry(code):
+    """Using key codes in AppleScript (may bypass some permission issues)"""
+    return run_form_script(code)
+
+def macos_paste_entry(code):
+    """Pasting the code from the clipboard with AppleScript"""
+    return run_form_script(code, paste=True)
+
+def macos_pyautogui_entry(code):
+    """Using PyAutoGUI directly"""
+    # Type the code
+    pyautogui.typewrite(code)
+    time.sleep(0.5)
+    
+    # Press Enter to submit
+    pyautogui.press('return')
+    
+    print("PyAutoGUI method completed")
+    return True
+
+def macos_keystroke_entry(code):
+    """Using AppleScript with keystroke"""
+    # Use a simpler AppleScript approach that's less likely to trigger permission issues
+    simple_script = f'''
         tell application "{TARGET_APP_NAME}"
             activate
         end tell
@@ -417,115 +802,213 @@ def input_code_macos(code):
             keystroke return
         end tell
         '''
-        
-        result = subprocess.run(['osascript', '-e', simple_script], capture_output=True, text=True)
-        
-        if result.stdout:
-            print(f"AppleScript result: {result.stdout.strip()}")
-        
-        if result.stderr:
-            print(f"AppleScript error: {result.stderr.strip()}")
-            
-            # Check for permission error
-            if "not permitted" in result.stderr or "not allowed" in result.stderr or "1002" in result.stderr:
-                print("\n⚠️ PERMISSION ERROR DETECTED ⚠️")
-                print("You need to allow your terminal app to control your computer.")
-                print("Please follow these steps:")
-                print("1. Open System Preferences/Settings")
-                print("2. Go to Security & Privacy/Privacy > Accessibility")
-                print("3. Click the lock icon to make changes")
-                print("4. Add your terminal app (Terminal/iTerm) to the list")
-                print("5. Restart your terminal and try again")
-                print("\nAlternative: Use the manual input method below")
-        else:
-            print("AppleScript executed without errors")
     
+    result = WATCHDOG.run(['osascript', '-e', simple_script], timeout=FORM_SCRIPT_TIMEOUT)
+    
+    if result.stdout:
+        print(f"AppleScript result: {result.stdout.strip()}")
+    
+    if result.stderr:
+        print(f"AppleScript error: {result.stderr.strip()}")
+        if is_permission_error(result.stderr):
+            print_permission_help(manual_hint=True)
+        return False
+    print("AppleScript executed without errors")
+    return True
+
+# Entry methods per platform, in the order they are tried before anything is learned
+MACOS_ENTRY_METHODS = [
+    ("applescript_keycode", macos_keycode_entry),
+    ("applescript_keystroke", macos_keystroke_entry),
+    ("applescript_paste", macos_paste_entry),
+    ("pyautogui", macos_pyautogui_entry),
+]
+
+# Methods that cannot tell whether they worked: pyautogui on macOS types nothing without accessibility
+# permissions and still returns. They stay out of the learned order and are always tried last, in list order
+FIXED_LAST_METHODS = {macos_pyautogui_entry}
+
+# Methods that paste the code instead of typing it character by character (see --entry-mode)
+PASTE_METHODS = {"applescript_paste", "pyautogui_paste"}
+
+def run_entry_methods(code, methods):
+    """Try the entry methods in learned order until one works; returns (method, result)"""
+    method = methods[0][0]
+    for method, enter in ordered_entry_methods(methods):
+        print(f"\nEntry method {method}: {enter.__doc__}...")
+        started = time.perf_counter()
+        try:
+            worked = enter(code)
+            WATCHDOG.ensure_not_abandoned()  # A run the watchdog gave up on says nothing about the method
+        except entry_watchdog.EntryHung:
+            raise  # Not counted against the method, and no other method types into whatever has focus now
+        except Exception as e:
+            WATCHDOG.ensure_not_abandoned()
+            print(f"{method} method failed: {e}")
+            worked = False
+        if enter not in FIXED_LAST_METHODS:
+            METHOD_RANKING.record(method, worked, time.perf_counter() - started, time.time())
+        if worked:
+            return method, entry_tracking.RESULT_SUBMITTED  # Skip the remaining fallbacks
+    return method, entry_tracking.RESULT_ERROR
+
+def ordered_entry_methods(methods):
+    """Learned method order, with the pasting or the typing methods first if --entry-mode asks for them"""
+    ordered = METHOD_RANKING.order([method for method in methods if method[1] not in FIXED_LAST_METHODS])
+    if ENTRY_MODE != ENTRY_MODE_AUTO:
+        ordered.sort(key=lambda method: (method[0] in PASTE_METHODS) != (ENTRY_MODE == ENTRY_MODE_PASTE))
+    return ordered + [method for method in methods if method[1] in FIXED_LAST_METHODS]
+
+def input_code_macos(code):
+    """Input code on macOS systems"""
+    # First activate the target application
+    print("Activating target application on macOS...")
+    try:
+        WATCHDOG.run(['osascript', '-e', f'tell application "{TARGET_APP_NAME}" to activate'], timeout=ACTIVATE_TIMEOUT)
+    except entry_watchdog.EntryHung as e:
+        # The keystrokes would go to whatever window has focus instead
+        print(f"Could not activate {TARGET_APP_NAME}, abandoning the entry: {e}")
+        raise
     except Exception as e:
-        print(f"AppleScript method failed: {e}")
+        print(f"Could not activate {TARGET_APP_NAME}: {e}")
     
-    # Offer manual input as fallback
-    print("\nIf automatic input failed, you can manually:")
-    print(f"1. Switch to the {TARGET_APP_NAME} app window")
-    print(f"2. Enter this code: {code}")
-    print("3. Press Enter to submit")
+    # Wait for app to come to foreground
+    time.sleep(1.0)  # Increased wait time
+    
+    print("IMPORTANT: If you see permission errors like 'Sending keystrokes is not permitted/allowed (1002)':")
+    print("1. Go to System Preferences/Settings > Security & Privacy/Privacy > Accessibility")
+    print("2. Add your terminal app (Terminal or iTerm) to the list of allowed apps")
+    print("3. Also add Python or your code editor if you're running from there")
+    print("4. You might need to restart your terminal or editor after making these changes")
+    
+    # The method that worked last time goes first, and alone if it works again
+    method, result = run_entry_methods(code, MACOS_ENTRY_METHODS)
+    
+    if result == entry_tracking.RESULT_ERROR:
+        # Offer manual input as fallback
+        print("\nIf automatic input failed, you can manually:")
+        print(f"1. Switch to the {TARGET_APP_NAME} app window")
+        print(f"2. Enter this code: {code}")
+        print("3. Press Enter to submit")
+    return method, result
+
+def activate_app_windows():
+    """Bring the target app window to the front on Windows"""
+    try:
+        # Using built-in Windows commands to find and focus the window by title
+        result = WATCHDOG.run(
+            ['powershell', '-Command', f'(New-Object -ComObject WScript.Shell).AppActivate("{TARGET_APP_NAME}")'],
+            timeout=ACTIVATE_TIMEOUT
+        )
+        if "True" in result.stdout:
+            print("Successfully activated target window using PowerShell")
+            return
+        # Try with just part of the window title (more likely to work)
+        result = WATCHDOG.run(
+            ['powershell', '-Command', f'(New-Object -ComObject WScript.Shell).AppActivate("{TARGET_APP_NAME.split()[0]}")'],
+            timeout=ACTIVATE_TIMEOUT
+        )
+        if "True" in result.stdout:
+            print("Successfully activated target window using partial title")
+        else:
+            print(f"Could not activate {TARGET_APP_NAME} window with PowerShell")
+            print("Please manually focus the application window")
+    except entry_watchdog.EntryHung as e:
+        # The keystrokes would go to whatever window has focus instead
+        print(f"Could not activate {TARGET_APP_NAME}, abandoning the entry: {e}")
+        raise
+    except Exception as e:
+        print(f"Error activating window: {e}")
+        print("Please manually focus the application window")
+
+@contextlib.contextmanager
+def code_on_clipboard(code):
+    """Put the code on the clipboard for a paste and restore the previous text afterwards"""
+    import pyperclip  # Installed with pyautogui
+    previous = pyperclip.paste()
+    try:
+        pyperclip.copy(code)
+        if pyperclip.paste() != code:
+            raise RuntimeError("the clipboard did not take the code")  # Don't paste something else
+        yield
+    finally:
+        pyperclip.copy(previous)
+
+def type_code_windows(code, paste=False):
+    """Fill in and submit the code form in the focused window"""
+    # Press Tab to navigate to input field (adjust as needed for the app)
+    pyautogui.press('tab')
+    time.sleep(ENTRY_KEY_DELAY)
+    
+    if paste:
+        # Paste the code with one shortcut; the app reads the clipboard after the key event
+        with code_on_clipboard(code):
+            pyautogui.hotkey('ctrl', 'v')
+            time.sleep(max(ENTRY_KEY_DELAY, PASTE_SETTLE))
+    else:
+        # Type the code
+        pyautogui.typewrite(code)
+        time.sleep(ENTRY_KEY_DELAY)
+    
+    # Tab to the submit button
+    pyautogui.press('tab')
+    time.sleep(ENTRY_KEY_DELAY)
+    pyautogui.press('tab')
+    time.sleep(ENTRY_KEY_DELAY)
+    
+    # Press space to activate button
+    pyautogui.press('space')
+
+def windows_pyautogui_entry(code):
+    """Using PyAutoGUI directly"""
+    type_code_windows(code)
+    print("PyAutoGUI method completed")
+    return True
+
+def windows_paste_entry(code):
+    """Pasting the code from the clipboard with PyAutoGUI"""
+    type_code_windows(code, paste=True)
+    print("Paste method completed")
+    return True
+
+def windows_hotkey_entry(code):
+    """Using Windows keyboard simulation"""
+    # Using keyboard shortcuts
+    pyautogui.hotkey('alt', 'tab')  # Alt-Tab to ensure focus
+    time.sleep(0.5)
+    
+    # Try to tab to input field and enter the code
+    pyautogui.press('tab')
+    time.sleep(0.5)
+    pyautogui.typewrite(code)
+    time.sleep(0.5)
+    pyautogui.press('enter')
+    
+    print("Windows keyboard shortcut method completed")
+    return True
+
+WINDOWS_ENTRY_METHODS = [
+    ("pyautogui", windows_pyautogui_entry),
+    ("pyautogui_hotkey", windows_hotkey_entry),
+    ("pyautogui_paste", windows_paste_entry),
+]
 
 def input_code_windows(code):
     """Input code on Windows systems"""
     print("Activating target application on Windows...")
+    method = "pyautogui_hotkey"
     
     try:
         # Try to focus the target application window
-        try:
-            # Method 1: Using built-in Windows commands to focus the window
-            # This tries to find and focus the window by title
-            result = subprocess.run(
-                ['powershell', '-Command', f'(New-Object -ComObject WScript.Shell).AppActivate("{TARGET_APP_NAME}")'], 
-                capture_output=True, 
-                text=True
-            )
-            if "True" in result.stdout:
-                print("Successfully activated target window using PowerShell")
-            else:
-                # Try with just part of the window title (more likely to work)
-                result = subprocess.run(
-                    ['powershell', '-Command', f'(New-Object -ComObject WScript.Shell).AppActivate("{TARGET_APP_NAME.split()[0]}")'], 
-                    capture_output=True, 
-                    text=True
-                )
-                if "True" in result.stdout:
-                    print("Successfully activated target window using partial title")
-                else:
-                    print(f"Could not activate {TARGET_APP_NAME} window with PowerShell")
-                    print("Please manually focus the application window")
-        except Exception as e:
-            print(f"Error activating window: {e}")
-            print("Please manually focus the application window")
+        activate_app_windows()
         
         # Wait for window to gain focus
         time.sleep(1.5)
         
-        # Method 1: Using PyAutoGUI directly
-        print("\nMethod 1: Using PyAutoGUI directly...")
-        try:
-            # Press Tab to navigate to input field (adjust as needed for the app)
-            pyautogui.press('tab')
-            time.sleep(0.5)
-            
-            # Type the code
-            pyautogui.typewrite(code)
-            time.sleep(0.5)
-            
-            # Tab to the submit button
-            pyautogui.press('tab')
-            time.sleep(0.5)
-            pyautogui.press('tab')
-            time.sleep(0.5)
-            
-            # Press space to activate button
-            pyautogui.press('space')
-            
-            print("PyAutoGUI method completed")
-            return  # Success!
-        except Exception as e:
-            print(f"PyAutoGUI method failed: {e}")
-        
-        # Method 2: Using Windows keyboard shortcuts
-        print("\nMethod 2: Using Windows keyboard simulation...")
-        try:
-            # Using keyboard shortcuts
-            pyautogui.hotkey('alt', 'tab')  # Alt-Tab to ensure focus
-            time.sleep(0.5)
-            
-            # Try to tab to input field and enter the code
-            pyautogui.press('tab')
-            time.sleep(0.5)
-            pyautogui.typewrite(code)
-            time.sleep(0.5)
-            pyautogui.press('enter')
-            
-            print("Windows keyboard shortcut method completed")
-        except Exception as e:
-            print(f"Windows keyboard shortcut method failed: {e}")
+        # The method that worked last time goes first, and alone if it works again
+        method, result = run_entry_methods(code, WINDOWS_ENTRY_METHODS)
+        if result != entry_tracking.RESULT_ERROR:
+            return method, result
             
         # Offer manual input as fallback
         print("\nIf automatic input failed, you can manually:")
@@ -533,8 +1016,33 @@ def input_code_windows(code):
         print(f"2. Enter this code: {code}")
         print("3. Press Enter to submit")
         
+    except entry_watchdog.EntryHung:
+        raise
     except Exception as e:
         print(f"Error in Windows input method: {e}")
+    
+    return method, entry_tracking.RESULT_ERROR
+
+def platform_entry_methods():
+    """The entry methods of this platform"""
+    if OPERATING_SYSTEM == "Darwin":  # macOS
+        return MACOS_ENTRY_METHODS
+    if OPERATING_SYSTEM == "Windows":  # Windows
+        return WINDOWS_ENTRY_METHODS
+    return []
+
+def entry_method_names():
+    """Names of this platform's entry methods in the order they are tried"""
+    return [name for name, _ in ordered_entry_methods(platform_entry_methods())]
+
+def fixed_last_method_names():
+    """Names of this platform's entry methods that are always tried last"""
+    return [name for name, enter in platform_entry_methods() if enter in FIXED_LAST_METHODS]
+
+def preferred_entry_method():
+    """The entry method that will be tried first on this platform"""
+    methods = ordered_entry_methods(platform_entry_methods())
+    return methods[0][0] if methods else None
 
 def test_code_input():
     """Test the code input functionality with a sample code"""
@@ -545,26 +1053,26 @@ def test_code_input():
     
     if OPERATING_SYSTEM == "Darwin":  # macOS
         try:
-            result = subprocess.run(
-                ['osascript', '-e', f'tell application "System Events" to count processes whose name is "{TARGET_APP_NAME}"'], 
-                capture_output=True, text=True
+            result = WATCHDOG.run(
+                ['osascript', '-e', f'tell application "System Events" to count processes whose name is "{TARGET_APP_NAME}"'],
+                timeout=ACTIVATE_TIMEOUT
             )
             app_running = result.stdout.strip() != "0"
         except Exception as e:
             print(f"Could not check if {TARGET_APP_NAME} is running: {e}")
     elif OPERATING_SYSTEM == "Windows":  # Windows
         try:
-            result = subprocess.run(
-                ['powershell', '-Command', f'Get-Process "{TARGET_APP_NAME}" -ErrorAction SilentlyContinue'], 
-                capture_output=True, text=True
+            result = WATCHDOG.run(
+                ['powershell', '-Command', f'Get-Process "{TARGET_APP_NAME}" -ErrorAction SilentlyContinue'],
+                timeout=ACTIVATE_TIMEOUT
             )
             app_running = TARGET_APP_NAME in result.stdout
             
             # If not found, try partial name match
             if not app_running:
-                result = subprocess.run(
-                    ['powershell', '-Command', f'Get-Process | Where-Object {{ $_.MainWindowTitle -like "*{TARGET_APP_NAME}*" }}'], 
-                    capture_output=True, text=True
+                result = WATCHDOG.run(
+                    ['powershell', '-Command', f'Get-Process | Where-Object {{ $_.MainWindowTitle -like "*{TARGET_APP_NAME}*" }}'],
+                    timeout=ACTIVATE_TIMEOUT
                 )
                 app_running = len(result.stdout.strip()) > 0
         except Exception as e:
@@ -575,7 +1083,10 @@ def test_code_input():
         launch = input(f"Do you want to launch {TARGET_APP_NAME}? (y/n): ")
         if launch.lower() == 'y':
             if OPERATING_SYSTEM == "Darwin":  # macOS
-                subprocess.run(['open', '-a', TARGET_APP_NAME])
+                try:
+                    WATCHDOG.run(['open', '-a', TARGET_APP_NAME], timeout=ACTIVATE_TIMEOUT)
+                except entry_watchdog.EntryHung as e:
+                    print(f"Could not start {TARGET_APP_NAME}: {e}")
             elif OPERATING_SYSTEM == "Windows":  # Windows
                 try:
                     subprocess.Popen(f'start {TARGET_APP_NAME}', shell=True)
@@ -603,11 +1114,18 @@ def test_code_input():
         print(f"{i}...")
         time.sleep(1)
     
-    # Try to input the code
-    input_code_to_app(test_code)
+    # Try to input the code, starting with the method that worked last time
+    state_store.open_store()
+    METHOD_RANKING.load()
+    attempt = input_code_to_app(test_code, record=False)
     
-    # Ask for feedback
+    # Ask for feedback and keep the user-confirmed result
     result = input("\nDid the code input work correctly? (y/n): ")
+    confirmed = entry_tracking.RESULT_SUCCESS if result.lower() == 'y' else entry_tracking.RESULT_FAILURE
+    backend_duration = attempt["duration"]
+    entry_tracking.finish_attempt(attempt, attempt["method"], confirmed, entry_tracking.SOURCE_USER)
+    attempt["duration"] = backend_duration  # Keep the backend timing, not the time spent answering
+    entry_tracking.record_attempt(attempt)
     if result.lower() == 'y':
         print("Great! The code input functionality is working.")
     else:
@@ -630,6 +1148,11 @@ def main():
     """Main entry point"""
     args = parse_args()
     
+    # Talk to a running daemon
+    if args.pause or args.resume or args.set_interval is not None or args.stats or args.histograms or args.flush:
+        control_daemon(args)
+        return
+    
     # Load user lists
     load_user_lists()
     
@@ -637,20 +1160,128 @@ def main():
     list_management_args = args.ban or args.unban or args.whitelist or args.unwhitelist or args.list_filters
     if list_management_args:
         changes_made = manage_user_lists(args)
-        if not args.test:  # If only managing lists without other actions, exit
+        if not args.test and not args.list_authors:  # If only managing lists without other actions, exit
             return
     
+    # Show the author reputation index
+    if args.list_authors:
+        state_store.open_store()
+        REPUTATION.load()
+        author_reputation.print_authors(REPUTATION)
+        return
+    
+    # Set up the drop schedule
+    DROP_SCHEDULE.use_learned = not args.no_learned_schedule
+    try:
+        for spec in args.hot_window:
+            DROP_SCHEDULE.add_window(spec)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    if args.backfill:
+        backfill_drop_schedule(args.backfill)
+    if args.show_schedule or args.backfill:
+        state_store.open_store()
+        DROP_SCHEDULE.load()
+        drop_schedule.print_schedule(DROP_SCHEDULE, args.burst_interval, args.interval)
+        return
+    
+    # Show or reset the learned order of the entry methods
+    global ENTRY_MODE
+    ENTRY_MODE = args.entry_mode
+    if args.entry_methods or args.reset_entry_methods:
+        state_store.open_store()
+        METHOD_RANKING.load()
+        if args.reset_entry_methods:
+            METHOD_RANKING.reset()
+            state_store.flush()
+            print(f"Forgot the learned entry method order on {OPERATING_SYSTEM}")
+        method_ranking.print_ranking(METHOD_RANKING, entry_method_names(), fixed_last=fixed_last_method_names())
+        return
+    
+    # Show the entry success report
+    if args.report or args.report_plot:
+        entry_tracking.print_success_report(plot_file=args.report_plot)
+        return
+    
+    # Time the hot functions if requested; before the sink is created, so it holds the timed entry functions
+    if args.profile and not args.test:
+        profiling.install_timers(sys.modules[__name__], PROFILED_FUNCTIONS)
+    
+    # Pick where codes get entered
+    global SUBMISSION_SINK, MONITOR_CONTROL, ACT_ON_AGE
+    ACT_ON_AGE = args.act_on_age
+    try:
+        SUBMISSION_SINK = submission_sinks.create_sink(args.sink, gui_enter=input_code_gui, gui_enter_batch=input_codes_gui_batch,
+                                                       redeem_url=args.redeem_url)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    
     # If in test mode, just test the code input functionality
     if args.test:
         test_code_input()
         return
     
-    # Otherwise, start the monitor
-    monitor_channel(poll_interval=args.interval)
+    # Profile the run if requested
+    if args.profile:
+        profiling.start(window=args.profile_window, interval=args.profile_interval)
+    
+    control_server = None
+    try:
+        # Use the shared fetcher hub if requested and running
+        if args.hub and monitor_via_hub():
+            return
+        
+        # Listen for control requests while monitoring
+        if args.daemon:
+            MONITOR_CONTROL = monitor_control.MonitorControl()
+            control_server = monitor_control.start_control_server(MONITOR_CONTROL, sys.modules[__name__], args.control_socket)
+        
+        # Otherwise, start the monitor
+        schedule = None
+        if args.predictive:
+            state_store.open_store()
+            DROP_SCHEDULE.load()
+            schedule = DROP_SCHEDULE
+        monitor_channel(poll_interval=args.interval, adaptive=args.adaptive, burst_interval=args.burst_interval,
+                        schedule=schedule)
+    finally:
+        if control_server:
+            control_server.close()
+            local_ipc.remove_socket_file(args.control_socket)
+        print(SUBMISSION_SINK.summary())
+        SUBMISSION_SINK.close()
+        if args.profile:
+            profiling.stop_and_report(output=args.profile_output, top=args.profile_top)
+
+def backfill_drop_schedule(pages):
+    """Record the drops in the last pages of channel history for the drop schedule"""
+    state_store.open_store()
+    token = get_user_token()
+    before = None
+    messages_seen = drops = 0
+    for page in range(pages):
+        messages = get_channel_messages(token, limit=BACKFILL_PAGE_SIZE, before=before)
+        if not messages:
+            if not last_fetch_result.ok:
+                print(f"Backfill stopped at page {page + 1}: {last_fetch_result.error}")
+            break
+        for msg in messages:
+            codes = {hit.code for hit in EXTRACTOR.extract(msg)}
+            if codes:
+                DROP_SCHEDULE.record(msg, len(codes))
+                drops += 1
+        messages_seen += len(messages)
+        before = min(messages, key=lambda msg: claim_signals.snowflake(msg.get("id")))["id"]
+        if len(messages) < BACKFILL_PAGE_SIZE:
+            break  # Reached the start of the channel
+    state_store.flush()
+    print(f"Backfill: {drops} drops in {messages_seen} messages")
 
 def get_current_user_info(token):
     """Get current user information using the token"""
-    url = "https://discord.com/api/v9/users/@me"
+    url = f"{DISCORD_API_BASE}/users/@me"
     
     headers = {
         "Authorization": token,
@@ -658,36 +1289,44 @@ def get_current_user_info(token):
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
     }
     
-    try:
-        # Create a session with retry logic
-        session = create_session_with_retries()
-        
-        response = session.get(url, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            user_data = response.json()
-            user_id = user_data.get("id")
-            username = user_data.get("username")
-            print(f"Logged in as: {username} (ID: {user_id})")
-            return user_id, username
-        else:
-            print(f"Failed to get user info: {response.status_code} - {response.text}")
+    global last_fetch_result
+    result = HTTP_POLICY.request("GET", url, headers=headers)
+    last_fetch_result = result
+    
+    if result.ok:
+        try:
+            user_data = result.response.json()
+        except ValueError as e:
+            print(f"Error getting user info: {e}")
             return None, None
-    except requests.exceptions.ConnectionError as e:
-        print(f"Connection error getting user info: {e}")
-        print("Waiting 5 seconds before retrying...")
-        time.sleep(5)
-        return None, None
-    except Exception as e:
-        print(f"Error getting user info: {e}")
-        return None, None
+        user_id = user_data.get("id")
+        username = user_data.get("username")
+        print(f"Logged in as: {username} (ID: {user_id})")
+        return user_id, username
+    
+    print(f"Failed to get user info ({result.error}): {result.detail}")
+    return None, None
 
-def monitor_channel(poll_interval=5):
-    """Monitor the Discord channel for new messages and invite codes"""
+def monitor_channel(poll_interval=5, max_polls=None, adaptive=False,
+                    burst_interval=adaptive_polling.DEFAULT_BURST_INTERVAL, page_size=50,
+                    clock=time.monotonic, sleep=time.sleep, schedule=None):
+    """Monitor the Discord channel for new messages and invite codes (clock/sleep are injectable for simulations)"""
     print(f"Starting Discord channel monitor for: {CHANNEL_URL}")
-    print(f"Polling interval: {poll_interval} seconds")
+    if adaptive:
+        print(f"Adaptive polling: every {poll_interval} s when idle, down to {burst_interval} s during drops")
+    else:
+        print(f"Polling interval: {poll_interval} seconds")
+    if schedule:
+        status = schedule.status()
+        print(f"Predictive polling: every {burst_interval} s in {len(schedule.windows())} hot window(s) "
+              f"learned from {status['events']} drops, {poll_interval} s otherwise (see --show-schedule)")
     print(f"Target application for codes: {TARGET_APP_NAME}")
     
+    # Restore dedup state from earlier runs
+    restore_state()
+    if schedule:
+        schedule.cold_interval = poll_interval
+    
     # Get authentication token
     token = get_user_token()
     
@@ -710,132 +1349,246 @@ def monitor_channel(poll_interval=5):
     if BAN_LIST:
         print(f"Ban list active: Ignoring messages from {len(BAN_LIST)} users")
     
-    last_check_time = 0
-    consecutive_errors = 0
-    max_consecutive_errors = 5
+    # With a control socket, sleeps wake up early to apply pause and interval requests
+    scheduler = poll_scheduler.PollScheduler(poll_interval, clock=clock, sleep=MONITOR_CONTROL.sleep if MONITOR_CONTROL else sleep)
+    policy = None
+    if adaptive:
+        policy = adaptive_polling.AdaptivePollPolicy(idle_interval=poll_interval, burst_interval=burst_interval, clock=clock)
+        scheduler.set_interval(policy.interval())
+    if MONITOR_CONTROL:
+        MONITOR_CONTROL.attach(scheduler, policy, schedule)
+    polls = 0
+    hot = False
+    
+    def plan_next_poll():
+        """Interval from the activity policy and the drop schedule, then wake early for a hot window"""
+        nonlocal hot
+        if schedule:
+            base = policy.interval() if policy else schedule.cold_interval
+            scheduler.set_interval(schedule.interval(base, burst_interval))
+            if schedule.is_hot() != hot:
+                hot = not hot
+                print(f"{'Entering' if hot else 'Leaving'} a predicted drop window: polling every {scheduler.interval:g} s")
+        elif policy:
+            scheduler.set_interval(policy.interval())
+        scheduler.schedule_next()
+        if schedule and not hot:
+            until = schedule.seconds_until_hot()
+            if until is not None:
+                scheduler.advance_to(clock() + until)
+        if policy:
+            scheduler.defer_until(policy.earliest_next_poll())
+    
+    def recheck_claims():
+        """Fetch the newest messages between queued entries, within the request budget"""
+        if policy:
+            if policy.earliest_next_poll() > clock():
+                return []
+            policy.record_request()
+        monitor_stats["claim_rechecks"] += 1
+        return get_channel_messages(token, limit=CLAIM_RECHECK_PAGE, fingerprint=RECHECK_FINGERPRINT)
+    
+    global claim_recheck
+    claim_recheck = recheck_claims
+    WATCHDOG.start()
     
     try:
-        while True:
-            # Check if it's time to poll for new messages
-            current_time = time.time()
-            if current_time - last_check_time >= poll_interval:
-                print(f"\nChecking for new messages... ({time.strftime('%H:%M:%S')})")
-                
-                # Fetch latest messages
-                messages = get_channel_messages(token)
+        while max_polls is None or polls < max_polls:
+            # Sleep until the next poll deadline
+            if MONITOR_CONTROL:
+                MONITOR_CONTROL.apply()
+            scheduler.wait()
+            WATCHDOG.poll_started(scheduler.interval)
+            print(f"\nChecking for new messages... ({time.strftime('%H:%M:%S')})")
+            
+            # Fetch latest messages
+            if policy:
+                page_size = policy.page_size()
+                policy.record_request()
+            fetch_started = time.perf_counter()
+            messages = get_channel_messages(token, limit=page_size)
+            latency_histograms["fetch"].observe(time.perf_counter() - fetch_started)
+            monitor_stats["polls"] += 1
+            
+            if messages is not None:
+                seen_before = (monitor_stats["new_messages"], monitor_stats["codes_found"])
+                process_started = time.perf_counter()
+                cpu_started = time.process_time()
+                process_messages(messages, clock=clock)
+                latency_histograms["process"].observe(time.perf_counter() - process_started)
+                if messages and monitor_stats["new_messages"] == seen_before[0]:
+                    # What processing an unchanged page costs, i.e. what skipping one saves
+                    PAGE_FINGERPRINT.observe_process(time.process_time() - cpu_started)
+                if policy:
+                    # Speed up or slow down based on what this poll found
+                    policy.observe(monitor_stats["new_messages"] - seen_before[0],
+                                   monitor_stats["codes_found"] - seen_before[1], page_size)
+                plan_next_poll()
+            else:
+                error = last_fetch_result.error if last_fetch_result else retry_policy.ERROR_NETWORK
+                monitor_stats[f"errors_{error}"] = monitor_stats.get(f"errors_{error}", 0) + 1
                 
-                if messages:
-                    process_messages(messages)
-                    consecutive_errors = 0  # Reset error counter on success
+                if error == retry_policy.ERROR_AUTH:
+                    # Only a rejected token is a reason to log in again
+                    print("Attempting to refresh token...")
+                    token = get_user_token()
+                    scheduler.schedule_next(delay=0)
+                elif error == retry_policy.ERROR_FORBIDDEN:
+                    backoff = HTTP_POLICY.forbidden_backoff()
+                    print(f"Backing off for {backoff:g} s")
+                    scheduler.schedule_next(delay=backoff)
+                elif error == retry_policy.ERROR_RATE_LIMITED:
+                    scheduler.schedule_next(delay=last_fetch_result.retry_after)
+                elif HTTP_POLICY.breaker.state == retry_policy.OPEN:
+                    # Wake up exactly when the breaker allows the next probe
+                    scheduler.schedule_next(delay=HTTP_POLICY.breaker.next_probe_in())
                 else:
-                    # If we couldn't get messages, we may need to re-authenticate
-                    consecutive_errors += 1
-                    
-                    if consecutive_errors >= max_consecutive_errors:
-                        print(f"Too many consecutive errors ({consecutive_errors}). Attempting to refresh token...")
-                        # Try to get a fresh token
-                        if os.path.exists(TOKEN_FILE):
-                            os.remove(TOKEN_FILE)
-                        token = get_user_token()
-                        consecutive_errors = 0  # Reset after token refresh
-                    
-                    # Increase wait time proportionally to consecutive errors
-                    wait_time = poll_interval * (1 + consecutive_errors)
-                    print(f"Will retry in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                
-                last_check_time = current_time
+                    scheduler.schedule_next()
             
-            # Sleep to avoid excessive API calls
-            time.sleep(1)
+            WATCHDOG.poll_finished()
+            polls += 1
+            if polls % JITTER_REPORT_EVERY == 0:
+                scheduler.print_report()
+                print(PAGE_FINGERPRINT.summary())
+                print(EXTRACTOR.cache.summary())
+                print(WATCHDOG.summary())
+    
+    except KeyboardInterrupt:
+        print("\nMonitoring stopped by user")
+    
+    claim_recheck = None
+    WATCHDOG.stop()
+    scheduler.print_report()
+    print(PAGE_FINGERPRINT.summary())
+    print(EXTRACTOR.cache.summary())
+    print(WATCHDOG.summary())
+    if monitor_stats["entries_cancelled"]:
+        print(f"Entries cancelled by claim replies: {monitor_stats['entries_cancelled']}, "
+              f"~{monitor_stats['entry_time_reclaimed']:.1f} s of entry time reclaimed")
+
+def monitor_via_hub():
+    """Process messages pushed by a local fetcher hub; returns False if no hub is running"""
+    global HUB_CLIENT
+    client = fetcher_hub.HubClient(consumer=f"auto-entry-{os.getpid()}")
+    if not client.connect():
+        print(f"No fetcher hub running on {fetcher_hub.HUB_SOCKET_PATH}, polling Discord directly")
+        return False
+    
+    HUB_CLIENT = client
+    restore_state()
+    print(f"Receiving messages from fetcher hub on {fetcher_hub.HUB_SOCKET_PATH}")
+    print(f"Target application for codes: {TARGET_APP_NAME}")
+    WATCHDOG.start()
     
+    try:
+        while True:
+            messages = client.next_messages()
+            if messages is None:
+                print("Fetcher hub connection closed")
+                break
+            process_messages(messages)
     except KeyboardInterrupt:
         print("\nMonitoring stopped by user")
+    finally:
+        WATCHDOG.stop()
+        client.close()
+        HUB_CLIENT = None
+    return True
 
 def save_user_lists():
-    """Save ban list and whitelist to a file"""
-    filter_file = "user_filters.json"
+    """Save ban list and whitelist to the state store (only changed entries are written)"""
     try:
-        with open(filter_file, 'w') as f:
-            json.dump({
-                "ban_list": BAN_LIST,
-                "whitelist": WHITELIST,
-                "current_user_id": CURRENT_USER_ID
-            }, f, indent=2)
-        print(f"Saved user filters to {filter_file}")
+        state_store.open_store()
+        state_store.sync_filter_list("ban_list", BAN_LIST)
+        state_store.sync_filter_list("whitelist", WHITELIST)
+        state_store.set_setting("current_user_id", CURRENT_USER_ID)
+        print(f"Saved user filters to {state_store.STATE_DB_FILE}")
     except Exception as e:
         print(f"Error saving user filters: {e}")
 
 def load_user_lists():
-    """Load ban list and whitelist from a file"""
-    filter_file = "user_filters.json"
+    """Load ban list and whitelist from the state store"""
     global BAN_LIST, WHITELIST, CURRENT_USER_ID
     
-    if os.path.exists(filter_file):
-        try:
-            with open(filter_file, 'r') as f:
-                data = json.load(f)
-                BAN_LIST = data.get("ban_list", [])
-                WHITELIST = data.get("whitelist", [])
-                if not CURRENT_USER_ID:  # Don't override if already set
-                    CURRENT_USER_ID = data.get("current_user_id", "")
-            print(f"Loaded user filters from {filter_file}")
-        except Exception as e:
-            print(f"Error loading user filters: {e}")
+    try:
+        state_store.open_store()
+        # Pick up filters from the old user_filters.json on first run
+        state_store.import_legacy_filters()
+        lists = state_store.load_filter_lists()
+        BAN_LIST = lists["ban_list"]
+        WHITELIST = lists["whitelist"]
+        if not CURRENT_USER_ID:  # Don't override if already set
+            CURRENT_USER_ID = state_store.get_setting("current_user_id", "") or ""
+        print(f"Loaded user filters from {state_store.STATE_DB_FILE}")
+    except Exception as e:
+        print(f"Error loading user filters: {e}")
+
+def restore_state():
+    """Restore the message cursor, handled codes, author reputation and entry method order of earlier runs"""
+    try:
+        STATE.restore()
+        authors = REPUTATION.load()
+        if authors:
+            print(f"Restored the reputation of {authors} code posters")
+        if METHOD_RANKING.load():
+            print(f"Entry methods in learned order: {', '.join(entry_method_names())}")
+    except Exception as e:
+        print(f"Error restoring saved state: {e}")
+
+def update_filter(list_name, user_id, add):
+    """Add a user to or remove a user from "ban_list" / "whitelist"; returns (changed, message)"""
+    user_list = BAN_LIST if list_name == "ban_list" else WHITELIST
+    label = "ban list" if list_name == "ban_list" else "whitelist"
+    if add:
+        if user_id in user_list:
+            return False, f"User ID {user_id} is already in {label}"
+        user_list.append(user_id)
+        return True, f"Added user ID {user_id} to {label}"
+    if user_id not in user_list:
+        return False, f"User ID {user_id} is not in {label}"
+    user_list.remove(user_id)
+    return True, f"Removed user ID {user_id} from {label}"
+
+def filter_snapshot():
+    """Current filter settings as a dict"""
+    return {"current_user_id": CURRENT_USER_ID, "ban_list": list(BAN_LIST), "whitelist": list(WHITELIST)}
+
+def print_filters(filters):
+    print("\nCurrent User Filters:")
+    print(f"Current User ID: {filters['current_user_id'] or 'Not set'}")
+    print(f"Ban List ({len(filters['ban_list'])} users):")
+    for user_id in filters["ban_list"]:
+        print(f"  - {user_id}")
+    print(f"Whitelist ({len(filters['whitelist'])} users):")
+    for user_id in filters["whitelist"]:
+        print(f"  - {user_id}")
+    print("")
+
+def filter_changes(args):
+    """The (action, user ID) pairs requested on the command line"""
+    return [(action, getattr(args, action)) for action in monitor_control.FILTER_ACTIONS if getattr(args, action)]
 
 def manage_user_lists(args):
     """Manage ban list and whitelist based on command line arguments"""
-    global BAN_LIST, WHITELIST
+    # A running daemon owns the filters: change them there so it picks them up at once
+    if manage_daemon_filters(args):
+        return False
+    
     changes_made = False
     
     # Load existing lists
     load_user_lists()
     
-    # Process ban/unban
-    if args.ban:
-        if args.ban not in BAN_LIST:
-            BAN_LIST.append(args.ban)
-            print(f"Added user ID {args.ban} to ban list")
-            changes_made = True
-        else:
-            print(f"User ID {args.ban} is already in ban list")
-    
-    if args.unban:
-        if args.unban in BAN_LIST:
-            BAN_LIST.remove(args.unban)
-            print(f"Removed user ID {args.unban} from ban list")
-            changes_made = True
-        else:
-            print(f"User ID {args.unban} is not in ban list")
-    
-    # Process whitelist/unwhitelist
-    if args.whitelist:
-        if args.whitelist not in WHITELIST:
-            WHITELIST.append(args.whitelist)
-            print(f"Added user ID {args.whitelist} to whitelist")
-            changes_made = True
-        else:
-            print(f"User ID {args.whitelist} is already in whitelist")
-    
-    if args.unwhitelist:
-        if args.unwhitelist in WHITELIST:
-            WHITELIST.remove(args.unwhitelist)
-            print(f"Removed user ID {args.unwhitelist} from whitelist")
-            changes_made = True
-        else:
-            print(f"User ID {args.unwhitelist} is not in whitelist")
+    # Process ban/unban and whitelist/unwhitelist
+    for action, user_id in filter_changes(args):
+        list_name, add = monitor_control.FILTER_ACTIONS[action]
+        changed, message = update_filter(list_name, user_id, add)
+        print(message)
+        changes_made = changes_made or changed
     
     # List current filters if requested
     if args.list_filters or changes_made:
-        print("\nCurrent User Filters:")
-        print(f"Current User ID: {CURRENT_USER_ID or 'Not set'}")
-        print(f"Ban List ({len(BAN_LIST)} users):")
-        for user_id in BAN_LIST:
-            print(f"  - {user_id}")
-        print(f"Whitelist ({len(WHITELIST)} users):")
-        for user_id in WHITELIST:
-            print(f"  - {user_id}")
-        print("")
+        print_filters(filter_snapshot())
     
     # Save changes if any were made
     if changes_made:
@@ -843,5 +1596,71 @@ def manage_user_lists(args):
     
     return changes_made
 
+def manage_daemon_filters(args):
+    """Apply filter changes through a running daemon; returns False if none is running"""
+    reply = monitor_control.send_command("filters", socket_path=args.control_socket)
+    if reply is None:
+        return False
+    print(f"Updating the running monitor via {args.control_socket}")
+    for action, user_id in filter_changes(args):
+        reply = monitor_control.send_command("filter", socket_path=args.control_socket, action=action, user_id=user_id)
+        if reply is None:
+            print("Lost the connection to the running monitor")
+            return True
+        print(reply.get("message") or reply.get("error"))
+    if reply.get("filters"):
+        print_filters(reply["filters"])
+    return True
+
+def stats_snapshot():
+    """Monitor counters for the control socket"""
+    stats = dict(monitor_stats)
+    stats["processed_msg_ids"] = len(STATE.processed_msg_ids)
+    stats["processed_codes"] = len(STATE.processed_codes)
+    stats["authors"] = len(REPUTATION.authors)
+    stats["http_errors"] = dict(HTTP_POLICY.error_counts)
+    stats["circuit_breaker"] = HTTP_POLICY.breaker.state
+    stats["page_fingerprint"] = PAGE_FINGERPRINT.as_dict()
+    stats["extraction_cache"] = EXTRACTOR.cache.stats()
+    stats["schedule"] = DROP_SCHEDULE.status()
+    stats["watchdog"] = WATCHDOG.stats()
+    stats["entry_methods"] = entry_method_names()
+    stats["sink"] = get_submission_sink().summary()
+    if MONITOR_CONTROL and MONITOR_CONTROL.scheduler:
+        stats["jitter"] = MONITOR_CONTROL.scheduler.jitter_stats()
+    return stats
+
+def flush_state():
+    """Write the filters and all queued state to disk now"""
+    save_user_lists()
+    state_store.flush()
+
+def control_daemon(args):
+    """Send --pause/--resume/--set-interval/--stats/--histograms/--flush to a running daemon"""
+    commands = []
+    if args.pause:
+        commands.append(("pause", {}))
+    if args.resume:
+        commands.append(("resume", {}))
+    if args.set_interval is not None:
+        commands.append(("interval", {"seconds": args.set_interval}))
+    if args.flush:
+        commands.append(("flush", {}))
+    if args.stats:
+        commands.append(("stats", {}))
+    if args.histograms:
+        commands.append(("histograms", {}))
+    for op, fields in commands:
+        reply = monitor_control.send_command(op, socket_path=args.control_socket, **fields)
+        if reply is None:
+            print(f"No monitor daemon is listening on {args.control_socket} (start one with --daemon)")
+            return
+        if not reply.get("ok"):
+            print(f"{op} failed: {reply.get('error')}")
+        elif op in ("stats", "histograms"):
+            print(json.dumps({k: v for k, v in reply.items() if k != "ok"}, indent=2))
+        else:
+            print(f"{op}: ok")
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# Predictive poll schedule learned from past code drops
+#
+# Drops cluster at certain times of the week. Every message that carried codes
+# is stored as a drop event (posted time, number of codes); a time-of-week
+# histogram with 15 minute slots (UTC) is built from the last weeks of events,
+# and slots that saw drops in enough weeks become hot windows. With
+# --predictive the monitor polls at the burst interval from a few minutes
+# before a hot window until its end, and slowly outside them. Windows can be
+# added by hand (--hot-window) and the learned ones switched off.
+
+import re
+import time
+
+try:
+    from . import entry_tracking
+    from . import state_store
+except ImportError:
+    import entry_tracking
+    import state_store
+
+# Configuration
+SLOT_SECONDS = 15 * 60  # Histogram resolution
+WEEK_SECONDS = 7 * 24 * 3600
+SLOTS = WEEK_SECONDS // SLOT_SECONDS
+HISTORY_WEEKS = 8  # Weeks of drop events the histogram is built from
+HOT_WEEK_SHARE = 0.5  # A slot is hot if it (or a neighbouring slot) saw drops in this share of the weeks...
+MIN_DROP_WEEKS = 2  # ...and in at least this many different weeks, so one-off drops are not learned
+LEAD_SECONDS = 5 * 60  # Start fast polling this long before a hot window
+SMOOTHING = (0.25, 0.5, 0.25)  # Weights of the previous, same and next slot in the displayed rates
+EPOCH_WEEKDAY_OFFSET = 3 * 24 * 3600  # 1970-01-01 was a Thursday; shift so weeks start on Monday 00:00 UTC
+
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+HEAT_CHARS = " .:-=+*#%@"  # Per-hour shading in --show-schedule
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drop_events (
+    message_id TEXT PRIMARY KEY,
+    posted_at REAL NOT NULL,
+    codes INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_drop_events_posted_at ON drop_events (posted_at);
+"""
+
+WINDOW_RE = re.compile(r'^(?P<days>daily|[a-z]{3}(?:-[a-z]{3})?)\s+(?P<start>\d{1,2}:\d{2})-(?P<end>\d{1,2}:\d{2})$', re.IGNORECASE)
+
+schema_db = None  # Store the table was last created in
+
+
+def ensure_schema():
+    """Create the drop_events table if needed"""
+    global schema_db
+    state_store.open_store()
+    if schema_db == state_store.db_path:
+        return
+    with state_store.read_lock, state_store.read_conn:
+        state_store.read_conn.executescript(SCHEMA)
+    schema_db = state_store.db_path
+
+
+def week_offset(timestamp):
+    """Seconds since Monday 00:00 UTC of the timestamp's week"""
+    return (timestamp + EPOCH_WEEKDAY_OFFSET) % WEEK_SECONDS
+
+
+def week_of(timestamp):
+    return int((timestamp + EPOCH_WEEKDAY_OFFSET) // WEEK_SECONDS)
+
+
+def slot_of(timestamp):
+    return int(week_offset(timestamp) // SLOT_SECONDS)
+
+
+def slot_label(slot):
+    minutes = (slot % (SLOTS // 7)) * SLOT_SECONDS // 60
+    return f"{DAY_NAMES[slot // (SLOTS // 7)]} {minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_clock(text):
+    hours, minutes = (int(part) for part in text.split(":"))
+    if hours > 24 or minutes > 59:
+        raise ValueError(f"bad time {text!r}")
+    return hours * 3600 + minutes * 60
+
+
+def parse_window(spec):
+    """Slots covered by "Fri 18:00-20:00", "Mon-Fri 12:00-13:30" or "daily 20:00-02:00" (UTC)"""
+    match = WINDOW_RE.match(spec.strip())
+    if not match:
+        raise ValueError(f"bad window {spec!r} (expected e.g. \"Fri 18:00-20:00\" or \"daily 12:00-13:00\", UTC)")
+    days = match.group("days").title()
+    if days == "Daily":
+        day_numbers = range(7)
+    else:
+        first, _, last = days.partition("-")
+        if first not in DAY_NAMES or (last and last.title() not in DAY_NAMES):
+            raise ValueError(f"bad day in window {spec!r}")
+        start_day = DAY_NAMES.index(first)
+        end_day = DAY_NAMES.index(last.title()) if last else start_day
+        day_numbers = [(start_day + i) % 7 for i in range((end_day - start_day) % 7 + 1)]
+    start, end = parse_clock(match.group("start")), parse_clock(match.group("end"))
+    if end <= start:
+        end += 24 * 3600  # Crosses midnight
+    slots = set()
+    for day in day_numbers:
+        first_slot = (day * 24 * 3600 + start) // SLOT_SECONDS
+        last_slot = (day * 24 * 3600 + end + SLOT_SECONDS - 1) // SLOT_SECONDS  # Round the end up
+        slots.update(slot % SLOTS for slot in range(first_slot, last_slot))
+    return slots
+
+
+class DropSchedule:
+    """Time-of-week drop histogram and the hot polling windows derived from it"""
+
+    def __init__(self, hot_share=HOT_WEEK_SHARE, min_weeks=MIN_DROP_WEEKS, lead=LEAD_SECONDS, clock=time.time):
+        self.hot_share = hot_share
+        self.min_weeks = min_weeks
+        self.lead = lead
+        self.clock = clock
+        self.counts = [0.0] * SLOTS
+        self.drop_weeks = [set() for _ in range(SLOTS)]  # Weeks in which each slot saw a drop
+        self.first_event = None
+        self.events = 0
+        self.use_learned = True
+        self.manual_slots = set()
+        self.hot_slots = set()
+        self.dirty = True
+        self.cold_interval = None  # Poll interval outside hot windows, set by the monitor
+
+    def load(self, weeks=HISTORY_WEEKS):
+        """Build the histogram from stored drop events and the code history; returns the number of events"""
+        ensure_schema()
+        since = self.clock() - weeks * WEEK_SECONDS
+        rows = state_store.query("SELECT posted_at, codes FROM drop_events WHERE posted_at >= ?", (since,))
+        # Codes handled before drop events were recorded
+        rows += state_store.query(
+            "SELECT MIN(detected_at), COUNT(DISTINCT code) FROM code_history "
+            "WHERE message_id IS NOT NULL AND detected_at >= ? "
+            "AND message_id NOT IN (SELECT message_id FROM drop_events) GROUP BY message_id", (since,))
+        self.clear()
+        for posted_at, codes in rows:
+            self._count(posted_at, codes)
+        return self.events
+
+    def clear(self):
+        """Forget the drop events (manual windows stay)"""
+        self.counts = [0.0] * SLOTS
+        self.drop_weeks = [set() for _ in range(SLOTS)]
+        self.first_event = None
+        self.events = 0
+        self.dirty = True
+
+    def _count(self, posted_at, codes):
+        slot = slot_of(posted_at)
+        self.counts[slot] += 1  # One drop, however many codes it had
+        self.drop_weeks[slot].add(week_of(posted_at))
+        self.first_event = posted_at if self.first_event is None else min(self.first_event, posted_at)
+        self.events += 1
+        self.dirty = True
+
+    def record(self, msg, codes):
+        """Store a message that carried codes as a drop event"""
+        posted_at = entry_tracking.message_time(msg)
+        if posted_at is None or not codes:
+            return
+        ensure_schema()
+        state_store.enqueue("INSERT OR IGNORE INTO drop_events (message_id, posted_at, codes) VALUES (?, ?, ?)",
+                            (msg.get("id"), posted_at, codes))
+        self._count(posted_at, codes)
+
+    def add_window(self, spec):
+        self.manual_slots.update(parse_window(spec))
+        self.dirty = True
+
+    def weeks_observed(self):
+        if self.first_event is None:
+            return 1.0
+        return max(1.0, (self.clock() - self.first_event) / WEEK_SECONDS)
+
+    def slot_rates(self):
+        """Smoothed drops per week for every slot"""
+        weeks = self.weeks_observed()
+        before, same, after = SMOOTHING
+        counts = self.counts
+        return [(before * counts[slot - 1] + same * counts[slot] + after * counts[(slot + 1) % SLOTS]) / weeks
+                for slot in range(SLOTS)]
+
+    def _refresh(self):
+        if not self.dirty:
+            return
+        learned = set()
+        if self.use_learned:
+            needed = max(self.min_weeks, self.hot_share * self.weeks_observed())
+            weeks = self.drop_weeks
+            for slot in range(SLOTS):
+                if len(weeks[slot - 1] | weeks[slot] | weeks[(slot + 1) % SLOTS]) >= needed:
+                    learned.add(slot)
+        self.hot_slots = learned | self.manual_slots
+        self.dirty = False
+
+    def is_hot(self, now=None):
+        """True inside a hot window, or within `lead` seconds before one"""
+        self._refresh()
+        if not self.hot_slots:
+            return False
+        now = self.clock() if now is None else now
+        return slot_of(now) in self.hot_slots or slot_of(now + self.lead) in self.hot_slots
+
+    def seconds_until_hot(self, now=None):
+        """Seconds until fast polling should start (0 if it should now), or None without hot windows"""
+        self._refresh()
+        if not self.hot_slots:
+            return None
+        now = self.clock() if now is None else now
+        if self.is_hot(now):
+            return 0.0
+        slot_start = now - week_offset(now) % SLOT_SECONDS
+        for ahead in range(1, SLOTS + 1):
+            if (slot_of(now) + ahead) % SLOTS in self.hot_slots:
+                return max(0.0, slot_start + ahead * SLOT_SECONDS - self.lead - now)
+        return None
+
+    def interval(self, base, hot_interval, now=None):
+        """Poll interval: at most hot_interval in a hot window, base outside"""
+        return min(base, hot_interval) if self.is_hot(now) else base
+
+    def windows(self):
+        """Hot windows as (first slot, slot count) runs, in week order"""
+        self._refresh()
+        runs = []
+        for slot in sorted(self.hot_slots):
+            if runs and runs[-1][0] + runs[-1][1] == slot:
+                runs[-1][1] += 1
+            else:
+                runs.append([slot, 1])
+        if len(runs) > 1 and runs[0][0] == 0 and sum(runs[-1]) == SLOTS:
+            # A window across Sunday midnight
+            last = runs.pop()
+            runs[0] = [last[0], last[1] + runs[0][1]]
+        return [tuple(run) for run in runs]
+
+    def status(self):
+        self._refresh()
+        return {"events": self.events, "weeks": self.weeks_observed(), "hot_slots": len(self.hot_slots),
+                "manual_slots": len(self.manual_slots), "hot_now": self.is_hot()}
+
+
+def print_schedule(schedule, hot_interval=None, cold_interval=None):
+    """Print the weekly drop histogram and the hot windows"""
+    rates = schedule.slot_rates()
+    slots_per_hour = 3600 // SLOT_SECONDS
+    peak = max(rates) or 1.0
+    print(f"\nDrop schedule (UTC) from {schedule.events} drops over {schedule.weeks_observed():.1f} weeks"
+          f"{'' if schedule.use_learned else ', learned windows off'}:")
+    print(f"     {''.join(f'{hour:<3d}' for hour in range(0, 24, 3)).rstrip()}")
+    for day, name in enumerate(DAY_NAMES):
+        hours = []
+        for hour in range(24):
+            first = (day * 24 + hour) * slots_per_hour
+            rate = max(rates[first:first + slots_per_hour])
+            hours.append(HEAT_CHARS[min(len(HEAT_CHARS) - 1, int(round(rate / peak * (len(HEAT_CHARS) - 1))))])
+        print(f"{name}  {''.join(hours)}")
+    windows = schedule.windows()
+    if not windows:
+        print("No hot windows: polling follows --interval (and --adaptive) only")
+    for first, count in windows:
+        end = (first + count) % SLOTS
+        manual = " (manual)" if any((first + i) % SLOTS in schedule.manual_slots for i in range(count)) else ""
+        peak_rate = max(rates[(first + i) % SLOTS] for i in range(count))
+        print(f"  hot {slot_label(first)} - {slot_label(end)}  up to {peak_rate:.2f} drops/week{manual}")
+    if windows and hot_interval is not None:
+        print(f"Polling every {hot_interval:g} s from {schedule.lead / 60:g} min before a hot window to its end, "
+              f"every {cold_interval:g} s otherwise")
+    until = schedule.seconds_until_hot()
+    if until is not None:
+        print("Fast polling now" if until == 0 else f"Next hot window in {until / 60:.0f} min")
+    print("")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# Code entry outcome tracking and success-rate reporting
+#
+# Every entry attempt is stored in the state store with the backend method,
+# how long entry took, how long the code waited before entry started, how old
+# the code was when we typed it and what the result was. The report groups
+# attempts by code age so we can see how much success depends on latency.
+# GUI entry never learns whether a code was accepted, so for it the report can
+# only show the submission rate (entered without an error).
+
+import time
+from datetime import datetime
+
+try:
+    from . import state_store
+except ImportError:
+    import state_store
+
+# Entry results
+RESULT_SUCCESS = "success"  # Code accepted (backend or user said so)
+RESULT_FAILURE = "failure"  # Code rejected (backend or user said so)
+RESULT_ERROR = "error"  # Backend failed to enter the code at all
+RESULT_SUBMITTED = "submitted"  # Backend entered the code but cannot tell if it was accepted
+
+# Where the result came from
+SOURCE_BACKEND = "backend"
+SOURCE_USER = "user"
+
+# Code age buckets for the report (upper bounds in seconds)
+AGE_BUCKETS = [2, 5, 10, 20, 30, 60, 120, 300, 600, 1800]
+
+DISCORD_EPOCH_MS = 1420070400000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entry_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT NOT NULL,
+    message_id TEXT,
+    method TEXT,
+    started_at REAL NOT NULL,
+    duration REAL,
+    queue_delay REAL,
+    code_age REAL,
+    result TEXT NOT NULL,
+    result_source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entry_attempts_started_at ON entry_attempts (started_at);
+"""
+
+schema_db = None  # Store the table was last created in
+
+
+def ensure_schema():
+    """Create the entry_attempts table if needed"""
+    global schema_db
+    state_store.open_store()
+    if schema_db == state_store.db_path:
+        return
+    with state_store.read_lock, state_store.read_conn:
+        state_store.read_conn.executescript(SCHEMA)
+    schema_db = state_store.db_path
+
+
+def message_time(msg):
+    """Return the time a message was posted (Unix seconds), or None"""
+    if not msg:
+        return None
+    timestamp = msg.get("timestamp")
+    if timestamp:
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            pass
+    # Fall back to the creation time encoded in the snowflake ID
+    msg_id = str(msg.get("id", ""))
+    if msg_id.isdigit():
+        return ((int(msg_id) >> 22) + DISCORD_EPOCH_MS) / 1000.0
+    return None
+
+
+def new_attempt(code, message=None, received_at=None):
+    """Start timing an entry attempt"""
+    started_at = time.time()
+    posted_at = message_time(message)
+    return {
+        "code": code,
+        "message_id": message.get("id") if message else None,
+        "method": None,
+        "started_at": started_at,
+        "duration": None,
+        "queue_delay": started_at - received_at if received_at else None,
+        "code_age": started_at - posted_at if posted_at else None,
+        "result": RESULT_ERROR,
+        "result_source": SOURCE_BACKEND,
+    }
+
+
+def finish_attempt(attempt, method, result, result_source=SOURCE_BACKEND):
+    """Stop timing an entry attempt and store its result"""
+    attempt["method"] = method
+    attempt["duration"] = time.time() - attempt["started_at"]
+    attempt["result"] = result
+    attempt["result_source"] = result_source
+    return attempt
+
+
+def record_attempt(attempt):
+    """Queue an attempt row for the state store"""
+    ensure_schema()
+    state_store.enqueue(
+        "INSERT INTO entry_attempts (code, message_id, method, started_at, duration, queue_delay, code_age, result, result_source) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (attempt["code"], attempt["message_id"], attempt["method"], attempt["started_at"], attempt["duration"],
+         attempt["queue_delay"], attempt["code_age"], attempt["result"], attempt["result_source"]),
+    )
+
+
+def bucket_label(index):
+    lower = 0 if index == 0 else AGE_BUCKETS[index - 1]
+    if index >= len(AGE_BUCKETS):
+        return f">{lower}s"
+    return f"{lower}-{AGE_BUCKETS[index]}s"
+
+
+def bucket_index(age):
+    for i, upper in enumerate(AGE_BUCKETS):
+        if age < upper:
+            return i
+    return len(AGE_BUCKETS)
+
+
+def print_success_report(since=None, plot_file=None):
+    """Print success rate by code age, optionally saving a chart as an image"""
+    ensure_schema()
+    state_store.flush()
+    sql = "SELECT code_age, result, method, duration, queue_delay FROM entry_attempts"
+    params = ()
+    if since:
+        sql += " WHERE started_at >= ?"
+        params = (since,)
+    rows = state_store.query(sql, params)
+    if not rows:
+        print("No entry attempts recorded yet.")
+        return
+
+    buckets = [{"success": 0, "decided": 0, "submitted": 0, "total": 0} for _ in range(len(AGE_BUCKETS) + 1)]
+    methods = {}
+    unknown_age = 0
+    for code_age, result, method, duration, queue_delay in rows:
+        stats = methods.setdefault(method or "unknown", {"count": 0, "timed": 0, "time": 0.0, "success": 0})
+        stats["count"] += 1
+        if duration is not None:  # Codes typed together by one script only have a batch total
+            stats["timed"] += 1
+            stats["time"] += duration
+        stats["success"] += result == RESULT_SUCCESS
+        if code_age is None:
+            unknown_age += 1
+            continue
+        bucket = buckets[bucket_index(code_age)]
+        bucket["total"] += 1
+        bucket["submitted"] += result != RESULT_ERROR
+        if result in (RESULT_SUCCESS, RESULT_FAILURE):
+            bucket["decided"] += 1
+            bucket["success"] += result == RESULT_SUCCESS
+
+    # Without any accepted/rejected verdict (GUI entry only) a success rate is undefined: show submissions instead
+    verdicts = any(bucket["decided"] for bucket in buckets)
+    rate_name = "Success rate" if verdicts else "Submission rate"
+    print(f"\nEntry attempts: {len(rows)} ({unknown_age} without a known code age)")
+    if verdicts:
+        print("\nSuccess rate by code age at entry (only attempts with a known result):")
+    else:
+        print("\nSubmission rate by code age at entry (no attempt has a known result; "
+              "GUI entry cannot tell whether a code was accepted):")
+    print(f"{'Age':>10} {'Tries':>6} {'Known':>6} {'Sent':>6} {'Rate':>6}")
+    labels, rates = [], []
+    for i, bucket in enumerate(buckets):
+        if not bucket["total"]:
+            continue
+        if verdicts:
+            rate = bucket["success"] / bucket["decided"] if bucket["decided"] else None
+        else:
+            rate = bucket["submitted"] / bucket["total"]
+        bar = "#" * int(round(rate * 40)) if rate is not None else ""
+        rate_text = f"{rate:6.0%}" if rate is not None else "     -"
+        print(f"{bucket_label(i):>10} {bucket['total']:>6} {bucket['decided']:>6} {bucket['submitted']:>6} {rate_text} {bar}")
+        labels.append(bucket_label(i))
+        rates.append(rate * 100 if rate is not None else None)
+
+    print("\nBy entry method:")
+    for method, stats in sorted(methods.items()):
+        avg = f"avg {stats['time'] / stats['timed']:.2f}s" if stats["timed"] else "no per-code time"
+        print(f"  {method}: {stats['count']} attempts, {stats['success']} successful, {avg}")
+
+    if plot_file:
+        save_plot(labels, rates, plot_file, rate_name)
+
+
+def save_plot(labels, rates, plot_file, rate_name="Success rate"):
+    """Save the rate chart as an image if matplotlib is installed; buckets without a rate (None) are left empty"""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed, skipping the chart image (pip install matplotlib)")
+        return
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.bar(labels, [rate if rate is not None else float("nan") for rate in rates])
+    ax.set_xlabel("Code age at entry")
+    ax.set_ylabel(f"{rate_name} (%)")
+    ax.set_ylim(0, 100)
+    ax.set_title(f"Code entry {rate_name.lower()} vs. code age")
+    fig.tight_layout()
+    fig.savefig(plot_file)
+    plt.close(fig)
+    print(f"Saved chart to {plot_file}")
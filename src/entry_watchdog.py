@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# Timeouts and a liveness watchdog for code entry
+#
+# Code entry runs external commands (osascript, PowerShell) on the monitor
+# thread. An AppleScript stuck on a permission dialog or an app that stops
+# responding used to freeze the monitor for good. Every external call now
+# goes through run() with a timeout, and a watchdog thread checks that each
+# poll completes within a few poll intervals (plus an allowance per code being
+# entered). When a poll hangs in an entry, the watchdog kills the running
+# command and abandons the rest of that entry; a hang elsewhere is recorded.
+# Counters and the time spent hung are in stats().
+
+import contextlib
+import os
+import signal
+import subprocess
+import threading
+import time
+
+# Configuration
+SUBPROCESS_TIMEOUT = 10.0  # Default limit for one external command (seconds)
+STALL_INTERVALS = 4  # A poll running longer than this many poll intervals is hung...
+MIN_STALL_SECONDS = 30.0  # ...but never before this many seconds
+ENTRY_ALLOWANCE = 20.0  # Extra seconds a poll may take per code being entered
+CHECK_EVERY = 1.0  # Seconds between watchdog checks
+KILL_WAIT = 2.0  # Seconds to collect the output of a killed command
+
+
+class EntryHung(subprocess.SubprocessError):
+    """An external entry command timed out, or the watchdog abandoned the entry"""
+
+
+def kill(process):
+    """Kill a command and everything it started (its helpers would keep the output pipes open)"""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def finish_killed(process):
+    try:
+        return process.communicate(timeout=KILL_WAIT)
+    except subprocess.TimeoutExpired:
+        return "", ""
+
+
+class EntryWatchdog:
+    """Bounded external commands and detection of polls that stop making progress"""
+
+    def __init__(self, stall_intervals=STALL_INTERVALS, min_stall=MIN_STALL_SECONDS, clock=time.monotonic):
+        self.stall_intervals = stall_intervals
+        self.min_stall = min_stall
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.children = set()  # Running external commands
+        self.deadline = None  # When the current poll or entry counts as hung
+        self.started_at = None
+        self.in_poll = False
+        self.entry_label = None
+        self.hung = False  # The current poll was flagged
+        self.abandoning = False  # The current entry is being abandoned
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.counts = {"stalls": 0, "abandoned_entries": 0, "killed_commands": 0, "timeouts": 0}
+        self.hung_seconds = 0.0
+        self.timeout_seconds = 0.0
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._watch, name="entry-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=CHECK_EVERY * 2)
+        self.thread = None
+
+    def _watch(self):
+        while not self.stop_event.wait(CHECK_EVERY):
+            self.check()
+
+    def stall_limit(self, interval):
+        return max(self.min_stall, self.stall_intervals * interval)
+
+    def poll_started(self, interval):
+        """Arm the watchdog for one poll at the current poll interval"""
+        with self.lock:
+            self.in_poll = True
+            self.hung = False
+            self.started_at = self.clock()
+            self.deadline = self.started_at + self.stall_limit(interval)
+
+    def poll_finished(self):
+        with self.lock:
+            self.in_poll = False
+            self._disarm()
+
+    def _disarm(self):
+        if self.hung:
+            hung_for = self.clock() - self.started_at
+            self.hung_seconds += hung_for
+            print(f"Watchdog: the monitor is responsive again after {hung_for:.1f} s")
+        self.hung = False
+        self.deadline = None
+
+    @contextlib.contextmanager
+    def entry(self, label, codes=1):
+        """Mark code entry in progress; the poll may take ENTRY_ALLOWANCE seconds longer per code"""
+        with self.lock:
+            now = self.clock()
+            allowance = now + ENTRY_ALLOWANCE * codes
+            if self.deadline is None:
+                self.started_at, self.hung = now, False
+            self.deadline = max(self.deadline or allowance, allowance)
+            self.entry_label = label
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.entry_label = None
+                if self.abandoning:
+                    self.counts["abandoned_entries"] += 1
+                    self.abandoning = False
+                    self._disarm()
+                    if self.in_poll:
+                        # Keep watching the rest of the poll, e.g. the next codes on the page
+                        self.started_at = self.clock()
+                        self.deadline = self.started_at + self.min_stall
+                elif not self.in_poll:
+                    self._disarm()
+
+    def check(self, now=None):
+        """Flag a hung poll and kill the entry command it is stuck in; True if a stall was detected now"""
+        with self.lock:
+            now = self.clock() if now is None else now
+            if self.deadline is None or self.hung or now < self.deadline:
+                return False
+            self.hung = True
+            self.counts["stalls"] += 1
+            label = self.entry_label
+            children = list(self.children)
+            if label:
+                self.abandoning = True
+        where = f"entering {label}" if label else "outside code entry"
+        print(f"\nWatchdog: no progress for {now - self.started_at:.0f} s ({where})")
+        for process in children:
+            if process.poll() is None:
+                print(f"Watchdog: killing stuck {process.args[0]} (pid {process.pid})")
+                kill(process)
+                with self.lock:
+                    self.counts["killed_commands"] += 1
+        if label:
+            print(f"Watchdog: abandoning the rest of the entry of {label}")
+        return True
+
+    def ensure_not_abandoned(self):
+        """Raise EntryHung once the watchdog gave up on the current entry (for steps that run no command)"""
+        if self.abandoning:
+            raise EntryHung("entry abandoned by the watchdog")
+
+    def run(self, args, timeout=SUBPROCESS_TIMEOUT):
+        """Run an external command with captured text output, killed after `timeout` seconds or by the watchdog"""
+        self.ensure_not_abandoned()
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                   start_new_session=os.name == "posix")
+        with self.lock:
+            self.children.add(process)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill(process)
+            finish_killed(process)
+            with self.lock:
+                self.counts["timeouts"] += 1
+                self.timeout_seconds += timeout
+            raise EntryHung(f"{args[0]} did not finish in {timeout:g} s and was killed")
+        finally:
+            with self.lock:
+                self.children.discard(process)
+        if self.abandoning:
+            raise EntryHung(f"{args[0]} was killed by the watchdog")
+        return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+            stats["hung_seconds"] = self.hung_seconds + (self.clock() - self.started_at if self.hung else 0.0)
+            stats["timeout_seconds"] = self.timeout_seconds
+            stats["hung_now"] = self.hung
+        return stats
+
+    def summary(self):
+        stats = self.stats()
+        return (f"Watchdog: {stats['timeouts']} command timeouts ({stats['timeout_seconds']:.1f} s), "
+                f"{stats['stalls']} hung polls ({stats['hung_seconds']:.1f} s), "
+                f"{stats['abandoned_entries']} entries abandoned, {stats['killed_commands']} commands killed")
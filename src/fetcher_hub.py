@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# Local fetcher hub: one process polls the Discord channel and shares new
+# messages, detected codes and a code claim table with local subscribers
+
+import argparse
+import itertools
+import queue
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from . import local_ipc
+except ImportError:
+    import local_ipc
+
+# Configuration
+HUB_SOCKET_PATH = "fellou_hub.sock"  # Unix socket the hub listens on
+MAX_SEEN_MESSAGES = 5000  # How many message IDs (with their edit markers) the hub remembers for dedup
+MAX_CLAIMS = 10000  # How many claimed codes the hub remembers
+
+# Hub state (only used inside the hub process)
+subscribers = []
+subscribers_lock = threading.Lock()
+send_locks = {}  # socket -> lock held while a frame is written to it
+claims = OrderedDict()  # code -> {"consumer": ..., "claimed_at": ...}
+claims_lock = threading.Lock()
+last_page = []  # Most recent page, sent to new subscribers as a snapshot
+hub_stats = {"polls": 0, "messages_broadcast": 0, "claims_granted": 0, "claims_denied": 0}
+
+
+def claim_code(code, consumer):
+    """Claim a code for a consumer; returns (granted, owner)"""
+    with claims_lock:
+        entry = claims.get(code)
+        if entry is not None:
+            if entry["consumer"] == consumer:
+                return True, consumer  # Repeated claim by the same consumer
+            hub_stats["claims_denied"] += 1
+            return False, entry["consumer"]
+        claims[code] = {"consumer": consumer, "claimed_at": time.time()}
+        while len(claims) > MAX_CLAIMS:
+            claims.popitem(last=False)
+        hub_stats["claims_granted"] += 1
+        return True, consumer
+
+
+def release_code(code, consumer):
+    """Release a claim so another consumer may try the code"""
+    with claims_lock:
+        entry = claims.get(code)
+        if entry is not None and entry["consumer"] == consumer:
+            del claims[code]
+            return True
+    return False
+
+
+def send_to(sock, event):
+    """Send one event to a client; the connection thread and broadcast() both write to subscriber sockets"""
+    with send_locks[sock]:
+        local_ipc.send_json(sock, event)
+
+
+def broadcast(event):
+    """Send an event to every subscriber, dropping the ones that went away"""
+    # Send outside the lock: a consumer that stops reading must not block claims and new subscribers
+    with subscribers_lock:
+        targets = list(subscribers)
+    gone = []
+    for sock in targets:
+        try:
+            send_to(sock, event)
+        except (OSError, KeyError):  # KeyError: the connection closed in the meantime
+            gone.append(sock)
+    if gone:
+        with subscribers_lock:
+            subscribers[:] = [sock for sock in subscribers if sock not in gone]
+        for sock in gone:
+            sock.close()
+
+
+def handle_connection(sock):
+    """Serve one local client connection"""
+    consumer = f"consumer-{sock.fileno()}"
+    with subscribers_lock:
+        send_locks[sock] = threading.Lock()
+    try:
+        for req in local_ipc.iter_json_lines(sock):
+            op = req.get("op")
+            consumer = req.get("consumer") or consumer
+            if op == "subscribe":
+                # Subscribe before taking the snapshot, so a page published in between is not lost;
+                # holding the send lock keeps that page's broadcast behind the snapshot
+                with send_locks[sock]:
+                    with subscribers_lock:
+                        subscribers.append(sock)
+                    local_ipc.send_json(sock, {"type": "messages", "messages": last_page, "snapshot": True})
+                print(f"Subscriber connected: {consumer}")
+            elif op == "claim":
+                granted, owner = claim_code(req.get("code"), consumer)
+                send_to(sock, {"type": "claim", "id": req.get("id"),
+                               "code": req.get("code"), "granted": granted, "owner": owner})
+                if granted:
+                    print(f"Code {req.get('code')} claimed by {consumer}")
+            elif op == "release":
+                released = release_code(req.get("code"), consumer)
+                send_to(sock, {"type": "release", "id": req.get("id"),
+                               "code": req.get("code"), "released": released})
+            elif op == "stats":
+                send_to(sock, {"type": "stats", "stats": dict(hub_stats),
+                               "subscribers": len(subscribers), "claims": len(claims)})
+            else:
+                send_to(sock, {"type": "error", "error": f"Unknown op: {op}"})
+    except (OSError, ValueError):
+        pass
+    finally:
+        with subscribers_lock:
+            if sock in subscribers:
+                subscribers.remove(sock)
+            send_locks.pop(sock, None)
+        sock.close()
+
+
+def changed_messages(messages, seen_ids):
+    """Messages of a page that are new or were edited since they were broadcast; remembers their edit markers"""
+    changed = []
+    for msg in messages:
+        msg_id = msg.get("id")
+        edited = msg.get("edited_timestamp")
+        if msg_id in seen_ids and seen_ids[msg_id] == edited:
+            continue
+        seen_ids[msg_id] = edited
+        changed.append(msg)
+    while len(seen_ids) > MAX_SEEN_MESSAGES:
+        seen_ids.popitem(last=False)
+    return changed
+
+
+def publish_page(messages, seen_ids):
+    """Keep a fetched page as the snapshot for new subscribers and broadcast its new and edited messages"""
+    global last_page
+    last_page = messages
+    # Edited messages go out again, so subscribers can rescan them for codes added by the edit
+    new_messages = changed_messages(messages, seen_ids)
+    if new_messages:
+        # Subscribers apply their own user filters and code extraction
+        hub_stats["messages_broadcast"] += len(new_messages)
+        broadcast({"type": "messages", "messages": new_messages})
+        print(f"Broadcast {len(new_messages)} new or edited message(s) to {len(subscribers)} subscriber(s)")
+    return new_messages
+
+
+def serve_forever(server):
+    """Accept local connections and serve each one on its own thread"""
+    while True:
+        try:
+            conn, _ = server.accept()
+        except OSError:
+            return
+        threading.Thread(target=handle_connection, args=(conn,), daemon=True).start()
+
+
+def run_hub(poll_interval=5, limit=50, socket_path=HUB_SOCKET_PATH):
+    """Poll the channel once for all local consumers and broadcast new and edited messages"""
+    try:
+        from . import discord_api_client as api
+    except ImportError:
+        import discord_api_client as api
+
+    print(f"Starting fetcher hub for: {api.CHANNEL_URL}")
+    print(f"Listening on {socket_path}, polling every {poll_interval} seconds")
+
+    token = api.get_user_token()
+    server = local_ipc.create_unix_server(socket_path)
+    threading.Thread(target=serve_forever, args=(server,), daemon=True).start()
+
+    seen_ids = OrderedDict()  # message ID -> edited_timestamp when last broadcast
+    try:
+        while True:
+            started = time.time()
+            messages = api.get_channel_messages(token, limit=limit)
+            hub_stats["polls"] += 1
+            if messages:
+                publish_page(messages, seen_ids)
+            time.sleep(max(0.0, poll_interval - (time.time() - started)))
+    except KeyboardInterrupt:
+        print("\nHub stopped by user")
+    finally:
+        server.close()
+        local_ipc.remove_socket_file(socket_path)
+
+
+class HubClient:
+    """Subscriber connection to a running fetcher hub"""
+
+    def __init__(self, consumer, socket_path=HUB_SOCKET_PATH):
+        self.consumer = consumer
+        self.socket_path = socket_path
+        self.sock = None
+        self.events = queue.Queue()
+        self.replies = {}
+        self.replies_cond = threading.Condition()
+        self.request_ids = itertools.count(1)
+        self.send_lock = threading.Lock()
+
+    def connect(self):
+        """Connect and subscribe; returns False if no hub is running"""
+        self.sock = local_ipc.connect_unix(self.socket_path)
+        if self.sock is None:
+            return False
+        self.sock.settimeout(None)
+        self._send({"op": "subscribe"})
+        threading.Thread(target=self._reader, daemon=True).start()
+        return True
+
+    def _send(self, obj):
+        obj["consumer"] = self.consumer
+        with self.send_lock:
+            local_ipc.send_json(self.sock, obj)
+
+    def _reader(self):
+        try:
+            for event in local_ipc.iter_json_lines(self.sock):
+                if event.get("type") == "messages":
+                    self.events.put(event)
+                else:
+                    with self.replies_cond:
+                        self.replies[event.get("id")] = event
+                        self.replies_cond.notify_all()
+        except (OSError, ValueError):
+            pass
+        self.events.put(None)  # Signal that the hub went away
+
+    def _call(self, obj, timeout):
+        req_id = next(self.request_ids)
+        obj["id"] = req_id
+        try:
+            self._send(obj)
+        except OSError:
+            return None
+        deadline = time.monotonic() + timeout
+        with self.replies_cond:
+            while req_id not in self.replies:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.replies_cond.wait(remaining)
+            return self.replies.pop(req_id)
+
+    def next_messages(self, timeout=None):
+        """Wait for the next batch of messages; returns None if the hub is gone"""
+        try:
+            event = self.events.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        return None if event is None else event.get("messages", [])
+
+    def claim(self, code, timeout=2.0):
+        """Claim a code before entering it; fails open: if the hub does not answer in time, two consumers may enter the code"""
+        reply = self._call({"op": "claim", "code": code}, timeout)
+        if reply is None:
+            print(f"Hub did not answer claim for {code}, entering it anyway")
+            return True
+        if not reply.get("granted"):
+            print(f"Code {code} already claimed by {reply.get('owner')}, skipping")
+        return reply.get("granted", False)
+
+    def release(self, code, timeout=2.0):
+        """Give a claimed code back, e.g. when entry failed"""
+        reply = self._call({"op": "release", "code": code}, timeout)
+        return bool(reply and reply.get("released"))
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Local fetcher hub for Discord monitors')
+    parser.add_argument('--interval', type=float, default=5, help='Polling interval in seconds (default: 5)')
+    parser.add_argument('--limit', type=int, default=50, help='Messages fetched per poll (default: 50)')
+    parser.add_argument('--socket', type=str, default=HUB_SOCKET_PATH, help=f'Unix socket path (default: {HUB_SOCKET_PATH})')
+    parser.add_argument('--stats', action='store_true', help='Print stats of a running hub and exit')
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point"""
+    args = parse_args()
+    if args.stats:
+        reply = local_ipc.request(args.socket, {"op": "stats"})
+        if reply is None:
+            print(f"No hub is running on {args.socket}")
+        else:
+            print(f"Hub stats: {reply['stats']}")
+            print(f"Subscribers: {reply['subscribers']}, claimed codes: {reply['claims']}")
+        return
+    run_hub(poll_interval=args.interval, limit=args.limit, socket_path=args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Small helpers for newline-delimited JSON over local Unix sockets
+
+import json
+import os
+import socket
+
+
+def create_unix_server(path, backlog=16):
+    """Create a listening Unix socket, replacing a stale socket file"""
+    if os.path.exists(path):
+        # A leftover socket file from a crashed process blocks bind()
+        try:
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            probe.settimeout(0.5)
+            probe.connect(path)
+            probe.close()
+            raise RuntimeError(f"Another process is already listening on {path}")
+        except (ConnectionRefusedError, FileNotFoundError, socket.timeout):
+            os.remove(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)  # Only the current user may connect
+    server.listen(backlog)
+    return server
+
+
+def connect_unix(path, timeout=2.0):
+    """Connect to a local Unix socket, or return None if nobody is listening"""
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def send_json(sock, obj):
+    """Send one JSON object as a single line"""
+    data = json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n"
+    sock.sendall(data)
+
+
+def iter_json_lines(sock, bufsize=65536):
+    """Yield JSON objects read line by line until the peer closes the socket"""
+    buffer = b""
+    while True:
+        chunk = sock.recv(bufsize)
+        if not chunk:
+            return
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            if line.strip():
+                yield json.loads(line)
+
+
+def request(path, obj, timeout=2.0):
+    """Send one request to a local socket server and return its single reply"""
+    sock = connect_unix(path, timeout=timeout)
+    if sock is None:
+        return None
+    try:
+        send_json(sock, obj)
+        for reply in iter_json_lines(sock):
+            return reply
+        return None
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+
+def remove_socket_file(path):
+    """Remove a socket file on shutdown, ignoring it if already gone"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
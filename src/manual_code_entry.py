@@ -2,15 +2,27 @@
 # Simple Discord API client that shows codes but requires manual entry
 # This version doesn't use pyautogui or AppleScript to avoid permission issues
 
-import requests
-import json
 import os
 import time
-import re
 import subprocess
 import argparse
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+try:
+    from . import channel_state
+    from . import code_extraction
+    from . import entry_watchdog
+    from . import fetcher_hub
+    from . import poll_scheduler
+    from . import retry_policy
+    from . import state_store
+except ImportError:
+    import channel_state
+    import code_extraction
+    import entry_watchdog
+    import fetcher_hub
+    import poll_scheduler
+    import retry_policy
+    import state_store
 
 # Configuration
 TARGET_GUILD_ID = "1320757665118556160"
@@ -19,6 +31,8 @@ CHANNEL_URL = f"https://discord.com/channels/{TARGET_GUILD_ID}/{TARGET_CHANNEL_I
 TARGET_APP_NAME = "Fellou"  # App where invite codes will be entered manually
 # Updated regex pattern to match only 6-character uppercase alphanumeric codes that appear as separate words
 INVITE_PATTERN = r'\b[A-Z0-9]{6}\b'  # Pattern to match codes like "CDNQ4Q", "6QYAUV", etc.
+# More code formats can be added to EXTRA_PATTERNS in code_extraction.py
+EXTRACTOR = code_extraction.CodeExtractor([("plain", INVITE_PATTERN)] + code_extraction.EXTRA_PATTERNS)
 
 # User filter lists
 # Ban list: Messages from these user IDs will be ignored (add user IDs as strings)
@@ -40,27 +54,22 @@ CURRENT_USER_ID = ""  # Fill this with your user ID if you want to auto-whitelis
 # If you have a token, you can set it here. Otherwise, it will prompt for login
 TOKEN_FILE = "discord_token.txt"
 
-# Keep track of processed messages/codes
-processed_msg_ids = set()
-processed_codes = set()
-
-# Create a session with retry logic
-def create_session_with_retries(retries=5, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)):
-    """Create a requests session with retry logic"""
-    session = requests.Session()
-    retry = Retry(
-        total=retries,
-        read=retries,
-        connect=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=status_forcelist,
-        allowed_methods=frozenset(['GET', 'POST']),
-        raise_on_status=False
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    return session
+# Print schedule jitter every this many polls
+JITTER_REPORT_EVERY = 60
+
+# Shared retry policy (one keep-alive session, circuit breaker, adaptive timeouts)
+HTTP_POLICY = retry_policy.RetryPolicy()
+last_fetch_result = None  # Outcome of the latest request to the Discord API
+
+# Cold start: on the first page after startup only messages younger than this are shown
+ACT_ON_AGE = 60.0  # Seconds; negative = show the whole first page
+
+# Connection to a local fetcher hub (set when running with --hub)
+HUB_CLIENT = None
+
+# Handled messages and codes and the saved cursor of this client (see channel_state.py and state_store.py)
+STATE_CONSUMER = "manual-entry"  # Cursor owner name, so each client keeps its own position
+STATE = channel_state.ChannelState(TARGET_CHANNEL_ID, STATE_CONSUMER, EXTRACTOR)
 
 def save_token(token):
     """Save Discord token to file"""
@@ -98,13 +107,15 @@ def login_to_discord(email, password):
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
     }
     
-    # Create a session with retry logic
-    session = create_session_with_retries()
+    # Send login request under the shared retry policy (5xx answers are retried, others returned as they are)
+    result = HTTP_POLICY.request("POST", url, deadline=retry_policy.LOGIN_DEADLINE, json=data, headers=headers)
+    if result.response is None:
+        print(f"Connection error during login: {result.detail}")
+        print("This might be a temporary issue. Please try again in a few minutes.")
+        return None
+    response = result.response
     
     try:
-        # Send login request
-        response = session.post(url, json=data, headers=headers, timeout=15)
-        
         # Check if login was successful
         if response.status_code == 200:
             token = response.json().get("token")
@@ -128,9 +139,10 @@ def login_to_discord(email, password):
                 "gift_code_sku_id": None
             }
             
-            mfa_response = session.post(mfa_url, json=mfa_data, headers=headers, timeout=15)
+            mfa_response = HTTP_POLICY.request("POST", mfa_url, deadline=retry_policy.LOGIN_DEADLINE,
+                                               json=mfa_data, headers=headers).response
             
-            if mfa_response.status_code == 200:
+            if mfa_response is not None and mfa_response.status_code == 200:
                 token = mfa_response.json().get("token")
                 if token:
                     print("2FA login successful!")
@@ -139,10 +151,6 @@ def login_to_discord(email, password):
         
         print(f"Login failed: {response.status_code} - {response.text}")
         return None
-    except requests.exceptions.ConnectionError as e:
-        print(f"Connection error during login: {e}")
-        print("This might be a temporary issue. Please try again in a few minutes.")
-        return None
     except Exception as e:
         print(f"Error during login: {e}")
         return None
@@ -183,40 +191,12 @@ def get_channel_messages(token, limit=20, before=None):
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
     }
     
-    # Create a session with retry logic
-    session = create_session_with_retries()
+    # Make request to Discord API under the shared retry policy (never sleeps past the poll deadline)
+    global last_fetch_result
+    result = HTTP_POLICY.request("GET", url, params=params, headers=headers)
+    last_fetch_result = result
     
-    try:
-        # Make request to Discord API
-        response = session.get(url, params=params, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 401:
-            print("Token expired or invalid. Please log in again.")
-            # Delete the token file so we can get a new one
-            if os.path.exists(TOKEN_FILE):
-                os.remove(TOKEN_FILE)
-            return None
-        else:
-            print(f"Error fetching messages: {response.status_code} - {response.text}")
-            return None
-    except requests.exceptions.ConnectionError as e:
-        print(f"Connection error occurred: {e}")
-        print("This might be a temporary network issue or Discord API rate limiting")
-        print("Waiting 10 seconds before retrying...")
-        time.sleep(10)
-        return None
-    except requests.exceptions.Timeout:
-        print("Request timed out. Discord API might be slow or unavailable.")
-        print("Waiting 10 seconds before retrying...")
-        time.sleep(10)
-        return None
-    except Exception as e:
-        print(f"Unexpected error when fetching messages: {e}")
-        print("Waiting 5 seconds before retrying...")
-        time.sleep(5)
-        return None
+    return channel_state.read_page(result, token_file=TOKEN_FILE)
 
 def get_current_user_info(token):
     """Get current user information using the token"""
@@ -228,36 +208,34 @@ def get_current_user_info(token):
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
     }
     
-    try:
-        # Create a session with retry logic
-        session = create_session_with_retries()
-        
-        response = session.get(url, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            user_data = response.json()
-            user_id = user_data.get("id")
-            username = user_data.get("username")
-            print(f"Logged in as: {username} (ID: {user_id})")
-            return user_id, username
-        else:
-            print(f"Failed to get user info: {response.status_code} - {response.text}")
+    global last_fetch_result
+    result = HTTP_POLICY.request("GET", url, headers=headers)
+    last_fetch_result = result
+    
+    if result.ok:
+        try:
+            user_data = result.response.json()
+        except ValueError as e:
+            print(f"Error getting user info: {e}")
             return None, None
-    except requests.exceptions.ConnectionError as e:
-        print(f"Connection error getting user info: {e}")
-        print("Waiting 5 seconds before retrying...")
-        time.sleep(5)
-        return None, None
-    except Exception as e:
-        print(f"Error getting user info: {e}")
-        return None, None
+        user_id = user_data.get("id")
+        username = user_data.get("username")
+        print(f"Logged in as: {username} (ID: {user_id})")
+        return user_id, username
+    
+    print(f"Failed to get user info ({result.error}): {result.detail}")
+    return None, None
 
 def find_invite_codes(content):
     """Find potential invite codes in message content"""
     if not content:
         return []
     
-    return re.findall(INVITE_PATTERN, content)
+    return EXTRACTOR.find_codes(content)
+
+def check_user_filters(user_id):
+    """Return why a user's messages are ignored ("banned" / "not_whitelisted"), or None"""
+    return channel_state.user_filter_reason(user_id, BAN_LIST, WHITELIST)
 
 def notify_user(code):
     """Notify user about the code with a visible alert"""
@@ -273,7 +251,8 @@ def notify_user(code):
         
         # Try to switch to the app without sending keystrokes
         try:
-            subprocess.run(['osascript', '-e', f'tell application "{TARGET_APP_NAME}" to activate'])
+            subprocess.run(['osascript', '-e', f'tell application "{TARGET_APP_NAME}" to activate'],
+                           timeout=entry_watchdog.SUBPROCESS_TIMEOUT)  # A stuck dialog must not block the next codes
             print(f"Switched focus to {TARGET_APP_NAME}. Please enter the code manually.")
         except:
             print(f"Please manually switch to {TARGET_APP_NAME} and enter the code.")
@@ -304,34 +283,41 @@ def process_messages(messages):
     
     new_codes_found = False
     
+    # Don't prompt for the backlog on the first page after startup
+    if not STATE.warmed_up:
+        messages, _ = STATE.warm_up(messages, time.time(), ACT_ON_AGE, author_filter=check_user_filters)
+    
     for msg in messages:
-        # Skip if we've already processed this message
+        # Skip if we've already processed this message, unless it was edited since
         msg_id = msg.get("id")
-        if msg_id in processed_msg_ids:
+        if msg_id in STATE.processed_msg_ids:
+            if STATE.was_edited(msg):
+                new_codes_found = rescan_edited_message(msg) or new_codes_found
+            continue
+        
+        # Skip messages already handled before a restart
+        if STATE.is_before_cursor(msg_id):
+            STATE.processed_msg_ids.add(msg_id)
             continue
         
         # Get user ID for filtering
         user_id = msg.get("author", {}).get("id", "")
         username = msg.get("author", {}).get("username", "Unknown")
         
-        # Apply filtering rules:
-        # 1. If whitelist exists (not empty), only process messages from whitelisted users
-        # 2. If whitelist is empty, process messages from all users except those in the ban list
-        
-        # Check if user is banned
-        if user_id in BAN_LIST:
+        # Apply filtering rules
+        filter_result = check_user_filters(user_id)
+        if filter_result == "banned":
             print(f"Skipping message from banned user: {username} ({user_id})")
-            processed_msg_ids.add(msg_id)  # Mark as processed
+            STATE.processed_msg_ids.add(msg_id)  # Mark as processed
             continue
-            
-        # Check whitelist (if it exists)
-        if WHITELIST and user_id not in WHITELIST:
+        if filter_result == "not_whitelisted":
             # Skip silently - message is not from a whitelisted user
-            processed_msg_ids.add(msg_id)  # Mark as processed anyway
+            STATE.processed_msg_ids.add(msg_id)  # Mark as processed anyway
             continue
         
-        # Mark as processed
-        processed_msg_ids.add(msg_id)
+        # Mark as processed and remember its version to notice later edits
+        STATE.processed_msg_ids.add(msg_id)
+        STATE.remember_version(msg)
         
         # Get message info
         content = msg.get("content", "")
@@ -342,21 +328,41 @@ def process_messages(messages):
         print(f"\nNew message from {author} (ID: {user_id}) at {timestamp}:")
         print(f"Content: {content}")
         
-        # Check for invite codes
-        invite_codes = find_invite_codes(content)
-        if invite_codes:
-            print(f"Found potential invite code(s): {', '.join(invite_codes)}")
-            
-            # Process each code
-            for code in invite_codes:
-                if code not in processed_codes:
-                    print(f"New invite code detected: {code}")
-                    if notify_user(code):
-                        processed_codes.add(code)
-                        new_codes_found = True
+        # Check every text field of the message for invite codes
+        code_hits = EXTRACTOR.extract(msg, author_filter=check_user_filters)
+        if code_hits:
+            print(f"Found potential invite code(s): {', '.join(f'{hit.code} ({hit.field}, {hit.pattern})' for hit in code_hits)}")
+            if use_invite_codes(msg, [hit.code for hit in code_hits]):
+                new_codes_found = True
+    
+    STATE.advance_cursor(messages)
     
     return new_codes_found
 
+def use_invite_codes(msg, codes):
+    """Offer the codes from a message that were not handled before; returns True if one was used"""
+    used = False
+    for code in codes:
+        if code in STATE.processed_codes:
+            continue
+        detected_at = time.time()
+        # Another local consumer may already be entering this code
+        if not STATE.claim(code, HUB_CLIENT, msg, detected_at):
+            continue
+        print(f"New invite code detected: {code}")
+        entered_at = time.time()
+        if notify_user(code):
+            used = True
+            STATE.record_code(code, "confirmed", msg, detected_at, entered_at, time.time() - entered_at)
+        elif HUB_CLIENT:
+            HUB_CLIENT.release(code)  # Skipped, let another consumer have it
+    return used
+
+def rescan_edited_message(msg):
+    """Offer the codes that were edited into an already processed message"""
+    code_hits = STATE.edited_code_hits(msg, author_filter=check_user_filters)
+    return bool(code_hits) and use_invite_codes(msg, [hit.code for hit in code_hits])
+
 def monitor_channel(poll_interval=5):
     """Monitor the Discord channel for new messages and invite codes"""
     print(f"Starting Discord channel monitor for: {CHANNEL_URL}")
@@ -367,6 +373,9 @@ def monitor_channel(poll_interval=5):
     print(f"Polling interval: {poll_interval} seconds")
     print("=" * 70)
     
+    # Restore dedup state from earlier runs
+    restore_state()
+    
     # Get authentication token
     token = get_user_token()
     
@@ -389,51 +398,81 @@ def monitor_channel(poll_interval=5):
     if BAN_LIST:
         print(f"Ban list active: Ignoring messages from {len(BAN_LIST)} users")
     
-    last_check_time = 0
-    consecutive_errors = 0
-    max_consecutive_errors = 5
+    scheduler = poll_scheduler.PollScheduler(poll_interval)
     
     try:
         while True:
-            # Check if it's time to poll for new messages
-            current_time = time.time()
-            if current_time - last_check_time >= poll_interval:
-                print(f"\nChecking for new messages... ({time.strftime('%H:%M:%S')})")
-                
-                # Fetch latest messages
-                messages = get_channel_messages(token)
+            # Sleep until the next poll deadline
+            scheduler.wait()
+            print(f"\nChecking for new messages... ({time.strftime('%H:%M:%S')})")
+            
+            # Fetch latest messages
+            messages = get_channel_messages(token)
+            
+            if messages is not None:
+                process_messages(messages)
+                scheduler.schedule_next()
+            else:
+                error = last_fetch_result.error if last_fetch_result else retry_policy.ERROR_NETWORK
                 
-                if messages:
-                    process_messages(messages)
-                    consecutive_errors = 0  # Reset error counter on success
+                if error == retry_policy.ERROR_AUTH:
+                    # Only a rejected token is a reason to log in again
+                    print("Attempting to refresh token...")
+                    token = get_user_token()
+                    scheduler.schedule_next(delay=0)
+                elif error == retry_policy.ERROR_FORBIDDEN:
+                    backoff = HTTP_POLICY.forbidden_backoff()
+                    print(f"Backing off for {backoff:g} s")
+                    scheduler.schedule_next(delay=backoff)
+                elif error == retry_policy.ERROR_RATE_LIMITED:
+                    scheduler.schedule_next(delay=last_fetch_result.retry_after)
+                elif HTTP_POLICY.breaker.state == retry_policy.OPEN:
+                    # Wake up exactly when the breaker allows the next probe
+                    scheduler.schedule_next(delay=HTTP_POLICY.breaker.next_probe_in())
                 else:
-                    # If we couldn't get messages, we may need to re-authenticate
-                    consecutive_errors += 1
-                    
-                    if consecutive_errors >= max_consecutive_errors:
-                        print(f"Too many consecutive errors ({consecutive_errors}). Attempting to refresh token...")
-                        if os.path.exists(TOKEN_FILE):
-                            os.remove(TOKEN_FILE)
-                        token = get_user_token()
-                        consecutive_errors = 0  # Reset after token refresh
-                        
-                    # Increase wait time proportionally to consecutive errors
-                    wait_time = poll_interval * (1 + consecutive_errors)
-                    print(f"Will retry in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                
-                last_check_time = current_time
+                    scheduler.schedule_next()
             
-            # Sleep to avoid excessive API calls
-            time.sleep(1)
+            if scheduler.wakeups % JITTER_REPORT_EVERY == 0:
+                scheduler.print_report()
     
     except KeyboardInterrupt:
         print("\nMonitoring stopped by user")
+    
+    scheduler.print_report()
+
+def monitor_via_hub():
+    """Show codes from messages pushed by a local fetcher hub; returns False if no hub is running"""
+    global HUB_CLIENT
+    client = fetcher_hub.HubClient(consumer=f"manual-entry-{os.getpid()}")
+    if not client.connect():
+        print(f"No fetcher hub running on {fetcher_hub.HUB_SOCKET_PATH}, polling Discord directly")
+        return False
+    
+    HUB_CLIENT = client
+    restore_state()
+    print(f"Receiving messages from fetcher hub on {fetcher_hub.HUB_SOCKET_PATH}")
+    print(f"This version will show codes for you to manually enter in {TARGET_APP_NAME}")
+    
+    try:
+        while True:
+            messages = client.next_messages()
+            if messages is None:
+                print("Fetcher hub connection closed")
+                break
+            process_messages(messages)
+    except KeyboardInterrupt:
+        print("\nMonitoring stopped by user")
+    finally:
+        client.close()
+        HUB_CLIENT = None
+    return True
 
 # Parse command line arguments
 def parse_args():
     parser = argparse.ArgumentParser(description='Manual Discord Code Entry Client')
-    parser.add_argument('--interval', type=int, default=5, help='Polling interval in seconds (default: 5)')
+    parser.add_argument('--interval', type=float, default=5, help='Polling interval in seconds, fractions allowed (default: 5)')
+    parser.add_argument('--act-on-age', type=float, default=ACT_ON_AGE,
+                        help=f'On startup, only show codes from messages younger than this many seconds (default: {ACT_ON_AGE:g}, negative = all)')
     
     # User filtering options
     parser.add_argument('--ban', type=str, help='Add a user ID to the ban list')
@@ -442,38 +481,45 @@ def parse_args():
     parser.add_argument('--unwhitelist', type=str, help='Remove a user ID from the whitelist')
     parser.add_argument('--list-filters', action='store_true', help='List current ban list and whitelist')
     
+    # Shared fetcher hub
+    parser.add_argument('--hub', action='store_true', help='Receive messages from a running fetcher hub instead of polling Discord')
+    
     return parser.parse_args()
 
 def save_user_lists():
-    """Save ban list and whitelist to a file"""
-    filter_file = "user_filters.json"
+    """Save ban list and whitelist to the state store (only changed entries are written)"""
     try:
-        with open(filter_file, 'w') as f:
-            json.dump({
-                "ban_list": BAN_LIST,
-                "whitelist": WHITELIST,
-                "current_user_id": CURRENT_USER_ID
-            }, f, indent=2)
-        print(f"Saved user filters to {filter_file}")
+        state_store.open_store()
+        state_store.sync_filter_list("ban_list", BAN_LIST)
+        state_store.sync_filter_list("whitelist", WHITELIST)
+        state_store.set_setting("current_user_id", CURRENT_USER_ID)
+        print(f"Saved user filters to {state_store.STATE_DB_FILE}")
     except Exception as e:
         print(f"Error saving user filters: {e}")
 
 def load_user_lists():
-    """Load ban list and whitelist from a file"""
-    filter_file = "user_filters.json"
+    """Load ban list and whitelist from the state store"""
     global BAN_LIST, WHITELIST, CURRENT_USER_ID
     
-    if os.path.exists(filter_file):
-        try:
-            with open(filter_file, 'r') as f:
-                data = json.load(f)
-                BAN_LIST = data.get("ban_list", [])
-                WHITELIST = data.get("whitelist", [])
-                if not CURRENT_USER_ID:  # Don't override if already set
-                    CURRENT_USER_ID = data.get("current_user_id", "")
-            print(f"Loaded user filters from {filter_file}")
-        except Exception as e:
-            print(f"Error loading user filters: {e}")
+    try:
+        state_store.open_store()
+        # Pick up filters from the old user_filters.json on first run
+        state_store.import_legacy_filters()
+        lists = state_store.load_filter_lists()
+        BAN_LIST = lists["ban_list"]
+        WHITELIST = lists["whitelist"]
+        if not CURRENT_USER_ID:  # Don't override if already set
+            CURRENT_USER_ID = state_store.get_setting("current_user_id", "") or ""
+        print(f"Loaded user filters from {state_store.STATE_DB_FILE}")
+    except Exception as e:
+        print(f"Error loading user filters: {e}")
+
+def restore_state():
+    """Restore the message cursor and handled codes persisted by earlier runs"""
+    try:
+        STATE.restore()
+    except Exception as e:
+        print(f"Error restoring saved state: {e}")
 
 def manage_user_lists(args):
     """Manage ban list and whitelist based on command line arguments"""
@@ -537,7 +583,9 @@ def manage_user_lists(args):
 
 def main():
     """Main entry point"""
+    global ACT_ON_AGE
     args = parse_args()
+    ACT_ON_AGE = args.act_on_age
     
     # Load user lists
     load_user_lists()
@@ -549,6 +597,10 @@ def main():
         if list_management_args and not args.interval:  # If only managing lists without other actions, exit
             return
     
+    # Use the shared fetcher hub if requested and running
+    if args.hub and monitor_via_hub():
+        return
+    
     # Start the monitor
     monitor_channel(args.interval)
 
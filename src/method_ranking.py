@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Learned order of the GUI entry methods
+#
+# Each platform has several ways of typing a code (AppleScript key codes,
+# pyautogui, AppleScript keystrokes, ...) and which of them works depends on
+# the machine: accessibility permissions, keyboard layout, the app version.
+# Every method run is counted here (worked or not, and how long it took;
+# runs that time out or that the watchdog abandons are left out) and
+# persisted to the state store; methods that cannot tell whether they worked
+# are not ranked and stay last. The method that worked last time is tried
+# first and alone; when it fails, the others follow in order of expected time
+# to a working entry (average duration divided by the smoothed success rate).
+
+try:
+    from . import state_store
+except ImportError:
+    import state_store
+
+# Scoring
+PRIOR_WORKED = 1  # Smoothed success rate: (worked + 1) / (runs + 2), 0.5 for untried methods
+PRIOR_RUNS = 2
+DEFAULT_SECONDS = 3.0  # Assumed duration of a method that has not run yet
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entry_methods (
+    platform TEXT NOT NULL,
+    method TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    worked INTEGER NOT NULL DEFAULT 0,
+    total_seconds REAL NOT NULL DEFAULT 0,
+    last_worked_at REAL,
+    PRIMARY KEY (platform, method)
+) WITHOUT ROWID;
+"""
+
+schema_db = None  # Store the table was last created in
+
+
+def ensure_schema():
+    """Create the entry_methods table if needed"""
+    global schema_db
+    state_store.open_store()
+    if schema_db == state_store.db_path:
+        return
+    with state_store.read_lock, state_store.read_conn:
+        state_store.read_conn.executescript(SCHEMA)
+    schema_db = state_store.db_path
+
+
+def new_method():
+    return {"runs": 0, "worked": 0, "total_seconds": 0.0, "last_worked_at": None}
+
+
+class MethodRanking:
+    """Per-method run counts for one platform, persisted incrementally to the state store"""
+
+    def __init__(self, platform):
+        self.platform = platform
+        self.methods = {}  # method name -> counts
+
+    def load(self):
+        """Replace the in-memory counts with the stored ones; returns the number of methods"""
+        ensure_schema()
+        self.methods = {
+            method: {"runs": runs, "worked": worked, "total_seconds": total_seconds, "last_worked_at": last_worked_at}
+            for method, runs, worked, total_seconds, last_worked_at in state_store.query(
+                "SELECT method, runs, worked, total_seconds, last_worked_at FROM entry_methods WHERE platform = ?",
+                (self.platform,))
+        }
+        return len(self.methods)
+
+    def clear(self):
+        self.methods.clear()
+
+    def reset(self):
+        """Forget what was learned on this platform, in memory and in the store"""
+        ensure_schema()
+        state_store.enqueue("DELETE FROM entry_methods WHERE platform = ?", (self.platform,))
+        self.clear()
+
+    def record(self, method, worked, seconds, at):
+        """Count one run of a method"""
+        counts = self.methods.setdefault(method, new_method())
+        counts["runs"] += 1
+        counts["worked"] += bool(worked)
+        counts["total_seconds"] += seconds
+        if worked:
+            counts["last_worked_at"] = at
+        ensure_schema()
+        state_store.enqueue(
+            "INSERT INTO entry_methods (platform, method, runs, worked, total_seconds, last_worked_at) "
+            "VALUES (?, ?, 1, ?, ?, ?) ON CONFLICT (platform, method) DO UPDATE SET "
+            "runs = runs + 1, worked = worked + excluded.worked, "
+            "total_seconds = total_seconds + excluded.total_seconds, "
+            "last_worked_at = COALESCE(excluded.last_worked_at, last_worked_at)",
+            (self.platform, method, int(bool(worked)), seconds, at if worked else None),
+        )
+
+    def success_rate(self, method):
+        counts = self.methods.get(method) or new_method()
+        return (counts["worked"] + PRIOR_WORKED) / (counts["runs"] + PRIOR_RUNS)
+
+    def average_seconds(self, method):
+        counts = self.methods.get(method)
+        return counts["total_seconds"] / counts["runs"] if counts and counts["runs"] else DEFAULT_SECONDS
+
+    def expected_seconds(self, method):
+        """Average time to a working entry when starting with this method"""
+        return self.average_seconds(method) / self.success_rate(method)
+
+    def last_worked(self, names):
+        """The method among `names` that worked most recently, or None"""
+        worked = [(self.methods[name]["last_worked_at"], name) for name in names
+                  if name in self.methods and self.methods[name]["last_worked_at"] is not None]
+        return max(worked)[1] if worked else None
+
+    def order(self, methods):
+        """Sort (name, function) pairs: the last method that worked, then by expected time; ties keep the given order"""
+        preferred = self.last_worked([name for name, _ in methods])
+        return sorted(methods, key=lambda method: (method[0] != preferred, self.expected_seconds(method[0])))
+
+
+def print_ranking(ranking, names, fixed_last=()):
+    """Print the entry methods, given in the order they will be tried; `fixed_last` ones are not ranked"""
+    print(f"\nEntry methods on {ranking.platform}, in the order they are tried:")
+    preferred = ranking.last_worked([name for name in names if name not in fixed_last])
+    for name in names:
+        if name in fixed_last:
+            print(f"  {name:<24} always tried last (cannot tell whether it worked)")
+            continue
+        counts = ranking.methods.get(name) or new_method()
+        tag = "  (worked last)" if name == preferred else ""
+        print(f"  {name:<24} worked {counts['worked']:>4}/{counts['runs']:<4} "
+              f"avg {ranking.average_seconds(name):5.2f} s  expected {ranking.expected_seconds(name):5.2f} s{tag}")
+    print("")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# Control socket for a long-running monitor (--daemon)
+#
+# The monitor listens on a local Unix socket for newline-delimited JSON
+# requests, so it can be paused, re-timed, re-filtered and inspected without a
+# restart (which would repeat the login, the user lookup and the first page).
+# Requests are answered on the control thread; anything that touches the poll
+# loop is handed over to the monitor thread, which applies it at its next
+# wakeup instead of waiting for the current sleep to run out.
+
+import bisect
+import threading
+import time
+
+try:
+    from . import local_ipc
+except ImportError:
+    import local_ipc
+
+# Configuration
+CONTROL_SOCKET_PATH = "fellou_monitor.sock"  # Unix socket the daemon listens on
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]  # Histogram upper bounds
+
+# Filter list actions accepted by the "filter" op: action -> (list name, add?)
+FILTER_ACTIONS = {
+    "ban": ("ban_list", True),
+    "unban": ("ban_list", False),
+    "whitelist": ("whitelist", True),
+    "unwhitelist": ("whitelist", False),
+}
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.total += ms
+        self.count += 1
+
+    def as_dict(self):
+        labels = [f"<={upper}ms" for upper in self.buckets] + [f">{self.buckets[-1]}ms"]
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count if self.count else 0.0,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class MonitorControl:
+    """Hands control requests from the socket thread to the poll loop"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.paused = False
+        self.pending_interval = None
+        self.scheduler = None
+        self.policy = None
+        self.schedule = None
+
+    def attach(self, scheduler, policy=None, schedule=None):
+        """Called by monitor_channel with the objects it polls with"""
+        self.scheduler = scheduler
+        self.policy = policy
+        self.schedule = schedule
+
+    def request_interval(self, seconds):
+        with self.lock:
+            self.pending_interval = seconds
+        self.wake.set()
+
+    def pause(self):
+        with self.lock:
+            self.paused = True
+        self.wake.set()
+
+    def resume(self):
+        with self.lock:
+            self.paused = False
+        self.wake.set()
+
+    def sleep(self, seconds):
+        """Scheduler sleep that wakes early to apply control requests"""
+        if self.wake.wait(seconds):
+            self.wake.clear()
+            self.apply()
+
+    def apply(self):
+        """Apply pending requests on the monitor thread; blocks while paused"""
+        was_paused = False
+        while True:
+            with self.lock:
+                interval, self.pending_interval = self.pending_interval, None
+                paused = self.paused
+            if interval is not None:
+                self._set_interval(interval)
+            if not paused:
+                break
+            if not was_paused:
+                print("Monitor paused")
+                was_paused = True
+            # Short waits keep Ctrl-C responsive
+            if self.wake.wait(1.0):
+                self.wake.clear()
+        if was_paused:
+            print("Monitor resumed")
+            if self.scheduler:
+                self.scheduler.schedule_next(delay=0)  # Poll right away
+
+    def _set_interval(self, seconds):
+        if not self.scheduler:
+            return
+        if self.policy:
+            # In adaptive mode the interval is the idle cadence
+            self.policy.idle_interval = max(seconds, self.policy.budget.min_interval)
+            self.scheduler.set_interval(self.policy.interval())
+        elif self.schedule:
+            # With a drop schedule the interval is the cadence outside hot windows
+            self.schedule.cold_interval = seconds
+            self.scheduler.set_interval(seconds)
+        else:
+            self.scheduler.set_interval(seconds)
+        print(f"Polling interval changed to {seconds} seconds")
+
+    def interval(self):
+        return self.scheduler.interval if self.scheduler else None
+
+
+def handle_request(req, control, api):
+    """Answer one control request; `api` is the monitor module"""
+    op = req.get("op")
+    if op == "pause":
+        control.pause()
+        return {"ok": True, "paused": True}
+    if op == "resume":
+        control.resume()
+        return {"ok": True, "paused": False}
+    if op == "interval":
+        try:
+            seconds = float(req.get("seconds"))
+        except (TypeError, ValueError):
+            return {"ok": False, "error": "interval needs a number of seconds"}
+        if seconds < 0:
+            return {"ok": False, "error": "interval must not be negative"}
+        control.request_interval(seconds)
+        return {"ok": True, "interval": seconds}
+    if op == "filter":
+        action = FILTER_ACTIONS.get(req.get("action"))
+        user_id = str(req.get("user_id") or "")
+        if not action or not user_id:
+            return {"ok": False, "error": f"filter needs an action ({', '.join(FILTER_ACTIONS)}) and a user_id"}
+        list_name, add = action
+        changed, message = api.update_filter(list_name, user_id, add)
+        if changed:
+            api.save_user_lists()
+        return {"ok": True, "changed": changed, "message": message, "filters": api.filter_snapshot()}
+    if op == "filters":
+        return {"ok": True, "filters": api.filter_snapshot()}
+    if op == "stats":
+        return {"ok": True, "paused": control.paused, "interval": control.interval(), "stats": api.stats_snapshot()}
+    if op == "histograms":
+        return {"ok": True, "histograms": {name: hist.as_dict() for name, hist in api.latency_histograms.items()}}
+    if op == "flush":
+        api.flush_state()
+        return {"ok": True, "flushed_at": time.time()}
+    return {"ok": False, "error": f"Unknown op: {op}"}
+
+
+def handle_connection(sock, control, api):
+    """Serve one control connection"""
+    try:
+        for req in local_ipc.iter_json_lines(sock):
+            try:
+                reply = handle_request(req, control, api)
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            local_ipc.send_json(sock, reply)
+    except (OSError, ValueError):
+        pass
+    finally:
+        sock.close()
+
+
+def serve_forever(server, control, api):
+    """Accept control connections and serve each one on its own thread"""
+    while True:
+        try:
+            conn, _ = server.accept()
+        except OSError:
+            return
+        threading.Thread(target=handle_connection, args=(conn, control, api), daemon=True).start()
+
+
+def start_control_server(control, api, socket_path=CONTROL_SOCKET_PATH):
+    """Listen for control requests in the background; returns the server socket"""
+    server = local_ipc.create_unix_server(socket_path)
+    threading.Thread(target=serve_forever, args=(server, control, api), daemon=True).start()
+    print(f"Control socket listening on {socket_path}")
+    return server
+
+
+def send_command(op, socket_path=CONTROL_SOCKET_PATH, **fields):
+    """Send one request to a running daemon; returns its reply, or None if no daemon is running"""
+    return local_ipc.request(socket_path, dict(fields, op=op), timeout=5.0)
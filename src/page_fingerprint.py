@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Short-circuit for poll responses identical to the previous one
+#
+# Most polls of a quiet channel return exactly the same page. Hashing the raw
+# body is far cheaper than decoding the JSON and walking the page through the
+# dedup checks, and an identical body cannot contain anything new: edits change
+# edited_timestamp, reactions and embeds change the body too. Every
+# RECHECK_EVERY-th identical page is still decoded and processed, which keeps
+# the estimate of what a skip saves up to date.
+
+import hashlib
+import time
+
+# Configuration
+RECHECK_EVERY = 100  # Process every Nth identical page anyway to measure the cost of a full pass
+COST_SMOOTHING = 0.2  # EWMA weight of the newest cost measurement
+
+
+class PageFingerprint:
+    """Recognizes repeated response bodies and estimates the CPU time skipping them saves"""
+
+    def __init__(self, recheck_every=RECHECK_EVERY, clock=time.process_time):
+        self.recheck_every = recheck_every
+        self.clock = clock
+        self.last = None
+        self.identical_run = 0
+        self.skipped = 0
+        self.skipped_bytes = 0
+        self.hash_time = 0.0
+        self.decode_cost = None  # CPU seconds per body byte
+        self.process_cost = None  # CPU seconds to process a page with nothing new
+        self.cpu_saved = 0.0
+
+    def unchanged(self, body, key=None):
+        """True if body (bytes) matches the previous page fetched with the same key"""
+        started = self.clock()
+        digest = hashlib.blake2b(body, digest_size=16)
+        if key is not None:
+            digest.update(repr(key).encode())
+        fingerprint = digest.digest()
+        hash_time = self.clock() - started
+        self.hash_time += hash_time
+
+        if fingerprint != self.last:
+            self.last = fingerprint
+            self.identical_run = 0
+            return False
+        self.identical_run += 1
+        if self.recheck_every and self.identical_run % self.recheck_every == 0:
+            return False  # Full pass, measured by observe_decode/observe_process
+        self.skipped += 1
+        self.skipped_bytes += len(body)
+        self.cpu_saved += max(0.0, self.estimate(len(body)) - hash_time)
+        return True
+
+    def reset(self):
+        """Forget the previous page, so the next one is processed in full"""
+        self.last = None
+        self.identical_run = 0
+
+    def observe_decode(self, nbytes, seconds):
+        if nbytes:
+            self.decode_cost = self._smooth(self.decode_cost, seconds / nbytes)
+
+    def observe_process(self, seconds):
+        """CPU time process_messages took for a page without new messages"""
+        self.process_cost = self._smooth(self.process_cost, seconds)
+
+    def estimate(self, nbytes):
+        """CPU seconds decoding and processing a page of nbytes would take"""
+        return (self.decode_cost or 0.0) * nbytes + (self.process_cost or 0.0)
+
+    def _smooth(self, current, sample):
+        if current is None:
+            return sample
+        return current + COST_SMOOTHING * (sample - current)
+
+    def as_dict(self):
+        return {
+            "unchanged_pages": self.skipped,
+            "unchanged_bytes": self.skipped_bytes,
+            "cpu_saved": self.cpu_saved,
+            "hash_time": self.hash_time,
+        }
+
+    def summary(self):
+        return (f"Unchanged pages skipped: {self.skipped} ({self.skipped_bytes / 1024:.0f} KB not decoded), "
+                f"CPU saved ~{self.cpu_saved * 1000:.1f} ms (hashing cost {self.hash_time * 1000:.1f} ms)")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Deadline-based poll scheduler on the monotonic clock
+#
+# Poll deadlines are laid out on a fixed grid (start, start + interval, ...),
+# so the time a request takes does not push the next poll back. The loop
+# sleeps straight to the next deadline instead of waking on a 1 s tick, and
+# the lateness of every wakeup is recorded as schedule jitter.
+
+import time
+from collections import deque
+
+JITTER_WINDOW = 1000  # Recent wakeups kept for the jitter percentiles
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class PollScheduler:
+    """Wakes the poll loop on interval-aligned deadlines and measures jitter"""
+
+    def __init__(self, interval, clock=time.monotonic, sleep=time.sleep):
+        self.interval = float(interval)
+        self.clock = clock
+        self.sleep = sleep
+        self.next_deadline = None
+        self.lateness = deque(maxlen=JITTER_WINDOW)
+        self.wakeups = 0
+        self.missed_deadlines = 0
+
+    def set_interval(self, interval):
+        """Change the interval; the next deadline moves if it is now too far away"""
+        self.interval = float(interval)
+        if self.next_deadline is not None:
+            self.next_deadline = min(self.next_deadline, self.clock() + self.interval)
+
+    def wait(self):
+        """Sleep until the next deadline and return how late we woke up"""
+        now = self.clock()
+        if self.next_deadline is None:
+            self.next_deadline = now  # First poll runs immediately
+        # Loop: the sleep may return early (e.g. to apply a control request that moves the deadline)
+        while self.next_deadline - now > 0:
+            self.sleep(self.next_deadline - now)
+            now = self.clock()
+        late = max(0.0, now - self.next_deadline)
+        self.lateness.append(late)
+        self.wakeups += 1
+        return late
+
+    def schedule_next(self, delay=None):
+        """Set the next deadline one interval after the last one (or after `delay` for backoff)"""
+        now = self.clock()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        if delay is not None:
+            self.next_deadline = now + delay
+            return self.next_deadline
+        self.next_deadline += self.interval
+        if self.next_deadline < now and self.interval > 0:
+            # The poll overran one or more slots: skip them instead of firing a burst
+            skipped = int((now - self.next_deadline) // self.interval) + 1
+            self.missed_deadlines += skipped
+            self.next_deadline += skipped * self.interval
+        return self.next_deadline
+
+    def advance_to(self, deadline):
+        """Pull the next deadline forward, e.g. to the start of a predicted busy window"""
+        if self.next_deadline is None or deadline < self.next_deadline:
+            self.next_deadline = deadline
+
+    def defer_until(self, deadline):
+        """Push the next deadline back, e.g. to respect a rate-limit budget"""
+        if self.next_deadline is None or deadline > self.next_deadline:
+            self.next_deadline = deadline
+
+    def jitter_stats(self):
+        """Return jitter percentiles (seconds) over the recent wakeups"""
+        values = sorted(self.lateness)
+        return {
+            "wakeups": self.wakeups,
+            "missed_deadlines": self.missed_deadlines,
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": values[-1] if values else 0.0,
+        }
+
+    def print_report(self):
+        stats = self.jitter_stats()
+        print(f"Schedule jitter over {len(self.lateness)} wakeups: "
+              f"p50 {stats['p50'] * 1000:.1f} ms, p95 {stats['p95'] * 1000:.1f} ms, "
+              f"p99 {stats['p99'] * 1000:.1f} ms, max {stats['max'] * 1000:.1f} ms, "
+              f"missed deadlines: {stats['missed_deadlines']}")
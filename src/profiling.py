@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# Profiling mode for live monitor sessions (--profile)
+#
+# Three parts run together:
+# - cProfile over a bounded window at the start of the run (exact call counts)
+# - a low-overhead stack sampler for the rest of the run
+# - wall-time counters around the hot functions for the whole run
+# On exit the stats are written to files and a short top-N summary is printed.
+
+import cProfile
+import functools
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+# Configuration
+DEFAULT_WINDOW = 60  # Seconds of deterministic profiling at the start of the run
+DEFAULT_SAMPLE_INTERVAL = 0.01  # Seconds between stack samples
+DEFAULT_TOP = 15  # Lines in the exit summary
+DEFAULT_OUTPUT = "monitor_profile"  # Prefix of the stats files
+
+# Profiler state
+profiler = None
+window_ends_at = None  # End of the deterministic window, None once it is over
+sampler_thread = None
+sampler_stop = threading.Event()
+sample_interval = DEFAULT_SAMPLE_INTERVAL
+leaf_samples = Counter()  # "file:line(function)" -> samples where it was running
+stack_samples = Counter()  # Collapsed stacks, flamegraph.pl compatible
+total_samples = 0
+function_timers = {}  # name -> {"calls": ..., "total": ..., "max": ...}
+started_at = None
+
+
+def timed(name, func):
+    """Wrap a function with a wall-time counter"""
+    stats = function_timers.setdefault(name, {"calls": 0, "total": 0.0, "max": 0.0})
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats["calls"] += 1
+            stats["total"] += elapsed
+            if elapsed > stats["max"]:
+                stats["max"] = elapsed
+            check_window()
+    return wrapper
+
+
+def install_timers(module, names):
+    """Replace module functions with timed versions (callers look them up by name)"""
+    for name in names:
+        func = getattr(module, name, None)
+        if func is not None:
+            setattr(module, name, timed(name, func))
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno}({code.co_name})"
+
+
+def sampler_loop(thread_id):
+    """Sample the monitored thread's stack until stopped"""
+    global total_samples
+    while not sampler_stop.wait(sample_interval):
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            continue
+        leaf_samples[frame_label(frame)] += 1
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+            frame = frame.f_back
+        stack_samples[";".join(reversed(stack))] += 1
+        total_samples += 1
+
+
+def start_sampling():
+    global sampler_thread
+    if sampler_thread is not None:
+        return
+    sampler_stop.clear()
+    sampler_thread = threading.Thread(target=sampler_loop, args=(threading.main_thread().ident,), daemon=True)
+    sampler_thread.start()
+
+
+def check_window():
+    """Switch from cProfile to sampling once the deterministic window is over"""
+    global window_ends_at
+    if window_ends_at is not None and time.monotonic() >= window_ends_at and threading.current_thread() is threading.main_thread():
+        window_ends_at = None  # Switch once; the profiler is kept for the report
+        profiler.disable()
+        print(f"Deterministic profiling window finished, switching to sampling every {sample_interval * 1000:.0f} ms")
+        start_sampling()
+
+
+def start(window=DEFAULT_WINDOW, interval=DEFAULT_SAMPLE_INTERVAL):
+    """Start profiling the main thread"""
+    global profiler, window_ends_at, sample_interval, started_at
+    sample_interval = interval
+    started_at = time.monotonic()
+    if window > 0:
+        window_ends_at = started_at + window
+        profiler = cProfile.Profile()
+        profiler.enable()
+        print(f"Profiling enabled: deterministic for {window} s, then sampling")
+    else:
+        print("Profiling enabled: sampling only")
+        start_sampling()
+
+
+def stop_and_report(output=DEFAULT_OUTPUT, top=DEFAULT_TOP):
+    """Stop all profilers, write the stats files and print a summary"""
+    global sampler_thread
+    if profiler is not None:
+        profiler.disable()
+    if sampler_thread is not None:
+        sampler_stop.set()
+        sampler_thread.join(timeout=1)
+        sampler_thread = None
+    run_time = time.monotonic() - started_at if started_at else 0.0
+
+    print("\n" + "=" * 70)
+    print(f"PROFILE SUMMARY ({run_time:.1f} s run)")
+    print("=" * 70)
+
+    if function_timers:
+        print("\nWall time per function:")
+        print(f"  {'function':<28} {'calls':>7} {'total s':>9} {'avg ms':>9} {'max ms':>9}")
+        for name, stats in sorted(function_timers.items(), key=lambda item: -item[1]["total"]):
+            avg = stats["total"] / stats["calls"] * 1000 if stats["calls"] else 0.0
+            print(f"  {name:<28} {stats['calls']:>7} {stats['total']:>9.3f} {avg:>9.2f} {stats['max'] * 1000:>9.2f}")
+        with open(f"{output}.timers.json", "w") as f:
+            json.dump({"run_time": run_time, "functions": function_timers}, f, indent=2)
+
+    if profiler is not None:
+        profiler.dump_stats(f"{output}.prof")
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(top)
+        print(f"\nDeterministic profile (top {top} by cumulative time):")
+        print("\n".join(summary.getvalue().strip().splitlines()[-(top + 2):]))
+        print(f"Full stats: {output}.prof (open with python -m pstats or snakeviz)")
+
+    if total_samples:
+        with open(f"{output}.samples.txt", "w") as f:
+            for stack, count in stack_samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"\nSampled profile ({total_samples} samples, top {top} running lines):")
+        for label, count in leaf_samples.most_common(top):
+            print(f"  {count / total_samples:6.1%}  {label}")
+        print(f"Collapsed stacks: {output}.samples.txt (flamegraph.pl compatible)")
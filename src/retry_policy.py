@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# One retry policy for the HTTP stack: per-poll deadline, latency-adapted
+# timeouts, error classification and a circuit breaker with half-open probes
+#
+# Replaces the three stacked retry layers (urllib3 Retry, sleeps inside
+# get_channel_messages, growing waits in monitor_channel). A request never
+# runs past its deadline, and while Discord is unreachable the breaker turns
+# polls into cheap short-timeout probes so the monitor resumes as soon as the
+# network comes back.
+
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Error classes
+ERROR_NETWORK = "network"  # Connection refused/reset, DNS, timeouts
+ERROR_SERVER = "server"  # 5xx from Discord
+ERROR_RATE_LIMITED = "rate_limited"  # 429
+ERROR_AUTH = "auth"  # 401: token is no longer valid
+ERROR_FORBIDDEN = "forbidden"  # 403: no access to the channel or blocked by Cloudflare; a new token will not help
+ERROR_CLIENT = "client"  # Other 4xx: retrying will not help
+
+# Configuration
+POLL_DEADLINE = 8.0  # Seconds one poll may spend on all attempts together
+MIN_TIMEOUT = 1.5  # Seconds; lower bound for the adaptive request timeout
+MAX_TIMEOUT = 15.0  # Seconds; upper bound (the old fixed timeout)
+PROBE_TIMEOUT = 3.0  # Seconds; timeout for half-open probes
+RETRY_BACKOFF = 0.25  # Seconds before the first in-poll retry, doubled per retry
+BREAKER_FAILURES = 3  # Consecutive failed polls before the breaker opens
+BREAKER_OPEN_MIN = 1.0  # Seconds the breaker stays open the first time
+BREAKER_OPEN_MAX = 30.0  # Longest time between probes during an outage
+FORBIDDEN_BACKOFF = 30.0  # Seconds to wait after a 403, doubled for every further 403 in a row...
+FORBIDDEN_BACKOFF_MAX = 600.0  # ...up to this
+LOGIN_DEADLINE = 30.0  # Seconds a login request may take; the user is waiting for it anyway
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def classify_status(status_code):
+    """Map an HTTP status code to an error class (None for success)"""
+    if status_code < 400:
+        return None
+    if status_code == 429:
+        return ERROR_RATE_LIMITED
+    if status_code == 401:
+        return ERROR_AUTH
+    if status_code == 403:
+        return ERROR_FORBIDDEN
+    if status_code >= 500:
+        return ERROR_SERVER
+    return ERROR_CLIENT
+
+
+def retry_after_seconds(response):
+    """Read how long Discord wants us to wait after a 429"""
+    try:
+        return float(response.json().get("retry_after"))
+    except (ValueError, TypeError, AttributeError):
+        pass
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class LatencyTracker:
+    """Smoothed latency estimate used to size request timeouts (like TCP's RTO)"""
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+
+    def observe(self, latency):
+        if self.srtt is None:
+            self.srtt = latency
+            self.rttvar = latency / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - latency)
+            self.srtt = 0.875 * self.srtt + 0.125 * latency
+
+    def timeout(self):
+        if self.srtt is None:
+            return MAX_TIMEOUT
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, self.srtt + 4 * self.rttvar))
+
+
+class CircuitBreaker:
+    """Stops hammering an unreachable API and probes it with growing gaps"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.open_duration = BREAKER_OPEN_MIN
+        self.opened_at = None
+        self.opens = 0
+
+    def allow_request(self):
+        """True if a request may go out now (moves open -> half-open when due)"""
+        if self.state == OPEN and self.clock() >= self.opened_at + self.open_duration:
+            self.state = HALF_OPEN
+            print("Circuit breaker half-open: probing Discord API")
+        return self.state != OPEN
+
+    def next_probe_in(self):
+        """Seconds until the breaker lets the next probe through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_duration - self.clock())
+
+    def record_success(self):
+        if self.state != CLOSED:
+            print("Circuit breaker closed: Discord API reachable again")
+        self.state = CLOSED
+        self.failures = 0
+        self.open_duration = BREAKER_OPEN_MIN
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # Probe failed: back off further before the next probe
+            self.open_duration = min(BREAKER_OPEN_MAX, self.open_duration * 2)
+            self._open()
+        elif self.state == CLOSED and self.failures >= BREAKER_FAILURES:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.opens += 1
+        print(f"Circuit breaker open after {self.failures} failures, next probe in {self.open_duration:.1f} s")
+
+
+class FetchResult:
+    """Outcome of a policy-controlled request"""
+
+    def __init__(self, response=None, error=None, detail="", retry_after=None, attempts=0):
+        self.response = response
+        self.error = error
+        self.detail = detail
+        self.retry_after = retry_after
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.error is None and self.response is not None
+
+
+def create_session():
+    """Session for policy-controlled requests: keep-alive pool, no urllib3 retries"""
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=0, pool_connections=2, pool_maxsize=4)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RetryPolicy:
+    """Runs requests under a deadline with adaptive timeouts and a circuit breaker"""
+
+    def __init__(self, session=None, clock=time.monotonic, sleep=time.sleep):
+        self.session = session or create_session()
+        self.clock = clock
+        self.sleep = sleep
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(clock=clock)
+        self.error_counts = {}
+        self.forbidden_streak = 0  # 403s in a row
+
+    def forbidden_backoff(self):
+        """Seconds to wait after the latest 403, growing while they keep coming"""
+        return min(FORBIDDEN_BACKOFF_MAX, FORBIDDEN_BACKOFF * 2 ** max(0, self.forbidden_streak - 1))
+
+    def request(self, method, url, deadline=POLL_DEADLINE, **kwargs):
+        """Send a request, retrying network and 5xx errors until the deadline"""
+        if not self.breaker.allow_request():
+            return FetchResult(error=ERROR_NETWORK, detail="circuit breaker open",
+                               retry_after=self.breaker.next_probe_in())
+
+        ends_at = self.clock() + deadline
+        probing = self.breaker.state == HALF_OPEN
+        backoff = RETRY_BACKOFF
+        attempts = 0
+        result = None
+        while True:
+            remaining = ends_at - self.clock()
+            timeout = min(PROBE_TIMEOUT if probing else self.latency.timeout(), remaining)
+            if timeout <= 0:
+                break
+            attempts += 1
+            started = self.clock()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                result = FetchResult(error=ERROR_NETWORK, detail=str(e), attempts=attempts)
+            else:
+                self.latency.observe(self.clock() - started)
+                error = classify_status(response.status_code)
+                if error is None:
+                    self.breaker.record_success()
+                    self.forbidden_streak = 0
+                    return FetchResult(response=response, attempts=attempts)
+                result = FetchResult(response=response, error=error, attempts=attempts,
+                                     detail=f"{response.status_code} - {response.text[:200]}")
+                if error == ERROR_RATE_LIMITED:
+                    result.retry_after = retry_after_seconds(response)
+                if error != ERROR_SERVER:
+                    break  # 429/401/403/4xx: retrying inside this poll will not help
+
+            # A failed half-open probe reopens the breaker right away
+            if probing:
+                break
+            delay = backoff * (0.5 + random.random())
+            if self.clock() + delay >= ends_at:
+                break
+            self.sleep(delay)
+            backoff *= 2
+
+        if result is None:
+            result = FetchResult(error=ERROR_NETWORK, detail="poll deadline exhausted", attempts=attempts)
+        self.error_counts[result.error] = self.error_counts.get(result.error, 0) + 1
+        if result.error == ERROR_FORBIDDEN:
+            self.forbidden_streak += 1
+        if result.error in (ERROR_NETWORK, ERROR_SERVER):
+            self.breaker.record_failure()
+        elif result.error != ERROR_RATE_LIMITED:
+            self.breaker.record_success()  # The API answered, so the network is fine
+        return result
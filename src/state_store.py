@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# Durable SQLite state store for message cursors, code history and filter lists
+#
+# The database runs in WAL mode so the monitor, the manual client and the CLI
+# can read it concurrently. Writes coming from the polling loop are queued and
+# committed in batches by a background thread, so the hot path never waits on
+# disk I/O.
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Configuration
+STATE_DB_FILE = "monitor_state.db"
+LEGACY_FILTER_FILE = "user_filters.json"  # Imported once if the store has no filters yet
+WRITE_BATCH_SIZE = 200  # Commit after this many queued writes...
+WRITE_FLUSH_INTERVAL = 0.5  # ...or after this many seconds, whichever comes first
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_cursors (
+    channel_id TEXT NOT NULL,
+    consumer TEXT NOT NULL,
+    last_message_id TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (channel_id, consumer)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS code_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT NOT NULL,
+    channel_id TEXT,
+    message_id TEXT,
+    author_id TEXT,
+    detected_at REAL NOT NULL,
+    entered_at REAL,
+    duration REAL,
+    outcome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_code_history_code ON code_history (code);
+CREATE INDEX IF NOT EXISTS idx_code_history_detected_at ON code_history (detected_at);
+
+CREATE TABLE IF NOT EXISTS filter_lists (
+    list_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (list_name, user_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+# Store state
+db_path = None
+read_conn = None
+read_lock = threading.Lock()
+write_queue = queue.Queue()
+writer_thread = None
+store_stats = {"queued_writes": 0, "committed_writes": 0, "batches": 0, "write_errors": 0}
+
+_FLUSH = object()  # Marker asking the writer to commit now
+_STOP = object()  # Marker asking the writer to commit and exit
+
+
+def connect(path):
+    """Open a connection with the pragmas every store connection uses"""
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, avoids an fsync per commit
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
+
+
+def open_store(path=STATE_DB_FILE):
+    """Open (and create if needed) the state store; safe to call more than once"""
+    global db_path, read_conn, writer_thread
+    if read_conn is not None:
+        return
+    db_path = path
+    read_conn = connect(path)
+    read_conn.executescript(SCHEMA)
+    read_conn.commit()
+    writer_thread = threading.Thread(target=writer_loop, args=(path,), daemon=True)
+    writer_thread.start()
+    atexit.register(close_store)
+
+
+def close_store():
+    """Commit all queued writes and close the store"""
+    global read_conn, writer_thread
+    if writer_thread is not None:
+        write_queue.put(_STOP)
+        writer_thread.join(timeout=10)
+        writer_thread = None
+    if read_conn is not None:
+        read_conn.close()
+        read_conn = None
+
+
+def writer_loop(path):
+    """Background thread that commits queued writes in batches"""
+    conn = connect(path)
+    pending = []
+    waiters = []
+    while True:
+        timeout = WRITE_FLUSH_INTERVAL if pending else None
+        try:
+            item = write_queue.get(timeout=timeout)
+        except queue.Empty:
+            item = _FLUSH
+
+        stop = item is _STOP
+        if isinstance(item, threading.Event):
+            waiters.append(item)
+            item = _FLUSH
+        if item is not _FLUSH and not stop:
+            pending.append(item)
+            if len(pending) < WRITE_BATCH_SIZE:
+                continue
+
+        if pending:
+            try:
+                with conn:
+                    for sql, params in pending:
+                        conn.execute(sql, params)
+                store_stats["committed_writes"] += len(pending)
+                store_stats["batches"] += 1
+            except sqlite3.Error as e:
+                store_stats["write_errors"] += 1
+                print(f"Error writing state batch ({len(pending)} writes): {e}")
+            pending = []
+        for event in waiters:
+            event.set()
+        waiters = []
+        if stop:
+            conn.close()
+            return
+
+
+def enqueue(sql, params=()):
+    """Queue a write for the next batch commit"""
+    store_stats["queued_writes"] += 1
+    write_queue.put((sql, params))
+
+
+def flush(timeout=5.0):
+    """Block until everything queued so far has been committed"""
+    if writer_thread is None:
+        return
+    done = threading.Event()
+    write_queue.put(done)
+    done.wait(timeout)
+
+
+def execute_now(sql, params=()):
+    """Run a write immediately (used for CLI actions, not the polling loop)"""
+    flush()
+    with read_lock, read_conn:
+        read_conn.execute(sql, params)
+
+
+def query(sql, params=()):
+    """Run a read query and return all rows"""
+    with read_lock:
+        return read_conn.execute(sql, params).fetchall()
+
+
+# Message cursors
+
+def record_cursor(channel_id, consumer, message_id):
+    """Advance the newest processed message ID for a channel (never moves backwards)"""
+    enqueue(
+        "INSERT INTO message_cursors (channel_id, consumer, last_message_id, updated_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (channel_id, consumer) DO UPDATE SET "
+        "last_message_id = excluded.last_message_id, updated_at = excluded.updated_at "
+        "WHERE CAST(excluded.last_message_id AS INTEGER) > CAST(message_cursors.last_message_id AS INTEGER)",
+        (channel_id, consumer, str(message_id), time.time()),
+    )
+
+
+def load_cursor(channel_id, consumer):
+    """Return the newest processed message ID for a channel, or None"""
+    rows = query(
+        "SELECT last_message_id FROM message_cursors WHERE channel_id = ? AND consumer = ?",
+        (channel_id, consumer),
+    )
+    return rows[0][0] if rows else None
+
+
+# Code history
+
+def record_code(code, outcome, channel_id=None, message_id=None, author_id=None,
+                detected_at=None, entered_at=None, duration=None):
+    """Queue a code history row"""
+    enqueue(
+        "INSERT INTO code_history (code, channel_id, message_id, author_id, detected_at, entered_at, duration, outcome) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (code, channel_id, message_id, author_id, detected_at or time.time(), entered_at, duration, outcome),
+    )
+
+
+def load_known_codes(since=None):
+    """Return every code already handled (oldest first), optionally only those detected after `since`"""
+    if since is None:
+        rows = query("SELECT code FROM code_history GROUP BY code ORDER BY MAX(detected_at)")
+    else:
+        rows = query("SELECT code FROM code_history WHERE detected_at >= ? GROUP BY code ORDER BY MAX(detected_at)", (since,))
+    return [row[0] for row in rows]
+
+
+# Filter lists
+
+def load_filter_lists():
+    """Return {"ban_list": [...], "whitelist": [...]} in insertion order"""
+    lists = {"ban_list": [], "whitelist": []}
+    for list_name, user_id in query("SELECT list_name, user_id FROM filter_lists ORDER BY added_at"):
+        lists.setdefault(list_name, []).append(user_id)
+    return lists
+
+
+def sync_filter_list(list_name, user_ids):
+    """Make a stored filter list match `user_ids`, touching only changed rows"""
+    stored = {row[0] for row in query("SELECT user_id FROM filter_lists WHERE list_name = ?", (list_name,))}
+    wanted = list(dict.fromkeys(user_ids))
+    now = time.time()
+    flush()
+    with read_lock, read_conn:
+        for user_id in stored - set(wanted):
+            read_conn.execute("DELETE FROM filter_lists WHERE list_name = ? AND user_id = ?", (list_name, user_id))
+        for offset, user_id in enumerate(wanted):
+            if user_id not in stored:
+                read_conn.execute(
+                    "INSERT INTO filter_lists (list_name, user_id, added_at) VALUES (?, ?, ?)",
+                    (list_name, user_id, now + offset * 1e-6),
+                )
+
+
+def get_setting(key, default=None):
+    rows = query("SELECT value FROM settings WHERE key = ?", (key,))
+    return rows[0][0] if rows else default
+
+
+def set_setting(key, value):
+    execute_now(
+        "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+
+
+def import_legacy_filters(path=LEGACY_FILTER_FILE):
+    """Import user_filters.json once, the first time the store is used"""
+    if get_setting("legacy_filters_imported") or not os.path.exists(path):
+        return False
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Error importing legacy user filters from {path}: {e}")
+        return False
+    sync_filter_list("ban_list", data.get("ban_list", []))
+    sync_filter_list("whitelist", data.get("whitelist", []))
+    if data.get("current_user_id") and not get_setting("current_user_id"):
+        set_setting("current_user_id", data["current_user_id"])
+    set_setting("legacy_filters_imported", "1")
+    print(f"Imported user filters from {path} into {db_path}")
+    return True
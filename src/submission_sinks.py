@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Submission sinks: where detected codes get entered
+#
+# The GUI sink drives the desktop app through the platform automation in
+# discord_api_client.py and takes seconds per code. The HTTP sink posts the
+# code straight to a redemption endpoint over a kept-alive connection and
+# reads the result from the response. Both report (method, result) and time
+# every attempt, so the faster and more reliable one can be picked with --sink.
+
+import time
+
+import requests
+
+try:
+    from . import entry_tracking
+    from . import retry_policy
+except ImportError:
+    import entry_tracking
+    import retry_policy
+
+# Sink names for --sink
+SINK_GUI = "gui"
+SINK_HTTP = "http"
+SINK_NAMES = [SINK_GUI, SINK_HTTP]
+
+# HTTP sink configuration
+REDEEM_TIMEOUT = 5.0  # Seconds to wait for the redemption endpoint
+REDEEM_HEADERS = {}  # Extra headers for the endpoint, e.g. {"Authorization": "Bearer ..."}
+REDEEM_SUCCESS_KEYS = ("success", "valid", "redeemed", "ok")  # Boolean fields that carry the verdict
+
+
+class SubmissionSink:
+    """Base class: times every submission and counts the results"""
+
+    name = "sink"
+
+    def __init__(self):
+        self.attempts = 0
+        self.total_time = 0.0
+        self.last_duration = None
+        self.results = {}
+        self.batches = 0
+        self.batch_time = 0.0
+
+    def submit(self, code):
+        """Submit one code and return (method, result)"""
+        started = time.perf_counter()
+        method, result = self._submit(code)
+        self.last_duration = time.perf_counter() - started
+        self.attempts += 1
+        self.total_time += self.last_duration
+        self.results[result] = self.results.get(result, 0) + 1
+        return method, result
+
+    def submit_batch(self, codes):
+        """Submit codes back-to-back until one succeeds; returns (method, result, seconds) for each code tried"""
+        started = time.perf_counter()
+        outcomes = self._submit_batch(codes)
+        self.last_duration = time.perf_counter() - started
+        self.batches += 1
+        self.batch_time += self.last_duration
+        self.attempts += len(outcomes)
+        self.total_time += self.last_duration
+        for _, result, _ in outcomes:
+            self.results[result] = self.results.get(result, 0) + 1
+        return outcomes
+
+    def _submit(self, code):
+        raise NotImplementedError
+
+    def _submit_batch(self, codes):
+        outcomes = []
+        for code in codes:
+            started = time.perf_counter()
+            method, result = self._submit(code)
+            outcomes.append((method, result, time.perf_counter() - started))
+            if result == entry_tracking.RESULT_SUCCESS:
+                break  # One accepted code is all we need
+        return outcomes
+
+    def close(self):
+        pass
+
+    def summary(self):
+        if not self.attempts:
+            return f"{self.name} sink: no submissions"
+        results = ", ".join(f"{result} {count}" for result, count in sorted(self.results.items()))
+        summary = (f"{self.name} sink: {self.attempts} submissions, "
+                   f"avg {self.total_time / self.attempts * 1000:.0f} ms ({results})")
+        if self.batches:
+            summary += f", {self.batches} batches avg {self.batch_time / self.batches:.2f} s"
+        return summary
+
+
+class GuiSubmissionSink(SubmissionSink):
+    """Enters codes through desktop GUI automation"""
+
+    name = SINK_GUI
+
+    def __init__(self, enter, enter_batch=None):
+        super().__init__()
+        self.enter = enter  # enter(code) -> (method, result)
+        # enter_batch(codes) -> [(method, result, seconds), ...] with one activation; seconds is None for codes
+        # entered together by one script, whose result is the script's and whose time is only known in total
+        self.enter_batch = enter_batch
+
+    def _submit(self, code):
+        return self.enter(code)
+
+    def _submit_batch(self, codes):
+        if self.enter_batch:
+            return self.enter_batch(codes)
+        return super()._submit_batch(codes)
+
+
+def result_from_response(response):
+    """Decide from the redemption endpoint's answer whether the code was accepted"""
+    status = response.status_code
+    if status >= 500 or status in (401, 403, 429):
+        return entry_tracking.RESULT_ERROR  # The endpoint could not judge the code
+    if status >= 400:
+        return entry_tracking.RESULT_FAILURE  # Invalid or already redeemed
+    try:
+        body = response.json()
+    except ValueError:
+        return entry_tracking.RESULT_SUCCESS
+    if isinstance(body, dict):
+        for key in REDEEM_SUCCESS_KEYS:
+            if key in body:
+                return entry_tracking.RESULT_SUCCESS if body[key] else entry_tracking.RESULT_FAILURE
+    return entry_tracking.RESULT_SUCCESS
+
+
+class HttpSubmissionSink(SubmissionSink):
+    """Posts codes to a redemption endpoint over a reused connection"""
+
+    name = SINK_HTTP
+
+    def __init__(self, url, headers=None, timeout=REDEEM_TIMEOUT, session=None):
+        super().__init__()
+        self.url = url
+        self.headers = dict(REDEEM_HEADERS if headers is None else headers)
+        self.timeout = timeout
+        self.session = session or retry_policy.create_session()
+
+    def _submit(self, code):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json={"code": code}, headers=self.headers, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"Redeem request for {code} failed: {e}")
+            return "http", entry_tracking.RESULT_ERROR
+        result = result_from_response(response)
+        print(f"Redeem endpoint answered {response.status_code} for {code} in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms: {result}")
+        return "http", result
+
+    def close(self):
+        self.session.close()
+
+
+def create_sink(name, gui_enter=None, gui_enter_batch=None, redeem_url=None):
+    """Build the sink selected with --sink"""
+    if name == SINK_HTTP:
+        if not redeem_url:
+            raise ValueError("the http sink needs a redemption URL (--redeem-url)")
+        return HttpSubmissionSink(redeem_url)
+    if name == SINK_GUI:
+        return GuiSubmissionSink(gui_enter, gui_enter_batch)
+    raise ValueError(f"unknown submission sink: {name}")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Fetcher hub: edited messages reach the subscribers again
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import fetcher_hub  # noqa: E402
+import local_ipc  # noqa: E402
+
+
+def message(msg_id, content, edited_timestamp=None):
+    return {"id": msg_id, "content": content, "edited_timestamp": edited_timestamp,
+            "author": {"id": "42", "username": "poster"}}
+
+
+@pytest.fixture
+def hub(tmp_path):
+    """A hub listening on a scratch socket, with fresh state"""
+    fetcher_hub.subscribers.clear()
+    fetcher_hub.last_page = []
+    path = str(tmp_path / "hub.sock")
+    server = local_ipc.create_unix_server(path)
+    threading.Thread(target=fetcher_hub.serve_forever, args=(server,), daemon=True).start()
+    yield path
+    server.close()
+
+
+def test_changed_messages_returns_edits_once():
+    seen_ids = OrderedDict()
+    original = message("1", "code coming...")
+    assert fetcher_hub.changed_messages([original], seen_ids) == [original]
+    assert fetcher_hub.changed_messages([original], seen_ids) == []
+
+    edited = message("1", "code: ABC123", edited_timestamp="2025-01-01T12:00:00+00:00")
+    assert fetcher_hub.changed_messages([edited, message("2", "hi")], seen_ids) == [edited, message("2", "hi")]
+    assert fetcher_hub.changed_messages([edited], seen_ids) == []
+    assert seen_ids["1"] == "2025-01-01T12:00:00+00:00"
+
+
+def test_changed_messages_is_bounded(monkeypatch):
+    monkeypatch.setattr(fetcher_hub, "MAX_SEEN_MESSAGES", 3)
+    seen_ids = OrderedDict()
+    fetcher_hub.changed_messages([message(str(i), "hi") for i in range(5)], seen_ids)
+    assert list(seen_ids) == ["2", "3", "4"]
+
+
+def test_subscriber_receives_edited_message(hub):
+    client = fetcher_hub.HubClient("test", socket_path=hub)
+    assert client.connect()
+    try:
+        assert client.next_messages(timeout=2) == []  # Snapshot of the empty hub
+        seen_ids = OrderedDict()
+        fetcher_hub.publish_page([message("1", "code coming...")], seen_ids)
+        assert [m["content"] for m in client.next_messages(timeout=2)] == ["code coming..."]
+
+        fetcher_hub.publish_page([message("1", "code: ABC123", "2025-01-01T12:00:00+00:00")], seen_ids)
+        edited = client.next_messages(timeout=2)
+        assert [(m["id"], m["content"]) for m in edited] == [("1", "code: ABC123")]
+
+        # The same page again is not pushed
+        fetcher_hub.publish_page([message("1", "code: ABC123", "2025-01-01T12:00:00+00:00")], seen_ids)
+        assert client.next_messages(timeout=0.3) == []
+    finally:
+        client.close()